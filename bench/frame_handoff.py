@@ -0,0 +1,190 @@
+"""Allocation and copy profile of the frame handoff between decode, encode and model stages
+
+Decodes sampled frames from a synthetic video and hands each one to the
+frame store and to a model request the way VideoProcessor does, once with
+the pooled, encode-once path (FramePool, shared memoryview renditions) and
+once with the handoff it replaced (a fresh array per decode, renditions
+copied out with tobytes(), an RGB copy and a PIL image per model request).
+For every stage it reports the time per frame and the memory allocated,
+also as frame-equivalents (bytes / one decoded frame). Exits non-zero when
+the pooled path allocates decode buffers per frame or copies more than
+--max-copies frames' worth per frame.
+
+Memory is measured with tracemalloc, which sees NumPy and Python buffers but
+not native ones (PIL's image memory, libwebp), so the replaced path's figures
+are a lower bound. Timings come from a separate untraced pass.
+
+    python -m bench.frame_handoff
+    python -m bench.frame_handoff --backend anthropic --frames 20
+"""
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import tracemalloc
+from typing import Dict, List, Any, Callable, Tuple
+
+import cv2
+import numpy as np
+
+from .run_bench import BENCH_DIR, REPO_ROOT
+from .synthetic import make_video
+
+PROMPT = "Identify the ingredients in this image."
+
+def measure(traced: bool, fn: Callable, *args) -> Tuple[Any, float, int]:
+    """Run fn, returning its result, seconds taken and bytes allocated at peak (0 when untraced)"""
+    if traced:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = fn(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - before if traced else 0
+    return result, seconds, peak
+
+def legacy_renditions(frame: np.ndarray) -> Dict[str, bytes]:
+    """FrameStore._encode before renditions were shared: fresh resize targets, bytes copied out"""
+    from src.frame_store import RENDITIONS
+    encoded, source = {}, frame
+    for name in sorted(RENDITIONS, key=lambda name: -(RENDITIONS[name][0] or frame.shape[1])):
+        max_width, extension, params = RENDITIONS[name]
+        if max_width and source.shape[1] > max_width:
+            height = round(source.shape[0] * max_width / source.shape[1])
+            source = cv2.resize(source, (max_width, height), interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode(extension, source, params)
+        encoded[name] = buffer.tobytes()
+    return encoded
+
+def model_payload(backend: str, legacy: bool, frame: np.ndarray, encoded) -> Any:
+    """What the backend builds for the request: Gemini content parts or Claude's base64 image"""
+    if backend == "anthropic":
+        if legacy:
+            _, buffer = cv2.imencode(".jpg", cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            return base64.b64encode(buffer).decode("utf-8")
+        return base64.b64encode(encoded).decode("utf-8")
+
+    from google.generativeai.types import content_types
+    if legacy:
+        from PIL import Image
+        return content_types.to_content([PROMPT, Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))])
+    from src.gemini_vision import image_part
+    return content_types.to_content([PROMPT, image_part(encoded)])
+
+def run_path(video: str, frames: int, stride: int, backend: str, legacy: bool, traced: bool) -> Dict[str, Any]:
+    """Hand frames through decode -> frame store -> model request and collect per-stage figures"""
+    from src.frame_pool import FramePool
+    from src.frame_store import FrameStore
+
+    pool = FramePool(1)
+    store = FrameStore(max_bytes=8 * 1024 * 1024)
+    stages: Dict[str, List[Tuple[float, int]]] = {"decode": [], "store": [], "model": []}
+    decode_allocations = 0
+    payload_bytes = 0
+    frame_bytes = 0
+    shared = True
+
+    cap = cv2.VideoCapture(video)
+    read = cap.read if legacy else (lambda: pool.read(cap))
+    try:
+        for number in range(frames):
+            for _ in range(stride - 1):
+                cap.grab()
+            (ok, frame), seconds, peak = measure(traced, read)
+            if not ok:
+                break
+            stages["decode"].append((seconds, peak))
+            frame_bytes = frame.nbytes
+            decode_allocations += 1
+
+            if legacy:
+                renditions, seconds, peak = measure(traced, legacy_renditions, frame)
+                encoded = None
+            else:
+                renditions, seconds, peak = measure(traced, store.put, "bench", number, frame)
+                encoded = renditions["full"].data
+                # The /frames response and the model request read this same buffer
+                shared = shared and isinstance(encoded, memoryview)
+            stages["store"].append((seconds, peak))
+
+            payload, seconds, peak = measure(traced, model_payload, backend, legacy, frame, encoded)
+            stages["model"].append((seconds, peak))
+            payload_bytes += len(payload) if isinstance(payload, str) else len(payload.parts[1].inline_data.data)
+    finally:
+        cap.release()
+
+    count = len(stages["decode"])
+    report: Dict[str, Any] = {
+        "frames": count,
+        # Every plain cap.read() allocates a new frame
+        "decode_allocations": decode_allocations if legacy else pool.allocations,
+        "payload_kb_per_frame": round(payload_bytes / max(count, 1) / 1024, 1),
+    }
+    if not legacy:
+        report["renditions_shared"] = shared
+    for stage, samples in stages.items():
+        # The first frame allocates the pool's and the store's reusable buffers; steady state is what scales
+        steady = samples[1:] or samples
+        report[stage] = {
+            "ms_per_frame": round(sum(s for s, _ in steady) / len(steady) * 1000, 2),
+            "kb_allocated": round(sum(p for _, p in steady) / len(steady) / 1024, 1),
+            "frame_copies": round(sum(p for _, p in steady) / len(steady) / frame_bytes, 2) if frame_bytes else 0.0,
+        }
+    report["frame_copies"] = round(sum(report[stage]["frame_copies"] for stage in stages), 2)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame handoff allocation and copy profile")
+    parser.add_argument("--frames", type=int, default=10, help="Sampled frames per path")
+    parser.add_argument("--stride", type=int, default=15, help="Decoded frames per sampled frame")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--backend", choices=["gemini", "anthropic"], default="gemini")
+    parser.add_argument("--max-copies", type=float, default=1.0,
+                        help="Frame-equivalents the pooled path may allocate per frame")
+    parser.add_argument("--output", help="Also write the results JSON here")
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    seconds = max(1.0, args.frames * args.stride / 30 + 1)
+    video = str(BENCH_DIR / ".cache" / f"synthetic_{width}x{height}_30fps_{seconds:g}s_0.mp4")
+    if not os.path.exists(video):
+        make_video(video, seconds, 30, width, height)
+
+    results: Dict[str, Any] = {"config": {key: value for key, value in vars(args).items() if key != "output"},
+                               "paths": {}}
+    for name, legacy in (("replaced", True), ("pooled", False)):
+        timed = run_path(video, args.frames, args.stride, args.backend, legacy, traced=False)
+        tracemalloc.start()
+        try:
+            report = run_path(video, args.frames, args.stride, args.backend, legacy, traced=True)
+        finally:
+            tracemalloc.stop()
+        for stage in ("decode", "store", "model"):
+            report[stage]["ms_per_frame"] = timed[stage]["ms_per_frame"]
+        results["paths"][name] = report
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    pooled = results["paths"]["pooled"]
+    failures = []
+    if pooled["decode_allocations"] > 1:
+        failures.append(f"{pooled['decode_allocations']} decode buffers allocated for {pooled['frames']} frames")
+    if pooled["frame_copies"] > args.max_copies:
+        failures.append(f"{pooled['frame_copies']} frame copies per frame (limit {args.max_copies})")
+    if not pooled["renditions_shared"]:
+        failures.append("renditions were copied out of the encoder's buffer")
+    if failures:
+        print("Handoff check failed: " + "; ".join(failures))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
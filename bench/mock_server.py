@@ -0,0 +1,197 @@
+"""Local stand-in for the Gemini and Deepgram APIs used by the benchmarks
+
+Serves Gemini's REST generateContent / streamGenerateContent routes and a
+Deepgram-style /v1/speak route, with configurable latency, jitter, 429
+injection and canned responses. Point GeminiVision at it with
+GEMINI_API_ENDPOINT=http://127.0.0.1:<port>.
+
+    python -m bench.mock_server --port 8765 --latency-ms 400 --jitter-ms 150 --error-rate 0.05
+"""
+import io
+import json
+import wave
+import random
+import asyncio
+import argparse
+import threading
+import time
+from typing import Dict, Any, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+DEFAULT_VISION_RESPONSE = {
+    "objects": [
+        {"label": "tomato", "category": "ingredient", "confidence": 0.93},
+        {"label": "red onion", "category": "ingredient", "confidence": 0.88},
+        {"label": "olive oil", "category": "ingredient", "confidence": 0.71},
+    ]
+}
+
+DEFAULT_CHAT_RESPONSE = "Nice haul! How about a quick tomato and onion bruschetta? Want the steps?"
+
+class MockConfig:
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 100, error_rate: float = 0.0,
+                 vision_response: Optional[Dict[str, Any]] = None, chat_response: str = DEFAULT_CHAT_RESPONSE,
+                 seed: Optional[int] = None):
+        """Behaviour of the mock server
+
+        Args:
+            latency_ms: Mean response latency
+            jitter_ms: Uniform jitter added to or removed from the latency
+            error_rate: Fraction of requests answered with 429 RESOURCE_EXHAUSTED
+            vision_response: Canned JSON returned for requests that carry an image
+            chat_response: Canned text returned for text-only requests
+            seed: Seed for the latency/error random generator
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.vision_response = vision_response or DEFAULT_VISION_RESPONSE
+        self.chat_response = chat_response
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.errors = 0
+
+    def delay(self) -> float:
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+def _has_image(body: Dict[str, Any]) -> bool:
+    for content in body.get("contents", []):
+        for part in content.get("parts", []):
+            if "inlineData" in part or "inline_data" in part:
+                return True
+    return False
+
+def _candidate(text: str, finish: bool = True) -> Dict[str, Any]:
+    candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return candidate
+
+def _usage(prompt_tokens: int, response_text: str) -> Dict[str, int]:
+    response_tokens = max(1, len(response_text) // 4)
+    return {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": response_tokens,
+        "totalTokenCount": prompt_tokens + response_tokens,
+    }
+
+def _rate_limited() -> JSONResponse:
+    return JSONResponse(status_code=429, content={
+        "error": {"code": 429, "message": "Resource has been exhausted (mock)", "status": "RESOURCE_EXHAUSTED"}
+    })
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="ThinkVision mock APIs")
+    app.state.config = config
+
+    @app.post("/v1beta/models/{model_action:path}")
+    async def gemini(model_action: str, request: Request):
+        """Gemini generateContent and streamGenerateContent"""
+        config.requests += 1
+        body = await request.json()
+        await asyncio.sleep(config.delay())
+
+        if config.should_fail():
+            config.errors += 1
+            return _rate_limited()
+
+        text = json.dumps(config.vision_response) if _has_image(body) else config.chat_response
+        prompt_tokens = 258 if _has_image(body) else max(1, len(json.dumps(body)) // 4)
+
+        if model_action.endswith(":streamGenerateContent"):
+            words = text.split(" ")
+
+            async def events():
+                for i, word in enumerate(words):
+                    last = i == len(words) - 1
+                    chunk = {"candidates": [_candidate(word + ("" if last else " "), finish=last)]}
+                    if last:
+                        chunk["usageMetadata"] = _usage(prompt_tokens, text)
+                    yield f"data: {json.dumps(chunk)}\r\n\r\n"
+                    await asyncio.sleep(config.delay() / max(1, len(words)))
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {"candidates": [_candidate(text)], "usageMetadata": _usage(prompt_tokens, text)}
+
+    @app.post("/v1/speak")
+    async def speak(request: Request):
+        """Deepgram-style TTS: returns silence sized to the requested text"""
+        config.requests += 1
+        body = await request.json()
+        await asyncio.sleep(config.delay())
+
+        if config.should_fail():
+            config.errors += 1
+            return _rate_limited()
+
+        # ~60 ms of 16 kHz mono audio per character of input
+        samples = 16000 * 60 * len(body.get("text", "")) // 1000
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(16000)
+            wav.writeframes(b"\x00\x00" * samples)
+        return Response(content=buffer.getvalue(), media_type="audio/wav")
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": config.requests, "errors": config.errors}
+
+    return app
+
+class MockServer:
+    def __init__(self, config: MockConfig, host: str = "127.0.0.1", port: int = 8765):
+        """Run the mock app with uvicorn on a background thread"""
+        self.config = config
+        self.host = host
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(create_app(config), host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self, timeout: float = 10.0):
+        self.thread.start()
+        deadline = time.time() + timeout
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError(f"Mock server did not start on {self.url}")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--vision-response", help="Path to a JSON file returned for image requests")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    vision_response = None
+    if args.vision_response:
+        with open(args.vision_response) as f:
+            vision_response = json.load(f)
+
+    config = MockConfig(args.latency_ms, args.jitter_ms, args.error_rate, vision_response, seed=args.seed)
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
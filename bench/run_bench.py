@@ -0,0 +1,232 @@
+"""Offline end-to-end benchmark for the video pipeline
+
+Drives VideoProcessor.process_video and the /upload + /process endpoints
+of main.py against the local mock server and synthetic videos, reports
+throughput, latency percentiles and peak RSS, and compares them with a
+stored baseline. The endpoint mode needs httpx (for FastAPI's TestClient).
+
+    python -m bench.run_bench                   # run and compare with bench/baseline.json
+    python -m bench.run_bench --save-baseline   # record a new baseline
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import platform
+import resource
+from pathlib import Path
+from typing import Dict, List, Any
+
+from .mock_server import MockConfig, MockServer
+from .synthetic import make_video_set
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+# Metric -> True when higher is better
+COMPARED_METRICS = {
+    "videos_per_min": True,
+    "frames_per_sec": True,
+    "latency_p50_ms": False,
+    "latency_p95_ms": False,
+    "latency_p99_ms": False,
+    "frame_latency_p50_ms": False,
+    "frame_latency_p95_ms": False,
+    "frame_latency_p99_ms": False,
+}
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+def summarize(latencies: List[float], frame_latencies: List[float], frames: int, wall: float) -> Dict[str, Any]:
+    summary = {
+        "videos": len(latencies),
+        "frames": frames,
+        "wall_s": round(wall, 3),
+        "videos_per_min": round(len(latencies) / wall * 60, 3) if wall else 0.0,
+        "frames_per_sec": round(frames / wall, 3) if wall else 0.0,
+    }
+    for pct in (50, 95, 99):
+        summary[f"latency_p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 1)
+    if frame_latencies:
+        for pct in (50, 95, 99):
+            summary[f"frame_latency_p{pct}_ms"] = round(percentile(frame_latencies, pct) * 1000, 1)
+    return summary
+
+async def bench_pipeline(processor, videos: List[str], max_frames: int, concurrency: int) -> Dict[str, Any]:
+    """Run VideoProcessor.process_video directly"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    frame_latencies: List[float] = []
+    frames = 0
+
+    async def run_one(path: str):
+        nonlocal frames
+        async with semaphore:
+            start = last = time.perf_counter()
+            async for result in processor.process_video(path, max_frames=max_frames):
+                now = time.perf_counter()
+                if "summary" not in result:
+                    frame_latencies.append(now - last)
+                    frames += 1
+                last = now
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(path) for path in videos))
+    return summarize(latencies, frame_latencies, frames, time.perf_counter() - start)
+
+def bench_api(videos: List[str]) -> Dict[str, Any]:
+    """Upload and process each video through the FastAPI app in main.py"""
+    from fastapi.testclient import TestClient
+    import main
+
+    video_processor = main.RESOURCES.get("video_processor")
+    video_processor.debug_mode = False
+    video_processor.rate_limit_calls = 0
+    video_processor.call_delay = 0
+
+    client = TestClient(main.app)
+    latencies: List[float] = []
+    frames = 0
+
+    start = time.perf_counter()
+    for path in videos:
+        video_start = time.perf_counter()
+        with open(path, "rb") as f:
+            upload = client.post("/upload", files={"file": (os.path.basename(path), f, "video/mp4")}).json()
+        result = client.post("/process", data={"video_path": upload["file_path"],
+                                                "job_id": upload.get("job_id", "")}).json()
+        latencies.append(time.perf_counter() - video_start)
+        frames += len(result.get("frames", []))
+        # Don't leave benchmark uploads behind
+        Path(upload["file_path"]).unlink(missing_ok=True)
+
+    return summarize(latencies, [], frames, time.perf_counter() - start)
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print the change against the baseline and return the regressions"""
+    regressions = []
+    for mode, metrics in results["modes"].items():
+        base_metrics = baseline.get("modes", {}).get(mode)
+        if not base_metrics:
+            print(f"[{mode}] no baseline recorded")
+            continue
+        for name, higher_is_better in COMPARED_METRICS.items():
+            current, previous = metrics.get(name), base_metrics.get(name)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag = "  REGRESSION"
+                regressions.append(f"{mode}.{name}")
+            print(f"[{mode}] {name:22s} {previous:>10} -> {current:>10} ({change:+.1%}){flag}")
+
+    previous_rss, current_rss = baseline.get("peak_rss_mb"), results["peak_rss_mb"]
+    if previous_rss:
+        change = (current_rss - previous_rss) / previous_rss
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append("peak_rss_mb")
+        print(f"peak_rss_mb {previous_rss} -> {current_rss} ({change:+.1%}){flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ThinkVision pipeline benchmark")
+    parser.add_argument("--mode", choices=["pipeline", "api", "all"], default="all")
+    parser.add_argument("--videos", type=int, default=3, help="Number of synthetic videos")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--max-frames", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    parser.add_argument("--output", help="Also write the results JSON here")
+    args = parser.parse_args()
+
+    # The pipeline writes frames and outputs relative to the repository root
+    os.chdir(REPO_ROOT)
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    videos = make_video_set(str(BENCH_DIR / ".cache"), args.videos, args.seconds, args.fps, width, height)
+
+    server = MockServer(MockConfig(args.latency_ms, args.jitter_ms, args.error_rate, seed=args.seed),
+                        port=args.port).start()
+    os.environ["GEMINI_API_ENDPOINT"] = server.url
+    # Keep benchmark runs out of the real ingredients log
+    os.environ["INGREDIENT_LOG_PATH"] = str(BENCH_DIR / ".cache" / "ingredients.jsonl")
+    os.environ["PANTRY_SNAPSHOT_PATH"] = str(BENCH_DIR / ".cache" / "pantry.json")
+    os.environ.setdefault("GOOGLE_API_KEY", "bench")
+
+    results: Dict[str, Any] = {
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("baseline", "save_baseline", "output", "tolerance", "port")},
+        "modes": {},
+    }
+    try:
+        if args.mode in ("pipeline", "all"):
+            from src.video_processor import VideoProcessor
+            processor = VideoProcessor(debug_mode=False, rate_limit_calls=0, call_delay=0)
+            results["modes"]["pipeline"] = asyncio.run(
+                bench_pipeline(processor, videos, args.max_frames, args.concurrency)
+            )
+        if args.mode in ("api", "all"):
+            results["modes"]["api"] = bench_api(videos)
+    finally:
+        server.stop()
+
+    results["mock_requests"] = server.config.requests
+    results["mock_429s"] = server.config.errors
+    results["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    print(json.dumps(results, indent=2))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print("Warning: baseline was recorded with a different configuration")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+
+if __name__ == "__main__":
+    main()
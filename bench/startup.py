@@ -0,0 +1,126 @@
+"""Cold-start profile for the FastAPI app in main.py
+
+Starts fresh interpreters the way a new uvicorn worker would, imports main
+and runs the app's startup (lifespan) hooks, then reports the cold-start
+time and the slowest imports from `python -X importtime`. Exits non-zero
+when the median cold start is over the target.
+
+    python -m bench.startup                          # profile and check against STARTUP_TARGET_MS
+    python -m bench.startup --warm video_processor   # include building resources at startup
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Any
+
+from .run_bench import REPO_ROOT
+
+# Child process: time the import and the lifespan startup separately
+CHILD = """
+import time, json
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+import asyncio
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter(), main.RESOURCES.loaded()
+ready, resources = asyncio.run(startup())
+print(json.dumps({"import_s": imported - start, "ready_s": ready - start, "resources": resources}))
+"""
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Rows of -X importtime output: module, self/cumulative ms and nesting depth"""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({"module": module, "self_ms": int(self_us) / 1000,
+                         "cumulative_ms": int(cumulative_us) / 1000, "depth": len(indent) // 2})
+    return rows
+
+def run_once(warm: str, profile: bool) -> Dict[str, Any]:
+    env = dict(os.environ, WARM_RESOURCES=warm)
+    command = [sys.executable] + (["-X", "importtime"] if profile else []) + ["-c", CHILD]
+    completed = subprocess.run(command, cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"App startup failed:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if profile:
+        result["imports"] = parse_importtime(completed.stderr)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="ThinkVision app cold-start profile")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--warm", default="", help="WARM_RESOURCES for the runs, e.g. video_processor,pantry")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--target-ms", type=float, default=float(os.getenv("STARTUP_TARGET_MS", "1000")),
+                        help="Cold start (import + startup hooks) allowed, median over runs")
+    parser.add_argument("--output", help="Also write the results JSON here")
+    args = parser.parse_args()
+
+    # The profiled run is reported separately; -X importtime itself slows the import down
+    profiled = run_once(args.warm, profile=True)
+    runs = [run_once(args.warm, profile=False) for _ in range(args.runs)]
+    ready_ms = [run["ready_s"] * 1000 for run in runs]
+    import_ms = [run["import_s"] * 1000 for run in runs]
+
+    imports = profiled["imports"]
+    # importtime lists a module's imports before the module itself, so main's direct
+    # imports are the depth-one rows between the previous top-level row and main
+    direct, group = [], []
+    for row in imports:
+        if row["depth"] == 0:
+            if row["module"] == "main":
+                direct = [child for child in group if child["depth"] == 1]
+            group = []
+        else:
+            group.append(row)
+    # Top-level imports after main are the lazy ones made by startup hooks (WARM_RESOURCES)
+    main_index = next((i for i, row in enumerate(imports) if row["module"] == "main"), len(imports))
+    lazy = [row for row in imports[main_index + 1:] if row["depth"] == 0]
+    results = {
+        "runs": args.runs,
+        "warm": args.warm,
+        "import_ms_p50": round(statistics.median(import_ms), 1),
+        "ready_ms_p50": round(statistics.median(ready_ms), 1),
+        "ready_ms_max": round(max(ready_ms), 1),
+        "target_ms": args.target_ms,
+        "resources": runs[-1]["resources"],
+        "main_imports": sorted(direct, key=lambda row: -row["cumulative_ms"])[:args.top],
+        "startup_imports": sorted(lazy, key=lambda row: -row["cumulative_ms"])[:args.top],
+        "slowest_modules": sorted(imports, key=lambda row: -row["self_ms"])[:args.top],
+    }
+
+    print(f"Cold start: import {results['import_ms_p50']} ms, ready {results['ready_ms_p50']} ms "
+          f"(p50 of {args.runs}, max {results['ready_ms_max']} ms, target {args.target_ms:.0f} ms)")
+    print(f"Resources built at startup: {results['resources'] or 'none'}")
+    print("\nImports by main (cumulative ms):")
+    for row in results["main_imports"]:
+        print(f"  {row['cumulative_ms']:9.1f}  {row['module']}")
+    if results["startup_imports"]:
+        print("\nImported by startup hooks (cumulative ms):")
+        for row in results["startup_imports"]:
+            print(f"  {row['cumulative_ms']:9.1f}  {row['module']}")
+    print("\nSlowest modules (self ms):")
+    for row in results["slowest_modules"]:
+        print(f"  {row['self_ms']:9.1f}  {row['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if results["ready_ms_p50"] > args.target_ms:
+        print(f"\nFAIL: cold start {results['ready_ms_p50']} ms is over the {args.target_ms:.0f} ms target")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
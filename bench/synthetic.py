@@ -0,0 +1,65 @@
+import os
+import cv2
+import numpy as np
+from typing import List
+
+# (name, BGR colour) of the "ingredients" drawn into synthetic frames
+SHAPES = [
+    ("tomato", (40, 40, 220)),
+    ("lettuce", (60, 200, 60)),
+    ("lemon", (40, 220, 240)),
+    ("eggplant", (120, 40, 90)),
+    ("carrot", (30, 130, 250)),
+]
+
+def make_video(path: str, seconds: float = 10.0, fps: int = 30, width: int = 1280, height: int = 720,
+               seed: int = 0) -> str:
+    """Write a synthetic cooking clip: a textured counter with moving coloured shapes
+
+    Args:
+        path: Output .mp4 path
+        seconds: Clip duration
+        fps: Frames per second
+        width: Frame width
+        height: Frame height
+        seed: Seed for shape placement, so the same arguments give the same clip
+
+    Returns:
+        The output path
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # Static noisy background so the encoder has realistic work to do
+    background = rng.integers(90, 140, size=(height, width, 3), dtype=np.uint8)
+    background = cv2.GaussianBlur(background, (7, 7), 0)
+
+    positions = rng.uniform([0, 0], [width, height], size=(len(SHAPES), 2))
+    velocities = rng.uniform(-4, 4, size=(len(SHAPES), 2))
+    radius = max(10, min(width, height) // 12)
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    try:
+        for _ in range(int(seconds * fps)):
+            frame = background.copy()
+            positions = (positions + velocities) % [width, height]
+            for (name, colour), (x, y) in zip(SHAPES, positions):
+                cv2.circle(frame, (int(x), int(y)), radius, colour, -1)
+                cv2.putText(frame, name, (int(x) - radius, int(y) + radius + 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+    return path
+
+def make_video_set(directory: str, count: int = 3, seconds: float = 10.0, fps: int = 30,
+                   width: int = 1280, height: int = 720) -> List[str]:
+    """Generate (or reuse) a set of synthetic clips with fixed seeds"""
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"synthetic_{width}x{height}_{fps}fps_{seconds:g}s_{i}.mp4")
+        if not os.path.exists(path):
+            make_video(path, seconds, fps, width, height, seed=i)
+        paths.append(path)
+    return paths
@@ -3,6 +3,7 @@ from deepgram.utils import verboselogs
 import wave
 import datetime
 import os
+import sys
 from dotenv import load_dotenv
 import re
 from deepgram import (
@@ -72,11 +73,15 @@ def talk(TTS_TEXT):
     except Exception as e:
         print(f"TTS Error: {e}")
 
-ingredients = []
-for file in os.listdir("../output"):
-    if file.endswith(".json"):
-        data = json.load(open(f"../output/{file}"))
-        ingredients.extend([i for i in data["ingredients"] if i not in ingredients and "unknown" not in i])
+# The pantry snapshot only folds in runs logged since the last refresh
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+from vocabulary import get_vocabulary
+from ingredient_log import IngredientLog, Pantry
+
+# Older ingredients_*.json runs need a one-off `python -m src.ingredient_log import-legacy` first
+ingredient_log = IngredientLog("../output/ingredients.jsonl")
+pantry = Pantry(ingredient_log, "../output/pantry.json", normalize=get_vocabulary().normalize_batch)
+ingredients = pantry.ingredients()
 
 print(ingredients)
 print(len(ingredients))
@@ -1,21 +1,64 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI, UploadFile, File, Request, Form
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-from src.video_processor import VideoProcessor
+from src.metrics import render_metrics, STARTUP_SECONDS
+from src.tracing import span, get_trace, new_job_id
+from src.ingredient_log import IngredientLog, Pantry
+from src.resources import RESOURCES
 import tempfile
 import aiofiles
 from pathlib import Path
 from datetime import datetime
-import time
 import json
 
 load_dotenv()
 
-app = FastAPI(title="Ingredient Detection Assistant")
+# Append-only run history; cheap, so it is opened at import
+ingredient_log = IngredientLog(os.getenv("INGREDIENT_LOG_PATH", "output/ingredients.jsonl"))
+
+# Heavy resources (cv2, numpy, the vision backends) are built on first use, not at import
+def _video_processor():
+    from src.video_processor import VideoProcessor
+    return VideoProcessor(debug_mode=True)
+
+def _frame_store():
+    from src.frame_store import FRAME_STORE
+    return FRAME_STORE
+
+def _pantry():
+    # Compacted pantry view kept current from the ingredients log
+    # Old ingredients_*.json files are imported explicitly: python -m src.ingredient_log import-legacy
+    from src.vocabulary import get_vocabulary
+    return Pantry(ingredient_log, os.getenv("PANTRY_SNAPSHOT_PATH", "output/pantry.json"),
+                  normalize=get_vocabulary().normalize_batch)
+
+def _storage():
+    from src.storage import ObjectStorage
+    return ObjectStorage(os.getenv("DATABASE_URL", "sqlite:///objects.db"))
+
+RESOURCES.register("video_processor", _video_processor)
+RESOURCES.register("storage", _storage)
+RESOURCES.register("frame_store", _frame_store)
+RESOURCES.register("pantry", _pantry)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # WARM_RESOURCES=video_processor,pantry builds those before the first request instead
+    await RESOURCES.warm(name.strip() for name in os.getenv("WARM_RESOURCES", "").split(",") if name.strip())
+    STARTUP_SECONDS.set(time.perf_counter() - _IMPORT_STARTED)
+    yield
+    RESOURCES.close()
+
+app = FastAPI(title="Ingredient Detection Assistant", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -40,8 +83,6 @@ app.mount("/temp", StaticFiles(directory="temp"), name="temp")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/output", StaticFiles(directory="output"), name="output")
 
-video_processor = VideoProcessor(debug_mode=True)
-
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """Serve the main application interface"""
@@ -242,6 +283,7 @@ async def root():
                 <div class="step-container">
                     <div class="step-title">Step 2: Process Video</div>
                     <button id="processBtn" class="btn" disabled>Process Video</button>
+                    <label><input type="checkbox" id="forceReprocess"> Reprocess even if this video was seen before</label>
                     <div id="processError" class="error-message"></div>
                     <div id="progressContainer" class="progress-container">
                         <div>Processing video... <span id="progressText">0%</span></div>
@@ -266,6 +308,7 @@ async def root():
         <script>
             // Global variables
             let uploadedVideoPath = '';
+            let uploadedJobId = '';
             let jsonFilePath = '';
             
             // DOM elements
@@ -322,6 +365,7 @@ async def root():
                     // Update UI
                     uploadBtn.textContent = 'Upload Complete';
                     uploadedVideoPath = data.file_path;
+                    uploadedJobId = data.job_id;
                     
                     // Show video preview
                     videoPreview.src = `/temp/${data.filename}`;
@@ -357,6 +401,10 @@ async def root():
                 // Create form data
                 const formData = new FormData();
                 formData.append('video_path', uploadedVideoPath);
+                if (uploadedJobId) {
+                    formData.append('job_id', uploadedJobId);
+                }
+                formData.append('force', document.getElementById('forceReprocess').checked);
                 
                 // Process video
                 fetch('/process', {
@@ -375,7 +423,7 @@ async def root():
                     }
                     
                     // Update UI
-                    processBtn.textContent = 'Processing Complete';
+                    processBtn.textContent = data.duplicate_of ? 'Already Processed' : 'Processing Complete';
                     progressBar.style.width = '100%';
                     progressText.textContent = '100%';
                     
@@ -391,6 +439,10 @@ async def root():
                         jsonInfo.style.display = 'block';
                         jsonPath.textContent = `JSON file saved to: ${data.json_file}`;
                     }
+                    if (data.duplicate_of) {
+                        jsonInfo.style.display = 'block';
+                        jsonPath.textContent = `Results reused from an earlier upload of this video (${data.duplicate_of.match} match)`;
+                    }
                 })
                 .catch(error => {
                     showError(processError, `Error processing video: ${error.message}`);
@@ -414,9 +466,20 @@ async def root():
                     
                     const frameImage = document.createElement('img');
                     frameImage.className = 'frame-image';
-                    frameImage.src = frame.frame;
+                    frameImage.src = frame.thumbnail || frame.frame;
+                    if (frame.thumbnail) {
+                        frameImage.srcset = `${frame.thumbnail} 480w, ${frame.frame} 960w`;
+                        frameImage.sizes = '(max-width: 600px) 100vw, 480px';
+                    }
+                    frameImage.loading = 'lazy';
                     frameImage.alt = 'Processed Frame';
                     
+                    // The card image opens the full-size frame
+                    const frameLink = document.createElement('a');
+                    frameLink.href = frame.full || frame.frame;
+                    frameLink.target = '_blank';
+                    frameLink.appendChild(frameImage);
+                    
                     const frameDetails = document.createElement('div');
                     frameDetails.className = 'frame-details';
                     
@@ -450,7 +513,10 @@ async def root():
                     frameDetails.appendChild(ingredientsTitle);
                     frameDetails.appendChild(ingredientsList);
                     
-                    frameCard.appendChild(frameImage);
+                    // Results reused for a duplicate upload carry no frame images
+                    if (frame.frame) {
+                        frameCard.appendChild(frameLink);
+                    }
                     frameCard.appendChild(frameDetails);
                     
                     framesContainer.appendChild(frameCard);
@@ -492,6 +558,7 @@ async def root():
 @app.post("/upload")
 async def upload_video(file: UploadFile = File(...)):
     """Upload a video file and save it to the temp directory"""
+    job_id = new_job_id()
     try:
         # Create a unique filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -499,15 +566,17 @@ async def upload_video(file: UploadFile = File(...)):
         file_path = f"temp/{filename}"
         
         # Save the uploaded file
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
+        with span("upload", job_id, filename=filename):
+            async with aiofiles.open(file_path, 'wb') as out_file:
+                content = await file.read()
+                await out_file.write(content)
         
         return JSONResponse({
             "status": "success",
             "message": "Video uploaded successfully",
             "file_path": file_path,
-            "filename": filename
+            "filename": filename,
+            "job_id": job_id
         })
         
     except Exception as e:
@@ -517,9 +586,29 @@ async def upload_video(file: UploadFile = File(...)):
             "message": f"Failed to upload video: {str(e)}"
         }, status_code=500)
 
+FRAME_URL_KEYS = ("frame", "thumbnail", "full")
+
+def without_frame_urls(results: dict) -> dict:
+    """Results with the frame image URLs left out
+
+    The URLs point into the processing job's in-memory frame store, so they
+    are gone long before a duplicate upload is answered from stored results.
+    """
+    frames = [{key: value for key, value in frame.items() if key not in FRAME_URL_KEYS}
+              for frame in results.get("frames", [])]
+    return {**results, "frames": frames}
+
 @app.post("/process")
-async def process_video(video_path: str = Form(...)):
-    """Process a video file and extract ingredients from frames"""
+async def process_video(video_path: str = Form(...), job_id: str = Form(None),
+                        max_cost: float = Form(None), max_latency: float = Form(None), force: bool = Form(False)):
+    """Process a video file and extract ingredients from frames
+
+    max_cost (estimated USD) and max_latency (seconds) cap how many frames are analysed.
+    A video already processed (same file, or the same clip re-encoded) returns the
+    stored results with "duplicate_of" set, unless force is true.
+    """
+    # Reuse the upload's job id so the upload span lands in the same trace
+    job_id = job_id or new_job_id()
     try:
         if not os.path.exists(video_path):
             return JSONResponse(
@@ -527,41 +616,51 @@ async def process_video(video_path: str = Form(...)):
                 content={"error": f"Video file not found: {video_path}"}
             )
             
+        # Look the upload up by content before spending any model calls on it
+        from src.fingerprint import fingerprint_video
+        storage = await RESOURCES.aget("storage")
+        with span("fingerprint", job_id):
+            fingerprint = await asyncio.to_thread(fingerprint_video, video_path)
+        if not force:
+            duplicate = await storage.find_duplicate(fingerprint)
+            if duplicate:
+                print(f"{video_path} matches video {duplicate['video_id']} ({duplicate['match']}); returning stored results")
+                return {**without_frame_urls(duplicate["results"]), "job_id": job_id,
+                        "duplicate_of": {key: duplicate[key] for key in ("video_id", "match", "distance")}}
+        video_id = await storage.start_video(os.path.basename(video_path), fingerprint.frame_count,
+                                             fingerprint=fingerprint)
+            
         # Process video with VideoProcessor
         frames = []
         unique_ingredients = []
+        ingredient_details = []
         
-        async for result in video_processor.process_video(video_path):
+        video_processor = await RESOURCES.aget("video_processor")
+        async for result in video_processor.process_video(video_path, job_id=job_id,
+                                                            max_cost=max_cost, max_latency=max_latency):
             if "summary" in result:
                 # This is the final summary result
                 unique_ingredients = result.get("unique_ingredients", [])
+                ingredient_details = result.get("ingredients", [])
                 
-                # Save ingredients to JSON file
-                ingredients_data = {
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "video_path": video_path,
-                    "ingredients": unique_ingredients
-                }
-                
-                # Create output directory if it doesn't exist
-                os.makedirs("output", exist_ok=True)
-                
-                # Generate a filename based on timestamp
-                json_filename = f"output/ingredients_{time.strftime('%Y%m%d_%H%M%S')}.json"
-                
-                # Write to JSON file
-                with open(json_filename, "w") as f:
-                    json.dump(ingredients_data, f, indent=4)
+                # Append the run to the ingredients log; the run id is the job id
+                with span("store", job_id, target="log"):
+                    ingredient_log.append(video_path, unique_ingredients, ingredient_details, run_id=job_id)
+                    (await RESOURCES.aget("pantry")).refresh()
                 
-                print(f"Ingredients saved to {json_filename}")
+                print(f"Ingredients appended to {ingredient_log.path} (run {job_id})")
                 
-                # Add the JSON file path to the result
-                result["json_file"] = json_filename
+                # Add the log path to the result
+                result["json_file"] = ingredient_log.path
             else:
                 # This is a frame result
                 frames.append(result)
+                await storage.store_objects(result["frame_number"], datetime.now(), result["ingredients"],
+                                            video_id=video_id, frame_size=(result.get("width"), result.get("height")))
         
-        return {"frames": frames, "unique_ingredients": unique_ingredients, "json_file": json_filename if 'json_filename' in locals() else None}
+        response = {"frames": frames, "unique_ingredients": unique_ingredients, "ingredient_details": ingredient_details, "json_file": ingredient_log.path, "run_id": job_id, "job_id": job_id}
+        await storage.save_results(video_id, without_frame_urls(response))
+        return response
     except Exception as e:
         print(f"Error processing video: {str(e)}")
         import traceback
@@ -573,8 +672,70 @@ async def process_video(video_path: str = Form(...)):
 
 @app.get("/status")
 async def get_status():
-    """Health check endpoint"""
-    return {"status": "ok"}
+    """Health check endpoint, with the resources built so far"""
+    return {"status": "ok", "resources": RESOURCES.loaded()}
+
+@app.get("/jobs/{job_id}/trace")
+async def get_job_trace(job_id: str):
+    """Return the stage spans of a job as a waterfall"""
+    trace = get_trace(job_id)
+    if trace is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"No trace recorded for job: {job_id}"}
+        )
+    return trace
+
+@app.get("/frames/{job_id}/{frame_number}.jpg")
+async def get_frame(job_id: str, frame_number: int, request: Request):
+    """Serve a sampled frame's medium rendition"""
+    return await get_frame_rendition(job_id, frame_number, "medium", request)
+
+@app.get("/frames/{job_id}/{frame_number}/{rendition}")
+async def get_frame_rendition(job_id: str, frame_number: int, rendition: str, request: Request):
+    """Serve one rendition (thumb, medium or full) of a sampled frame from the in-memory frame store"""
+    frame = (await RESOURCES.aget("frame_store")).get(job_id, frame_number, rendition)
+    if frame is None:
+        return JSONResponse(status_code=404,
+                            content={"error": f"Frame {frame_number} ({rendition}) of job {job_id} not found"})
+
+    # Frames never change once stored, so clients may cache them and revalidate by ETag
+    headers = {"ETag": frame.etag, "Cache-Control": "private, max-age=3600, immutable"}
+    if request.headers.get("if-none-match") == frame.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=frame.data, media_type=frame.media_type, headers=headers)
+
+@app.get("/pantry")
+async def get_pantry():
+    """Ingredients seen across all runs, compacted from the ingredients log"""
+    return (await RESOURCES.aget("pantry")).refresh()
+
+@app.get("/objects/where")
+async def where_is(q: str, video_id: int = None):
+    """Latest sighting of an ingredient: frame, box, position in the frame and what was next to it"""
+    location = await (await RESOURCES.aget("storage")).locate(q, video_id)
+    if location is None:
+        return JSONResponse(status_code=404, content={"error": f"No detections of {q!r}"})
+    return location
+
+@app.get("/objects/region")
+async def objects_in_region(x1: float, y1: float, x2: float, y2: float, frame_number: int = None,
+                            video_id: int = None, label: str = None):
+    """Objects whose boxes overlap a region (frame pixels), in one frame or across the video"""
+    storage = await RESOURCES.aget("storage")
+    return await storage.objects_in_region((x1, y1, x2, y2), frame_number, video_id, label)
+
+@app.get("/objects/nearest")
+async def nearest_objects(x: float, y: float, frame_number: int, video_id: int = None, label: str = None,
+                          limit: int = 3):
+    """Objects in a frame nearest to a point (frame pixels)"""
+    storage = await RESOURCES.aget("storage")
+    return await storage.nearest_objects(x, y, frame_number, video_id, label, limit)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8089)
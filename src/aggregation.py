@@ -0,0 +1,99 @@
+from typing import Dict, List, Any, Optional
+from .vocabulary import VocabularyIndex, get_vocabulary
+
+class IngredientAggregator:
+    def __init__(self, vocabulary: Optional[VocabularyIndex] = None, max_frame_refs: Optional[int] = None):
+        """Merge per-frame detections into one ingredient list for a video
+
+        Labels are mapped to canonical names by the shared vocabulary index.
+        Confidence is fused with a noisy-OR, so repeated sightings raise it
+        while a single low-confidence detection stays low.
+
+        Args:
+            vocabulary: Index used to canonicalize labels (the shared one by default)
+            max_frame_refs: Frames listed per ingredient; later sightings are only
+                counted, so long videos don't grow the summary without bound
+        """
+        self.vocabulary = vocabulary or get_vocabulary()
+        self.max_frame_refs = max_frame_refs
+        self.ingredients: Dict[str, Dict[str, Any]] = {}
+        self.frames_seen = 0
+
+    def add(self, detections: List[Dict[str, Any]], frame_index: int, timestamp: Optional[float]) -> List[str]:
+        """Fold one frame's detections in and return the canonical labels seen for the first time"""
+        self.frames_seen += 1
+        new_labels = []
+        canonical_labels = self.vocabulary.normalize_batch(str(detection.get("label", "")) for detection in detections)
+        for detection, label in zip(detections, canonical_labels):
+            if not label:
+                continue
+            detection["canonical"] = label
+            confidence = float(detection.get("confidence", 0.5))
+
+            entry = self.ingredients.get(label)
+            if entry is None:
+                entry = self.ingredients[label] = {
+                    "label": label,
+                    "aliases": set(),
+                    "detections": 0,
+                    "frames": [],
+                    "frame_count": 0,
+                    "last_frame": None,
+                    "miss_probability": 1.0,
+                    "max_confidence": 0.0,
+                    "first_seen": timestamp,
+                    "last_seen": timestamp,
+                }
+                new_labels.append(label)
+
+            entry["aliases"].add(str(detection.get("label", "")).strip().lower())
+            entry["detections"] += 1
+            if entry["last_frame"] != frame_index:
+                entry["last_frame"] = frame_index
+                entry["frame_count"] += 1
+                if self.max_frame_refs is None or len(entry["frames"]) < self.max_frame_refs:
+                    entry["frames"].append(frame_index)
+            entry["miss_probability"] *= 1 - min(max(confidence, 0.0), 1.0)
+            entry["max_confidence"] = max(entry["max_confidence"], confidence)
+            entry["last_seen"] = timestamp
+        return new_labels
+
+    def labels(self) -> List[str]:
+        return list(self.ingredients)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Aggregated ingredients, most confident first"""
+        result = []
+        for entry in self.ingredients.values():
+            result.append({
+                "label": entry["label"],
+                "aliases": sorted(entry["aliases"]),
+                "confidence": round(1 - entry["miss_probability"], 4),
+                "max_confidence": round(entry["max_confidence"], 4),
+                "detections": entry["detections"],
+                "frames": list(entry["frames"]),
+                "frame_count": entry["frame_count"],
+                "first_seen": entry["first_seen"],
+                "last_seen": entry["last_seen"],
+            })
+        result.sort(key=lambda item: (-item["confidence"], item["label"]))
+        return result
+
+class StabilityMonitor:
+    def __init__(self, patience: int = 3, min_frames: int = 3):
+        """Signal when the ingredient set has stopped changing
+
+        Args:
+            patience: Consecutive analysed frames without a new ingredient before stopping
+            min_frames: Frames to analyse before stopping is considered at all
+        """
+        self.patience = patience
+        self.min_frames = min_frames
+        self.frames = 0
+        self.stale_frames = 0
+
+    def update(self, new_labels: List[str]) -> bool:
+        """Record one analysed frame; True when sampling can stop"""
+        self.frames += 1
+        self.stale_frames = 0 if new_labels else self.stale_frames + 1
+        return self.frames >= self.min_frames and self.stale_frames >= self.patience
@@ -1,59 +1,27 @@
 import base64
 import cv2
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import json
 import re
 import time
 import os
 from anthropic import Anthropic
 from dotenv import load_dotenv
+from .metrics import FRAME_ENCODE_SECONDS, MODEL_LATENCY_SECONDS, API_CALLS, ERRORS, RETRIES, PARSE_SECONDS
+from .response_parser import OBJECTS_SCHEMA, provider_schema, parse_objects, parse_data
+from .tracing import span
+from .resilience import vision_caller
+from .frame_pool import encode_image
 
-class AnthropicVision:
-    def __init__(self):
-        """Initialize Anthropic Vision API"""
-        try:
-            # Load environment variables
-            load_dotenv()
-            api_key = os.getenv('ANTHROPIC_API_KEY')
-            if not api_key:
-                raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-            
-            # Initialize Anthropic client
-            self.client = Anthropic(api_key=api_key)
-            print("Anthropic Vision API initialized successfully")
-        except Exception as e:
-            print(f"Error initializing Anthropic Vision: {e}")
-            raise
+# Forcing this tool makes Claude return the detections as schema-shaped tool input
+REPORT_OBJECTS_TOOL = {
+    "name": "report_objects",
+    "description": "Report every ingredient, food or cooking item visible in the image.",
+    "input_schema": provider_schema(OBJECTS_SCHEMA),
+}
 
-    async def process_frame(self, frame: np.ndarray) -> List[Dict[Any, Any]]:
-        """Process a frame through Anthropic's Vision-Language Model"""
-        try:
-            # Convert frame to RGB for better analysis
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Convert frame to base64
-            _, buffer = cv2.imencode('.jpg', frame_rgb)
-            img_base64 = base64.b64encode(buffer).decode('utf-8')
-            
-            # Call Anthropic API with improved prompt
-            response = self.client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=1000,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/jpeg",
-                                "data": img_base64
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": """Analyze this image and identify ALL visible ingredients, foods, or cooking items.
+ANALYSIS_PROMPT = """Analyze this image and identify ALL visible ingredients, foods, or cooking items.
 For each item found, provide:
 - Name of the item
 - Its state or condition
@@ -80,77 +48,161 @@ IMPORTANT:
 - Include items even with lower confidence (0.3+)
 - Always use the exact field names shown above
 - If no items found, return empty objects array"""
-                        }
-                    ]
-                }]
-            )
-            
-            # Print full Claude response for debugging
-            print("=== CLAUDE RESPONSE START ===")
-            print(response.content)
-            print("=== CLAUDE RESPONSE END ===")
+
+class AnthropicVision:
+    def __init__(self, max_parse_retries: int = 1, model_name: str = "claude-3-opus-20240229", name: str = "anthropic",
+                 cost_per_call: float = 0.03, calls_per_minute: int = 50):
+        """Initialize Anthropic Vision API
+
+        Args:
+            max_parse_retries: Extra model calls allowed when a response cannot be parsed at all
+            model_name: Claude model used for image analysis
+            name: Backend name used by the router and in metrics labels
+            cost_per_call: Approximate USD cost of one frame request, used by the router
+            calls_per_minute: Request quota for this model, used by the router
+        """
+        self.max_parse_retries = max_parse_retries
+        self.model_name = model_name
+        self.name = name
+        self.cost_per_call = cost_per_call
+        self.calls_per_minute = calls_per_minute
+        self.caller = vision_caller(name)
+        try:
+            # Load environment variables
+            load_dotenv()
+            api_key = os.getenv('ANTHROPIC_API_KEY')
+            if not api_key:
+                raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
             
+            # Initialize Anthropic client
+            self.client = Anthropic(api_key=api_key)
+            print("Anthropic Vision API initialized successfully")
+        except Exception as e:
+            print(f"Error initializing Anthropic Vision: {e}")
+            raise
+
+    async def process_frame(self, frame: np.ndarray, debug_mode=True, encoded: memoryview = None) -> List[Dict[Any, Any]]:
+        """Process a frame through Anthropic's Vision-Language Model"""
+        try:
+            return await self.detect(frame, debug_mode, encoded)
+        except Exception as e:
+            print(f"Error in process_frame: {e}")
+            return []
+
+    async def detect(self, frame: np.ndarray, debug_mode=True, encoded: memoryview = None) -> List[Dict[Any, Any]]:
+        """Like process_frame, but API errors propagate so a router can fall back to another backend
+
+        encoded is the frame already encoded as JPEG; it is base64'd straight from the shared buffer.
+        """
+        # OpenCV encodes BGR itself; converting to RGB first would swap the colours in the JPEG
+        if encoded is None:
+            with FRAME_ENCODE_SECONDS.time(backend=self.name), span("encode", target=self.name):
+                encoded = encode_image(frame)
+        img_base64 = base64.b64encode(encoded).decode('utf-8')
+        
+        # Call Anthropic API with improved prompt
+        request = dict(
+            model=self.model_name,
+            max_tokens=1000,
+            tools=[REPORT_OBJECTS_TOOL],
+            tool_choice={"type": "tool", "name": REPORT_OBJECTS_TOOL["name"]},
+            messages=[{
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": "image/jpeg",
+                            "data": img_base64
+                        }
+                    },
+                    {
+                        "type": "text",
+                        "text": ANALYSIS_PROMPT
+                    }
+                ]
+            }]
+        )
+
+        for attempt in range(self.max_parse_retries + 1):
+            API_CALLS.inc(backend=self.name)
+            try:
+                with MODEL_LATENCY_SECONDS.time(backend=self.name), span("model_call", backend=self.name):
+                    response = await self.caller.call(lambda: self.client.messages.create(**request))
+            except Exception:
+                ERRORS.inc(backend=self.name)
+                raise
+
+            if debug_mode:
+                # Print full Claude response for debugging
+                print("=== CLAUDE RESPONSE START ===")
+                print(response.content)
+                print("=== CLAUDE RESPONSE END ===")
+
             # Parse the response
-            objects = self._parse_response(response.content[0].text)
-            
+            with PARSE_SECONDS.time(backend=self.name), span("parse", backend=self.name):
+                objects, failed = self._parse_response(response.content, debug_mode)
+
+            if not failed or attempt == self.max_parse_retries:
+                break
+
+            RETRIES.inc(backend=self.name)
+            print(f"Unparseable Claude response, retrying ({attempt + 1}/{self.max_parse_retries})")
+
+        if debug_mode:
             # Print parsed objects
             print("=== PARSED OBJECTS START ===")
             print(json.dumps(objects, indent=2))
             print("=== PARSED OBJECTS END ===")
-            
-            return objects
 
-        except Exception as e:
-            print(f"Error in process_frame: {e}")
-            return []
+        return objects
 
-    def _parse_response(self, response: str) -> List[Dict[Any, Any]]:
-        """Parse the Anthropic API response into structured object data"""
-        try:
-            # Find JSON in the response using regex
-            json_match = re.search(r'\{[\s\S]*\}', response)
-            if not json_match:
-                print("No JSON found in response")
-                return []
-                
-            json_str = json_match.group(0)
+    def _parse_response(self, content, debug_mode=True) -> Tuple[List[Dict[Any, Any]], bool]:
+        """Parse the Anthropic response content into structured object data
+
+        Returns:
+            The cleaned objects, and whether nothing usable could be parsed
+        """
+        # Prefer the forced tool call; fall back to JSON in the text blocks
+        tool_input = next((block.input for block in content if getattr(block, 'type', None) == 'tool_use'), None)
+        if tool_input is not None:
+            result = parse_data(tool_input, backend=self.name)
+        else:
+            text = "".join(getattr(block, 'text', '') for block in content)
+            result = parse_objects(text, backend=self.name)
+
+        if debug_mode:
+            for error in result.errors:
+                print(f"Response problem ({result.status}): {error}")
+
+        objects = []
+        for obj in result.objects:
             try:
-                data = json.loads(json_str)
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse JSON: {e}")
-                return []
-            
-            if not isinstance(data, dict) or 'objects' not in data:
-                print("Invalid JSON structure")
-                return []
-                
-            objects = []
-            for obj in data['objects']:
-                try:
-                    # Ensure all required fields are present
-                    required_fields = ['label', 'category', 'description', 'confidence', 'bbox']
-                    if not all(field in obj for field in required_fields):
-                        print(f"Missing required fields in object: {obj}")
-                        continue
-                    
-                    # Clean and validate the object data
-                    cleaned_obj = {
-                        'label': str(obj['label']).strip().lower(),
-                        'category': 'ingredient',  # Always set to ingredient
-                        'description': str(obj['description']).strip(),
-                        'confidence': float(min(max(float(obj.get('confidence', 0)), 0), 1)),
-                        'bbox': [int(coord) for coord in obj['bbox']]
-                    }
-                    
-                    objects.append(cleaned_obj)
+                # Only the label is required; the rest defaults like GeminiVision._clean_objects
+                label = str(obj.get('label', '')).strip().lower()
+                if not label:
+                    if debug_mode:
+                        print(f"Skipping object without a label: {obj}")
+                    continue
+
+                cleaned_obj = {
+                    'label': label,
+                    'category': 'ingredient',  # Always set to ingredient
+                    'description': str(obj.get('description', '')).strip(),
+                    'confidence': float(min(max(float(obj.get('confidence', 0.5)), 0), 1)),
+                }
+                if obj.get('bbox') and len(obj['bbox']) == 4:
+                    cleaned_obj['bbox'] = [int(coord) for coord in obj['bbox']]
+
+                objects.append(cleaned_obj)
+                if debug_mode:
                     print(f"Successfully processed object: {cleaned_obj}")
-                except (ValueError, TypeError, KeyError) as e:
+            except (ValueError, TypeError, KeyError) as e:
+                if debug_mode:
                     print(f"Error processing object: {e}")
-                    continue
-            
+                continue
+
+        if debug_mode:
             print(f"Total valid objects found: {len(objects)}")
-            return objects
-            
-        except Exception as e:
-            print(f"Error parsing response: {e}")
-            return []
+        return objects, result.failed
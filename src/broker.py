@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator
+
+# Job statuses after which no more events are published
+TERMINAL_STATUSES = ("complete", "error")
+
+class Broker(ABC):
+    """Job state, results and event fan-out shared by every worker process
+
+    Subclasses store jobs and an ordered event log per channel; subscribe()
+    follows a channel by polling for events past the last sequence number
+    seen, so a websocket on one worker sees events published by another.
+    """
+    poll_interval = 0.05
+
+    @abstractmethod
+    def put_job(self, job_id: str, **fields) -> Dict[str, Any]:
+        """Create or update a job, merging fields into its state"""
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job's current state, or None when it is unknown"""
+
+    @abstractmethod
+    def latest_job(self, status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Most recently updated job, optionally with a given status"""
+
+    @abstractmethod
+    def publish(self, channel: str, message: Dict[str, Any]) -> int:
+        """Append a message to a channel and return its sequence number"""
+
+    @abstractmethod
+    def events(self, channel: str, after: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        """Messages on a channel with sequence numbers above after"""
+
+    @abstractmethod
+    def _version(self) -> Any:
+        """Cheap token that changes whenever anything is published"""
+
+    async def subscribe(self, channel: str, after: int = 0, timeout: Optional[float] = None,
+                        ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (sequence, message) for a channel, replaying from after, until a terminal status or timeout"""
+        deadline = time.monotonic() + timeout if timeout else None
+        version = None
+        while True:
+            current = self._version()
+            if current != version:
+                version = current
+                for seq, message in self.events(channel, after):
+                    after = seq
+                    yield seq, message
+                    if message.get("status") in TERMINAL_STATUSES:
+                        return
+            if deadline and time.monotonic() > deadline:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+class MemoryBroker(Broker):
+    def __init__(self, max_events: int = 10000):
+        """In-process broker: the single-worker default and the stand-in for tests
+
+        Args:
+            max_events: Events kept across all channels; older ones are dropped, so
+                long-running jobs don't grow memory (their results are in storage)
+        """
+        self.max_events = max_events
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._events: List[Tuple[int, str, Dict[str, Any]]] = []
+        # Sequence number of the last dropped event
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def put_job(self, job_id: str, **fields) -> Dict[str, Any]:
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {"job_id": job_id, "created": time.time()})
+            job.update(fields, updated=time.time())
+            return dict(job)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    def latest_job(self, status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if status is None or job.get("status") == status]
+        return dict(max(jobs, key=lambda job: job["updated"])) if jobs else None
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> int:
+        with self._lock:
+            seq = self._dropped + len(self._events) + 1
+            self._events.append((seq, channel, message))
+            overflow = len(self._events) - self.max_events
+            if overflow > 0:
+                del self._events[:overflow]
+                self._dropped += overflow
+            return seq
+
+    def events(self, channel: str, after: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        # Sequence numbers are list positions (past the dropped ones), so skip straight past after
+        with self._lock:
+            events = self._events[max(0, after - self._dropped):]
+        return [(seq, message) for seq, name, message in events if name == channel]
+
+    def _version(self) -> int:
+        return self._dropped + len(self._events)
+
+class SQLiteBroker(Broker):
+    def __init__(self, path: str, poll_interval: float = 0.05, retention: float = 3600):
+        """Broker for several worker processes on one box: SQLite (WAL) plus file notifications
+
+        Publishing touches <path>.notify, so idle subscribers only stat a file
+        each poll and query the database when something was published.
+
+        Args:
+            path: SQLite database file shared by the workers
+            poll_interval: Seconds between notification checks
+            retention: Seconds events are kept before being pruned
+        """
+        self.path = path
+        self.notify_path = path + ".notify"
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        db = self._db()
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS jobs (job_id TEXT PRIMARY KEY, status TEXT, state TEXT, "
+                       "updated REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (status, updated)")
+            db.execute("CREATE TABLE IF NOT EXISTS events (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+                       "channel TEXT, message TEXT, created REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS events_channel ON events (channel, seq)")
+        with open(self.notify_path, "a"):
+            pass
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets readers run alongside the single writer
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def put_job(self, job_id: str, **fields) -> Dict[str, Any]:
+        db = self._db()
+        now = time.time()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT state FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            job = json.loads(row[0]) if row else {"job_id": job_id, "created": now}
+            job.update(fields, updated=now)
+            db.execute("INSERT OR REPLACE INTO jobs (job_id, status, state, updated) VALUES (?, ?, ?, ?)",
+                       (job_id, job.get("status"), json.dumps(job), now))
+        return job
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db().execute("SELECT state FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def latest_job(self, status: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        if status is None:
+            row = self._db().execute("SELECT state FROM jobs ORDER BY updated DESC LIMIT 1").fetchone()
+        else:
+            row = self._db().execute("SELECT state FROM jobs WHERE status = ? ORDER BY updated DESC LIMIT 1",
+                                     (status,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def publish(self, channel: str, message: Dict[str, Any]) -> int:
+        db = self._db()
+        now = time.time()
+        with db:
+            seq = db.execute("INSERT INTO events (channel, message, created) VALUES (?, ?, ?)",
+                             (channel, json.dumps(message), now)).lastrowid
+            if seq % 1000 == 0:
+                db.execute("DELETE FROM events WHERE created < ?", (now - self.retention,))
+        os.utime(self.notify_path)
+        return seq
+
+    def events(self, channel: str, after: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        rows = self._db().execute("SELECT seq, message FROM events WHERE channel = ? AND seq > ? ORDER BY seq",
+                                  (channel, after)).fetchall()
+        return [(seq, json.loads(message)) for seq, message in rows]
+
+    def _version(self) -> Tuple[int, int]:
+        try:
+            stat = os.stat(self.notify_path)
+        except FileNotFoundError:
+            return (0, 0)
+        # mtime granularity can hide two publishes in one tick; re-check each second regardless
+        return (stat.st_mtime_ns, int(time.monotonic()))
+
+def build_broker(url: Optional[str] = None) -> Broker:
+    """Broker from BROKER_URL: "memory" (default, one worker) or "sqlite:///path/to/broker.db" """
+    url = url or os.getenv("BROKER_URL", "memory")
+    if url == "memory":
+        return MemoryBroker(int(os.getenv("BROKER_MAX_EVENTS", "10000")))
+    if url.startswith("sqlite:///"):
+        return SQLiteBroker(url[len("sqlite:///"):])
+    raise ValueError(f"Unsupported BROKER_URL: {url}")
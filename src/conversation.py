@@ -0,0 +1,173 @@
+import datetime
+from typing import Dict, List, Any, Optional
+import google.generativeai as genai
+try:
+    from src.metrics import CACHE_HITS
+    from src.vocabulary import get_vocabulary
+except ImportError:
+    # Run as a script from src/ without the repo root on sys.path
+    from metrics import CACHE_HITS
+    from vocabulary import get_vocabulary
+
+ASSISTANT_RULES = """You are a friendly cooking assistant. Rules:
+1. If user wants meal suggestions, create an innovative recipe using ONLY the available ingredients
+2. Be super casual and friendly, like chatting with a buddy
+3. Keep response under 30 words
+4. Always end with a question about their preferences or if they need more details
+5. Focus on practical, doable suggestions with the ingredients we have"""
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for budgeting"""
+    return max(1, len(text) // 4) if text else 0
+
+class ConversationState:
+    # Provider context caches are rejected below this many tokens
+    MIN_CACHE_TOKENS = 32768
+
+    def __init__(self, model_name: str = 'gemini-2.0-flash', token_budget: int = 800,
+                 keep_recent_turns: int = 4, debug_mode: bool = False):
+        """Initialize the conversation state
+
+        Args:
+            model_name: Gemini model used for replies and summaries
+            token_budget: Estimated history tokens allowed before older turns are summarized
+            keep_recent_turns: Number of most recent turns kept verbatim when compacting
+            debug_mode: Whether to print debug information
+        """
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.debug_mode = debug_mode
+
+        self.context_prefix = ASSISTANT_RULES
+        self.cached_model = None
+        self.summary = ""
+        self.turns: List[Dict[str, str]] = []
+        self.turn_stats: List[Dict[str, Any]] = []
+
+    def set_ingredients(self, labels: List[str]):
+        """Rebuild the reusable ingredient prefix, only when the ingredients change"""
+        # Canonical names, deduplicated while keeping the detection order
+        unique_labels = list(dict.fromkeys(label for label in get_vocabulary().normalize_batch(labels) if label))
+        context_prefix = ASSISTANT_RULES
+        if unique_labels:
+            context_prefix = "Available ingredients: " + ", ".join(unique_labels) + "\n\n" + ASSISTANT_RULES
+
+        if context_prefix == self.context_prefix:
+            return
+
+        self.context_prefix = context_prefix
+        self.cached_model = self._create_cached_model(context_prefix)
+
+    def _create_cached_model(self, context_prefix: str):
+        """Put the prefix in a provider-side context cache when it is supported"""
+        caching = getattr(genai, 'caching', None)
+        if caching is None or estimate_tokens(context_prefix) < self.MIN_CACHE_TOKENS:
+            return None
+
+        try:
+            cache = caching.CachedContent.create(
+                model=self.model_name,
+                system_instruction=context_prefix,
+                ttl=datetime.timedelta(hours=1),
+            )
+            if self.debug_mode:
+                print(f"Created Gemini context cache: {cache.name}")
+            return genai.GenerativeModel.from_cached_content(cached_content=cache)
+        except Exception as e:
+            if self.debug_mode:
+                print(f"Context caching unavailable, sending prefix inline: {e}")
+            return None
+
+    def get_model(self):
+        """Model to call for the next turn"""
+        return self.cached_model or self.model
+
+    def build_contents(self, prompt: str) -> List[Dict[str, Any]]:
+        """Assemble the request contents: prefix, summary, recent turns, new prompt"""
+        preamble = "" if self.cached_model else self.context_prefix
+        if self.summary:
+            preamble += f"\n\nSummary of the conversation so far: {self.summary}"
+
+        contents = []
+        if preamble.strip():
+            contents.append({"role": "user", "parts": [preamble.strip()]})
+            contents.append({"role": "model", "parts": ["Got it."]})
+
+        for turn in self.turns:
+            contents.append({"role": "user", "parts": [turn["user"]]})
+            contents.append({"role": "model", "parts": [turn["model"]]})
+
+        contents.append({"role": "user", "parts": [prompt]})
+        return contents
+
+    def record_turn(self, prompt: str, response_text: str, usage: Optional[Any] = None) -> Dict[str, Any]:
+        """Record a finished turn, report its token counts and compact if needed
+
+        Args:
+            prompt: The prompt sent for this turn (without prefix and history)
+            response_text: Full text of the model reply
+            usage: The response's usage_metadata, when the SDK provides it
+
+        Returns:
+            Token statistics for the turn
+        """
+        history_tokens = self.history_tokens()
+        stats = {
+            "turn": len(self.turn_stats) + 1,
+            "prompt_tokens": getattr(usage, 'prompt_token_count', None),
+            "cached_tokens": getattr(usage, 'cached_content_token_count', None),
+            "response_tokens": getattr(usage, 'candidates_token_count', None),
+            "history_tokens": history_tokens,
+            "estimated": usage is None,
+        }
+        if usage is None:
+            stats["prompt_tokens"] = (estimate_tokens(self.context_prefix) + history_tokens
+                                      + estimate_tokens(prompt))
+            stats["response_tokens"] = estimate_tokens(response_text)
+        self.turn_stats.append(stats)
+        if stats["cached_tokens"]:
+            CACHE_HITS.inc(backend="gemini")
+
+        label = "~" if stats["estimated"] else ""
+        print(f"Turn {stats['turn']} tokens: prompt={label}{stats['prompt_tokens']} "
+              f"response={label}{stats['response_tokens']} history~{history_tokens}")
+
+        self.turns.append({"user": prompt, "model": response_text})
+        if self.history_tokens() > self.token_budget:
+            self.compact()
+
+        return stats
+
+    def history_tokens(self) -> int:
+        """Estimated tokens of the summary plus the verbatim turns"""
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(turn["user"]) + estimate_tokens(turn["model"]) for turn in self.turns
+        )
+
+    def compact(self):
+        """Fold all but the most recent turns into the running summary"""
+        if len(self.turns) <= self.keep_recent_turns:
+            return
+
+        cutoff = len(self.turns) - self.keep_recent_turns
+        older, recent = self.turns[:cutoff], self.turns[cutoff:]
+        transcript = "\n".join(f"User: {turn['user']}\nAssistant: {turn['model']}" for turn in older)
+
+        prompt = f"""Summarize this cooking conversation in under 60 words.
+Keep the user's preferences, the dishes discussed and any decisions made.
+
+Previous summary: {self.summary or "(none)"}
+
+{transcript}"""
+
+        try:
+            response = self.model.generate_content(prompt)
+            self.summary = response.text.strip()
+            self.turns = recent
+            if self.debug_mode:
+                print(f"Compacted {len(older)} turns into summary: {self.summary}")
+        except Exception as e:
+            # Keep the full history rather than lose context
+            print(f"Error summarizing conversation: {e}")
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from .metrics import FRAME_BUFFER_ALLOCATIONS
+
+def encode_image(frame: np.ndarray, extension: str = ".jpg", params: Sequence[int] = (cv2.IMWRITE_JPEG_QUALITY, 90)
+                 ) -> memoryview:
+    """Encode a BGR frame once and return a view of the encoder's output
+
+    cv2.imencode already writes into a NumPy array, so the view is handed to
+    the frame store, the /frames responses, spill files and model requests as
+    is rather than copied out with tobytes(). No RGB conversion is needed:
+    OpenCV encodes BGR directly.
+    """
+    ok, buffer = cv2.imencode(extension, frame, list(params))
+    if not ok:
+        raise ValueError(f"Could not encode a {frame.shape[1]}x{frame.shape[0]} frame as {extension}")
+    # Flat bytes whatever shape this OpenCV version gives the buffer ((n,) or (n, 1))
+    return memoryview(buffer).cast("B")
+
+class FramePool:
+    def __init__(self, size: int = 1):
+        """Preallocated decode buffers that VideoCapture.read fills in place
+
+        A decoded 720p frame is 2.7 MB, and allocating a fresh one for every
+        sampled frame of every job adds up in memory bandwidth. read() decodes
+        into the pool's buffers in turn instead, so a frame is only valid until
+        size more frames have been read: anything kept longer (tracker state,
+        encoded renditions, model payloads) must be derived from it, not a
+        reference to it.
+
+        Args:
+            size: Buffers in rotation, i.e. frames that may be in use at once
+        """
+        self.size = max(1, size)
+        self.allocations = 0
+        self.reads = 0
+        self._buffers: List[Optional[np.ndarray]] = [None] * self.size
+        self._next = 0
+
+    def read(self, cap: cv2.VideoCapture) -> Tuple[bool, Optional[np.ndarray]]:
+        """cap.read() into the next buffer of the pool"""
+        return self._fill(cap.read)
+
+    def retrieve(self, cap: cv2.VideoCapture) -> Tuple[bool, Optional[np.ndarray]]:
+        """cap.retrieve() of the last grabbed frame into the next buffer of the pool"""
+        return self._fill(cap.retrieve)
+
+    def _fill(self, decode) -> Tuple[bool, Optional[np.ndarray]]:
+        buffer = self._buffers[self._next]
+        ok, frame = decode(buffer) if buffer is not None else decode()
+        if not ok:
+            return False, None
+        if frame is not buffer:
+            # First frame, or the stream changed size: OpenCV allocated a new array, which is reused from now on
+            self._buffers[self._next] = frame
+            self.allocations += 1
+            FRAME_BUFFER_ALLOCATIONS.inc()
+        self.reads += 1
+        self._next = (self._next + 1) % self.size
+        return True, frame
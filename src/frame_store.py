@@ -0,0 +1,170 @@
+import os
+import cv2
+import shutil
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Iterable, Union
+from .frame_pool import encode_image
+from .metrics import CACHE_HITS, FRAME_STORE_BYTES
+
+# name -> (max width or None for full size, file extension, encode params)
+RENDITIONS = {
+    "thumb": (480, ".webp", [cv2.IMWRITE_WEBP_QUALITY, 70]),
+    "medium": (960, ".jpg", [cv2.IMWRITE_JPEG_QUALITY, 80]),
+    "full": (None, ".jpg", [cv2.IMWRITE_JPEG_QUALITY, 90]),
+}
+
+MEDIA_TYPES = {".webp": "image/webp", ".jpg": "image/jpeg"}
+
+class StoredFrame:
+    def __init__(self, data: Union[bytes, memoryview], etag: str, media_type: str = "image/jpeg"):
+        """An encoded rendition of a frame and its validator
+
+        Freshly encoded renditions hold a memoryview of the encoder's output,
+        shared with responses, spill files and model requests without copying.
+        """
+        self.data = data
+        self.etag = etag
+        self.media_type = media_type
+
+def _stored(data: Union[bytes, memoryview], media_type: str) -> StoredFrame:
+    return StoredFrame(data, '"' + hashlib.blake2b(data, digest_size=12).hexdigest() + '"', media_type)
+
+class FrameStore:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, spill_dir: Optional[str] = None,
+                 renditions: Iterable[str] = tuple(RENDITIONS), write_through: bool = False):
+        """Bounded in-memory LRU of encoded frame renditions, namespaced by job
+
+        Args:
+            max_bytes: Memory budget for encoded frames (all renditions count)
+            spill_dir: When set, evicted frames are written to <spill_dir>/<job_id>/ instead of dropped
+            renditions: Which of RENDITIONS to produce for every frame
+            write_through: Also write every frame to spill_dir when stored, so other
+                worker processes sharing the directory can serve it
+        """
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.renditions = [name for name in RENDITIONS if name in set(renditions)]
+        self.write_through = write_through and bool(spill_dir)
+        self.bytes = 0
+        self.evictions = 0
+        self._frames: "OrderedDict[Tuple[str, int], Dict[str, StoredFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Per-thread resize targets, reused while frames keep the same size
+        self._scratch = threading.local()
+
+    def _encode(self, frame: np.ndarray) -> Dict[str, StoredFrame]:
+        """Encode every rendition from the one decoded buffer, each size resized from the next larger one"""
+        encoded = {}
+        source = frame
+        for name in sorted(self.renditions, key=lambda name: -(RENDITIONS[name][0] or frame.shape[1])):
+            max_width, extension, params = RENDITIONS[name]
+            if max_width and source.shape[1] > max_width:
+                height = round(source.shape[0] * max_width / source.shape[1])
+                source = cv2.resize(source, (max_width, height), dst=self._resize_target(name, height, max_width, source),
+                                    interpolation=cv2.INTER_AREA)
+            encoded[name] = _stored(encode_image(source, extension, params), MEDIA_TYPES[extension])
+        return encoded
+
+    def _resize_target(self, name: str, height: int, width: int, source: np.ndarray) -> np.ndarray:
+        """This thread's buffer for a rendition, reallocated only when the frame size changes"""
+        buffers = getattr(self._scratch, "buffers", None)
+        if buffers is None:
+            buffers = self._scratch.buffers = {}
+        shape = (height, width) + source.shape[2:]
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != source.dtype:
+            buffer = buffers[name] = np.empty(shape, source.dtype)
+        return buffer
+
+    def put(self, job_id: str, frame_number: int, frame: np.ndarray) -> Dict[str, StoredFrame]:
+        """Encode a BGR frame's renditions and keep them under (job_id, frame_number)"""
+        renditions = self._encode(frame)
+        size = sum(len(rendition.data) for rendition in renditions.values())
+        key = (job_id, frame_number)
+        with self._lock:
+            previous = self._frames.pop(key, None)
+            if previous is not None:
+                self.bytes -= _size(previous)
+            self._frames[key] = renditions
+            self.bytes += size
+            evicted = self._evict()
+            FRAME_STORE_BYTES.set(self.bytes)
+        if self.write_through:
+            self._spill(job_id, frame_number, renditions)
+        else:
+            for (evicted_job, evicted_number), evicted_renditions in evicted:
+                self._spill(evicted_job, evicted_number, evicted_renditions)
+        return renditions
+
+    def _evict(self):
+        """Drop least recently used frames until within budget; call with the lock held"""
+        evicted = []
+        while self.bytes > self.max_bytes and len(self._frames) > 1:
+            key, renditions = self._frames.popitem(last=False)
+            self.bytes -= _size(renditions)
+            self.evictions += 1
+            evicted.append((key, renditions))
+        return evicted
+
+    def _spill_path(self, job_id: str, frame_number: int, rendition: str) -> str:
+        extension = RENDITIONS[rendition][1]
+        return os.path.join(self.spill_dir, job_id, f"frame_{frame_number:04d}_{rendition}{extension}")
+
+    def _spill(self, job_id: str, frame_number: int, renditions: Dict[str, StoredFrame]):
+        if not self.spill_dir:
+            return
+        os.makedirs(os.path.join(self.spill_dir, job_id), exist_ok=True)
+        for name, rendition in renditions.items():
+            # Write then rename, so a reader in another process never sees half a file
+            path = self._spill_path(job_id, frame_number, name)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(rendition.data)
+            os.replace(tmp_path, path)
+
+    def get(self, job_id: str, frame_number: int, rendition: str = "medium") -> Optional[StoredFrame]:
+        if rendition not in RENDITIONS:
+            return None
+        with self._lock:
+            renditions = self._frames.get((job_id, frame_number))
+            if renditions is not None:
+                self._frames.move_to_end((job_id, frame_number))
+        if renditions is not None:
+            CACHE_HITS.inc(backend="frame_store")
+            return renditions.get(rendition)
+
+        if self.spill_dir:
+            path = self._spill_path(job_id, frame_number, rendition)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    return _stored(f.read(), MEDIA_TYPES[RENDITIONS[rendition][1]])
+        return None
+
+    def drop_job(self, job_id: str):
+        """Forget every frame of a job, in memory and on disk"""
+        with self._lock:
+            for key in [key for key in self._frames if key[0] == job_id]:
+                self.bytes -= _size(self._frames.pop(key))
+            FRAME_STORE_BYTES.set(self.bytes)
+        if self.spill_dir:
+            shutil.rmtree(os.path.join(self.spill_dir, job_id), ignore_errors=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"frames": len(self._frames), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "evictions": self.evictions}
+
+def _size(renditions: Dict[str, StoredFrame]) -> int:
+    return sum(len(rendition.data) for rendition in renditions.values())
+
+FRAME_STORE = FrameStore(
+    max_bytes=int(float(os.getenv('FRAME_STORE_MAX_MB', '64')) * 1024 * 1024),
+    spill_dir=os.getenv('FRAME_SPILL_DIR') or None,
+    write_through=os.getenv('FRAME_STORE_WRITE_THROUGH', 'false').lower() in ('1', 'true', 'yes'),
+)
+
+def frame_url(job_id: str, frame_number: int, rendition: str = "medium") -> str:
+    return f"/frames/{job_id}/{frame_number}/{rendition}"
@@ -9,17 +9,100 @@ import json
 from pathlib import Path
 from dotenv import load_dotenv
 import asyncio
+from .metrics import FRAME_ENCODE_SECONDS, MODEL_LATENCY_SECONDS, PARSE_SECONDS, API_CALLS, ERRORS, RETRIES
+from .response_parser import OBJECTS_SCHEMA, provider_schema, parse_objects
+from .tracing import span
+from .resilience import vision_caller
+from .frame_pool import encode_image
+
+DETECTION_PROMPT = """Analyze this image of food preparation and identify all food items and ingredients visible.
+Return your response as a JSON object with the following format:
+{
+    "objects": [
+        {
+            "label": "ingredient name",
+            "category": "ingredient",
+            "confidence": 0.95,
+            "bbox": [0.1, 0.2, 0.4, 0.6]
+        }
+    ]
+}
+
+Important guidelines:
+1. Only include food items and ingredients (no utensils or other objects)
+2. Use the most specific name for each ingredient
+3. Set confidence between 0 and 1
+4. "bbox" is [x1, y1, x2, y2] around the item, as fractions of the image width and height
+5. Format must be valid JSON
+6. Be thorough - don't miss any ingredients in the image
+7. If the image doesn't contain food, return an empty objects array"""
+
+TILES_PROMPT = """You are given {count} overlapping tiles (Tile 0 to Tile {last}) cut from one photo of a fridge, pantry or kitchen.
+Identify every food item and ingredient visible in each tile.
+Return your response as a JSON object with the following format:
+{{
+    "objects": [
+        {{
+            "label": "ingredient name",
+            "category": "ingredient",
+            "confidence": 0.95,
+            "tile": 0,
+            "bbox": [0.1, 0.2, 0.4, 0.6]
+        }}
+    ]
+}}
+
+Important guidelines:
+1. Only include food items and ingredients (no utensils or other objects)
+2. Use the most specific name for each ingredient
+3. Set confidence between 0 and 1
+4. "tile" is the number of the tile the item is in; "bbox" is [x1, y1, x2, y2] within that tile, as fractions of its width and height
+5. List an item once per tile it appears in, even when tiles overlap
+6. Format must be valid JSON
+7. Be thorough - small items on crowded shelves matter"""
+
+def image_part(encoded: memoryview) -> Dict[str, Any]:
+    """An inline JPEG part for generate_content
+
+    The SDK would turn a PIL image into a full-size lossless WebP; sending the
+    JPEG the frame store already encoded skips the RGB conversion, the PIL
+    copy and that slower second encode. The request's protobuf needs bytes,
+    so this is the one copy of the (compressed) image.
+    """
+    return {"mime_type": "image/jpeg", "data": bytes(encoded)}
+
+def to_pixels(bbox: List[float], width: int, height: int) -> List[int]:
+    """[x1, y1, x2, y2] as fractions of an image -> pixel coordinates, clamped and ordered"""
+    x1, y1, x2, y2 = (min(max(value, 0.0), 1.0) for value in bbox)
+    x1, x2 = sorted((x1, x2))
+    y1, y2 = sorted((y1, y2))
+    return [round(x1 * width), round(y1 * height), round(x2 * width), round(y2 * height)]
 
 class GeminiVision:
-    def __init__(self):
-        """Initialize Gemini Vision API"""
+    def __init__(self, max_parse_retries: int = 1, model_name: str = 'gemini-1.5-pro', name: str = "gemini",
+                 cost_per_call: float = 0.0013, calls_per_minute: int = 60):
+        """Initialize Gemini Vision API
+
+        Args:
+            max_parse_retries: Extra model calls allowed when a response cannot be parsed at all
+            model_name: Gemini model used for image analysis
+            name: Backend name used by the router and in metrics labels
+            cost_per_call: Approximate USD cost of one frame request, used by the router
+            calls_per_minute: Request quota for this model, used by the router
+        """
+        self.max_parse_retries = max_parse_retries
+        self.model_name = model_name
+        self.name = name
+        self.cost_per_call = cost_per_call
+        self.calls_per_minute = calls_per_minute
+        self.caller = vision_caller(name)
         try:
             # Load environment variables with absolute path
             env_path = Path(__file__).resolve().parent.parent / '.env'
             print(f"GeminiVision looking for .env at: {env_path}")
             print(f"File exists: {env_path.exists()}")
             
-            if not env_path.exists():
+            if not env_path.exists() and not os.getenv('GOOGLE_API_KEY'):
                 raise FileNotFoundError(f".env file not found at {env_path}")
                 
             load_dotenv(env_path)
@@ -29,108 +112,138 @@ class GeminiVision:
             if not api_key:
                 raise ValueError("GOOGLE_API_KEY not found in environment variables")
             
-            # Configure Gemini API
-            genai.configure(api_key=api_key)
+            # Configure Gemini API; GEMINI_API_ENDPOINT points it at another host (e.g. the benchmark mock server)
+            api_endpoint = os.getenv('GEMINI_API_ENDPOINT')
+            if api_endpoint:
+                genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": api_endpoint})
+                print(f"Gemini API endpoint overridden: {api_endpoint}")
+            else:
+                genai.configure(api_key=api_key)
             
-            # Use Gemini 1.5 Pro for more reliable image analysis
-            self.model = genai.GenerativeModel('gemini-1.5-pro')
-            print("Gemini Vision API initialized successfully with model: gemini-1.5-pro")
+            # Gemini 1.5 Pro by default for more reliable image analysis
+            self.model = genai.GenerativeModel(model_name)
+            print(f"Gemini Vision API initialized successfully with model: {model_name}")
+
+            # Ask for schema-constrained JSON when the installed SDK supports it
+            self.generation_config = None
+            if 'response_schema' in getattr(genai.types.GenerationConfig, '__dataclass_fields__', {}):
+                self.generation_config = genai.types.GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=provider_schema(OBJECTS_SCHEMA),
+                )
+            else:
+                print("Structured output not supported by this google-generativeai version; parsing free text")
         except Exception as e:
             print(f"Error initializing Gemini Vision: {e}")
             raise
 
-    async def process_frame(self, frame: np.ndarray, debug_mode=True) -> List[Dict[Any, Any]]:
+    async def process_frame(self, frame: np.ndarray, debug_mode=True, encoded: memoryview = None) -> List[Dict[Any, Any]]:
         """Process a single frame with Gemini Vision API
 
         Args:
             frame: The frame to process
             debug_mode: Whether to include detailed debug information
+            encoded: The frame already encoded as JPEG (e.g. its frame store rendition), sent instead of encoding again
 
         Returns:
-            List of detected ingredients with their properties
+            List of detected ingredients with their properties (empty if the API call failed)
         """
-        # Convert frame to PIL Image
-        pil_image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        
-        # Create prompt for Gemini specifically for ingredient detection
-        prompt = f"""Analyze this image of food preparation and identify all food items and ingredients visible.
-Return your response as a JSON object with the following format:
-{{
-    "objects": [
-        {{
-            "label": "ingredient name",
-            "category": "ingredient",
-            "confidence": 0.95
-        }}
-    ]
-}}
+        try:
+            return await self.detect(frame, debug_mode, encoded)
+        except Exception as e:
+            # Retries are exhausted (or the error is not retryable); ERRORS already counted it
+            if debug_mode:
+                print(f"Error calling Gemini API: {type(e).__name__}: {e}")
+            return []
 
-Important guidelines:
-1. Only include food items and ingredients (no utensils or other objects)
-2. Use the most specific name for each ingredient
-3. Set confidence between 0 and 1
-4. Format must be valid JSON
-5. Be thorough - don't miss any ingredients in the image
-6. If the image doesn't contain food, return an empty objects array"""
+    async def detect(self, frame: np.ndarray, debug_mode=True, encoded: memoryview = None) -> List[Dict[Any, Any]]:
+        """Like process_frame, but API errors propagate so a router can fall back to another backend"""
+        if encoded is None:
+            # Only time real encodes; a pre-encoded rendition would drag the histogram towards zero
+            with FRAME_ENCODE_SECONDS.time(backend=self.name), span("encode", target=self.name):
+                encoded = encode_image(frame)
+        image = image_part(encoded)
+        objects = await self._generate([DETECTION_PROMPT, image], debug_mode)
+
+        # Boxes come back as fractions of the image; callers get frame pixels like the other backends
+        height, width = frame.shape[:2]
+        for obj in objects:
+            if 'bbox' in obj:
+                obj['bbox'] = to_pixels(obj['bbox'], width, height)
+        return objects
+
+    async def detect_tiles(self, tiles: List[np.ndarray], debug_mode=True) -> List[List[Dict[Any, Any]]]:
+        """Detect ingredients in several tiles of one frame with a single request
+
+        Returns one list per tile; boxes are normalized to their tile.
+        """
+        with FRAME_ENCODE_SECONDS.time(backend=self.name), span("encode", target=self.name, tiles=len(tiles)):
+            contents = [TILES_PROMPT.format(count=len(tiles), last=len(tiles) - 1)]
+            for i, tile in enumerate(tiles):
+                contents += [f"Tile {i}:", image_part(encode_image(tile))]
+
+        per_tile: List[List[Dict[Any, Any]]] = [[] for _ in tiles]
+        for obj in await self._generate(contents, debug_mode):
+            tile = obj.pop('tile', None)
+            if isinstance(tile, int) and 0 <= tile < len(tiles):
+                per_tile[tile].append(obj)
+            else:
+                # Without its tile the box can't be placed; keep the ingredient
+                obj.pop('bbox', None)
+                per_tile[0].append(obj)
+        return per_tile
+
+    async def _generate(self, contents: List[Any], debug_mode=True) -> List[Dict[Any, Any]]:
+        """One generate_content request, re-sent when the response cannot be parsed at all"""
+        for attempt in range(self.max_parse_retries + 1):
+            try:
+                # The synchronous SDK call runs in a worker thread with retries, deadline and hedging
+                API_CALLS.inc(backend=self.name)
+                with MODEL_LATENCY_SECONDS.time(backend=self.name), span("model_call", backend=self.name):
+                    response = await self.caller.call(
+                        lambda: self.model.generate_content(contents, generation_config=self.generation_config)
+                    )
+                    raw_response = response.text
+            except Exception:
+                ERRORS.inc(backend=self.name)
+                raise
 
-        try:
-            # Process with Gemini - use synchronous call to avoid await issues
-            response = self.model.generate_content([prompt, pil_image])
-            raw_response = response.text
-            
             if debug_mode:
                 print("Received response from Gemini:", raw_response[:200] + "..." if len(raw_response) > 200 else raw_response)
-            
+
             # Extract and parse JSON from response
-            try:
-                response_text = response.text
-                # Find JSON in the response using string markers
-                json_start = response_text.find('{')
-                json_end = response_text.rfind('}') + 1
-                
-                if json_start >= 0 and json_end > json_start:
-                    json_str = response_text[json_start:json_end]
-                    
-                    if debug_mode:
-                        print("Extracted JSON:", json_str[:200] + "..." if len(json_str) > 200 else json_str)
-                    
-                    data = json.loads(json_str)
-                    
-                    # Validate and clean objects
-                    if isinstance(data, dict) and 'objects' in data:
-                        objects = []
-                        for obj in data['objects']:
-                            if 'label' in obj:  # Only require label to be present
-                                # Clean and standardize the object
-                                cleaned_obj = {
-                                    'label': str(obj.get('label', '')).strip().lower(),
-                                    'category': 'ingredient',  # Always set to ingredient for this use case
-                                    'confidence': float(min(max(float(obj.get('confidence', 0.5)), 0), 1))
-                                }
-                                objects.append(cleaned_obj)
-                                
-                                if debug_mode:
-                                    print(f"Processed ingredient: {cleaned_obj['label']} with confidence {cleaned_obj['confidence']}")
-                        
-                        return objects
-                    else:
-                        if debug_mode:
-                            print("No 'objects' field found in response JSON")
-                        # Return empty list if no objects field
-                        return []
-                else:
-                    if debug_mode:
-                        print("Could not find valid JSON in response")
-                    # Return empty list if no JSON found
-                    return []
-            except Exception as e:
-                if debug_mode:
-                    print(f"Error parsing Gemini response: {e}")
-                    print(f"Raw response: {response.text}")
-                # Return empty list on error
-                return []
-        except Exception as e:
+            with PARSE_SECONDS.time(backend=self.name), span("parse", backend=self.name):
+                result = parse_objects(raw_response, backend=self.name)
+
+            if debug_mode and result.errors:
+                print(f"Gemini response problems ({result.status}): {result.errors[:5]}")
+
+            if not result.failed or attempt == self.max_parse_retries:
+                return self._clean_objects(result.objects, debug_mode)
+
+            # Nothing usable came back; a fresh call is cheaper than losing the frame
+            RETRIES.inc(backend=self.name)
             if debug_mode:
-                print(f"Error calling Gemini API: {e}")
-            # Return empty list on error
-            return []
+                print(f"Unparseable Gemini response, retrying ({attempt + 1}/{self.max_parse_retries})")
+
+        return []
+
+    def _clean_objects(self, objects: List[Dict[Any, Any]], debug_mode=True) -> List[Dict[Any, Any]]:
+        """Standardize validated objects into ingredient entries"""
+        cleaned = []
+        for obj in objects:
+            cleaned_obj = {
+                'label': str(obj.get('label', '')).strip().lower(),
+                'category': 'ingredient',  # Always set to ingredient for this use case
+                'confidence': float(min(max(float(obj.get('confidence', 0.5)), 0), 1))
+            }
+            if obj.get('bbox') and len(obj['bbox']) == 4:
+                cleaned_obj['bbox'] = [float(value) for value in obj['bbox']]
+            if 'tile' in obj:
+                cleaned_obj['tile'] = obj['tile']
+            cleaned.append(cleaned_obj)
+
+            if debug_mode:
+                print(f"Processed ingredient: {cleaned_obj['label']} with confidence {cleaned_obj['confidence']}")
+
+        return cleaned
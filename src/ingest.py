@@ -0,0 +1,346 @@
+import io
+import cv2
+import time
+import asyncio
+import threading
+import numpy as np
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Callable, Awaitable
+from .aggregation import IngredientAggregator
+from .metrics import INGESTED_FRAMES
+from .tracking import build_tracker
+
+INGEST_MODES = ("frames", "chunks")
+
+def decode_image(data: bytes) -> np.ndarray:
+    """JPEG/WebP/PNG bytes -> BGR frame"""
+    if not data:
+        # imdecode asserts on an empty buffer rather than returning None
+        raise ValueError("Empty image message")
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError(f"Could not decode a {len(data)} byte image")
+    return frame
+
+class ChunkStream(io.BufferedIOBase):
+    def __init__(self, keep_behind: int = 1 << 20):
+        """A recording that grows as chunks arrive, read by FFmpeg as a blocking stream
+
+        Reads past the data received so far wait for the next chunk, and the
+        size stays unknown until the last one, so the demuxer simply pauses at
+        an incomplete cluster. Once trimming is enabled (after the container
+        is opened) bytes more than keep_behind behind the read position are
+        released, so memory stays flat however long the session runs.
+
+        Args:
+            keep_behind: Bytes kept behind the read position for short backward seeks
+        """
+        self.keep_behind = keep_behind
+        self.trim = False
+        # Set while the reader is blocked for data that hasn't arrived yet
+        self.waiting = threading.Event()
+        self._buffer = bytearray()
+        self._base = 0
+        self._pos = 0
+        self._ended = False
+        self._detached = False
+        self._cond = threading.Condition()
+
+    @property
+    def ended(self) -> bool:
+        return self._ended
+
+    def append(self, data: bytes, final: bool = False):
+        with self._cond:
+            self._buffer += data
+            self._ended = self._ended or final
+            if not self._detached:
+                self.waiting.clear()
+            self._cond.notify_all()
+
+    def detach(self):
+        """The reader has stopped for good; appends no longer wait for it"""
+        with self._cond:
+            self._detached = True
+            self.waiting.set()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        with self._cond:
+            while self._pos >= self._base + len(self._buffer) and not self._ended:
+                self.waiting.set()
+                self._cond.wait()
+            start = self._pos - self._base
+            end = len(self._buffer) if size is None or size < 0 else min(len(self._buffer), start + size)
+            data = bytes(self._buffer[start:end])
+            self._pos = self._base + end
+            excess = end - self.keep_behind
+            if self.trim and excess > self.keep_behind:
+                del self._buffer[:excess]
+                self._base += excess
+            return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        with self._cond:
+            if whence == io.SEEK_END:
+                # Unknown until the recording ends; FFmpeg then treats it as a live stream
+                if not self._ended:
+                    return -1
+                position = self._base + len(self._buffer) + offset
+            else:
+                position = offset + (self._pos if whence == io.SEEK_CUR else 0)
+            if position < self._base:
+                return -1
+            self._pos = position
+            return position
+
+    def tell(self) -> int:
+        return self._pos
+
+class ChunkDecoder:
+    def __init__(self, sample_fps: float = 1.0):
+        """Decode a growing MediaRecorder (WebM/MP4) recording chunk by chunk
+
+        One long-lived FFmpeg capture reads the chunks from a ChunkStream on a
+        decoder thread, so every chunk is demuxed and decoded once and the
+        work per chunk doesn't grow with the length of the session. Frames are
+        sampled at sample_fps by their presentation time; only sampled frames
+        are converted to BGR.
+        """
+        self.sample_fps = sample_fps
+        self.decoded = 0
+        self._next_sample = 0.0
+        self._stream = ChunkStream()
+        self._frames: List[Tuple[np.ndarray, float]] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="chunk-decoder", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            cap = cv2.VideoCapture(self._stream, cv2.CAP_FFMPEG, [])
+            try:
+                if not cap.isOpened():
+                    if self._stream.tell() and not self._closed:
+                        raise ValueError("Could not open the streamed recording")
+                    return
+                self._stream.trim = True
+                while not self._closed:
+                    if not cap.grab():
+                        if not self._stream.ended:
+                            raise ValueError(f"Streamed recording stopped decoding after {self.decoded} frames")
+                        break
+                    self.decoded += 1
+                    seconds = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                    if seconds + 1e-6 < self._next_sample:
+                        continue
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        continue
+                    self._next_sample = seconds + 1 / self.sample_fps
+                    with self._lock:
+                        self._frames.append((frame, seconds))
+            finally:
+                cap.release()
+        except Exception as e:
+            self._error = e
+        finally:
+            # Nothing more will be read; don't leave feed() waiting
+            self._stream.detach()
+
+    def _take(self) -> List[Tuple[np.ndarray, float]]:
+        if self._error is not None:
+            raise self._error
+        with self._lock:
+            frames, self._frames = self._frames, []
+        return frames
+
+    def feed(self, chunk: bytes, final: bool = False) -> List[Tuple[np.ndarray, float]]:
+        """Append a chunk and return the newly decoded sampled (frame, seconds into the recording)
+
+        Blocks until the decoder has used up the data received so far (or,
+        for the final chunk, until the recording is decoded to the end).
+        """
+        if self._error is not None:
+            raise self._error
+        self._stream.append(chunk, final)
+        if final:
+            self._thread.join()
+        else:
+            self._stream.waiting.wait()
+        return self._take()
+
+    def close(self):
+        self._closed = True
+        self._stream.append(b"", final=True)
+        self._thread.join()
+
+class IngestSession:
+    def __init__(self, processor, job_id: str, on_result: Callable[[Dict[str, Any]], Awaitable[None]],
+                 mode: str = "frames", window: int = 4, sample_fps: float = 1.0):
+        """Frames streamed over a websocket, analysed by a VideoProcessor with credit-based flow control
+
+        The client may have up to window frames outstanding (queued or being
+        analysed). In "frames" mode each binary message is one JPEG/WebP image;
+        one that arrives with no credit left is rejected, so the client decides
+        what to resend. In "chunks" mode messages are MediaRecorder chunks that
+        must all be kept; frames sampled from them that find no credit displace
+        the oldest queued frame instead.
+
+        Args:
+            processor: VideoProcessor whose analyse_frame runs each frame
+            job_id: Id the frames and spans are recorded under
+            on_result: Awaited with each frame result (plus seq, latency and credits)
+            mode: "frames" or "chunks"
+            window: Frames the client may have outstanding
+            sample_fps: Frames per second of recording taken from chunks
+        """
+        if mode not in INGEST_MODES:
+            raise ValueError(f"Unknown ingest mode {mode!r}; expected one of {INGEST_MODES}")
+        self.processor = processor
+        self.job_id = job_id
+        self.on_result = on_result
+        self.mode = mode
+        self.window = max(1, window)
+        self.decoder = ChunkDecoder(sample_fps) if mode == "chunks" else None
+        self.aggregator = IngredientAggregator()
+        self.tracker = build_tracker() if processor.tracking else None
+
+        self.seq = 0
+        self.frames = 0
+        self.counts = {"queued": 0, "rejected": 0, "dropped": 0, "undecodable": 0, "skipped": 0}
+        self.started = time.monotonic()
+        self._queue: "deque[Tuple[int, Any, float, Optional[float]]]" = deque()
+        self._in_flight = 0
+        self._wake = asyncio.Event()
+        self._closed = False
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def credits(self) -> int:
+        return max(0, self.window - len(self._queue) - self._in_flight)
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    def _count(self, outcome: str, n: int = 1):
+        self.counts[outcome] += n
+        INGESTED_FRAMES.inc(n, outcome=outcome)
+
+    def _check_worker(self):
+        """Raise the error that stopped the worker, rather than queueing frames nobody will analyse"""
+        if self._worker and self._worker.done() and not self._worker.cancelled():
+            error = self._worker.exception()
+            if error is not None:
+                raise error
+
+    async def receive(self, data: bytes) -> Dict[str, Any]:
+        """Take one binary message and return its acknowledgement"""
+        self._check_worker()
+        self.seq += 1
+        received_at = time.monotonic()
+        if self.mode == "frames":
+            if not self.credits:
+                self._count("rejected")
+                return {"type": "ack", "seq": self.seq, "status": "rejected", "reason": "window_full", "credits": 0}
+            self._queue.append((self.seq, data, received_at, None))
+            self._count("queued")
+            self._wake.set()
+            return {"type": "ack", "seq": self.seq, "status": "queued", "credits": self.credits}
+
+        frames = await asyncio.to_thread(self.decoder.feed, data)
+        dropped = 0
+        for frame, seconds in frames:
+            if not self.credits and self._queue:
+                self._queue.popleft()
+                dropped += 1
+            self._queue.append((self.seq, frame, received_at, seconds))
+        self._count("queued", len(frames))
+        if dropped:
+            self._count("dropped", dropped)
+        self._wake.set()
+        return {"type": "ack", "seq": self.seq, "status": "received", "frames": len(frames),
+                "dropped": dropped, "credits": self.credits}
+
+    async def _run(self):
+        while True:
+            if not self._queue:
+                if self._closed:
+                    return
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            seq, payload, received_at, seconds = self._queue.popleft()
+            self._in_flight += 1
+            try:
+                message = await self._analyse(seq, payload, received_at, seconds)
+            finally:
+                self._in_flight -= 1
+            # Credits are reported once this frame no longer counts against the window
+            message["credits"] = self.credits
+            await self.on_result(message)
+
+    async def _analyse(self, seq: int, payload: Any, received_at: float, seconds: Optional[float]) -> Dict[str, Any]:
+        if isinstance(payload, bytes):
+            try:
+                frame = await asyncio.to_thread(decode_image, payload)
+            except ValueError as e:
+                self._count("undecodable")
+                return {"seq": seq, "error": str(e)}
+        else:
+            frame = payload
+        timestamp = seconds if seconds is not None else round(time.monotonic() - self.started, 3)
+        result = await self.processor.analyse_frame(frame, self.job_id, self.frames, timestamp,
+                                                    self.aggregator, self.tracker)
+        self.frames += 1
+        if result is None:
+            self._count("skipped")
+            return {"seq": seq, "skipped": True}
+        result.update(seq=seq, latency=round(time.monotonic() - received_at, 3))
+        return result
+
+    async def finish(self) -> Dict[str, Any]:
+        """Decode what is left of a recording, wait for queued frames and return the session summary"""
+        if self.decoder:
+            for frame, seconds in await asyncio.to_thread(self.decoder.feed, b"", True):
+                self._queue.append((self.seq, frame, time.monotonic(), seconds))
+                self._count("queued")
+        self._closed = True
+        self._wake.set()
+        if self._worker:
+            await self._worker
+        return self.summary()
+
+    async def cancel(self):
+        """Stop analysing (the client went away) and clean up"""
+        self._closed = True
+        self._queue.clear()
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        if self.decoder:
+            self.decoder.close()
+
+    def summary(self) -> Dict[str, Any]:
+        if self.decoder:
+            self.decoder.close()
+        return {
+            "summary": True,
+            "mode": self.mode,
+            "messages": self.seq,
+            "processed_frames": self.frames,
+            **{f"{outcome}_frames": count for outcome, count in self.counts.items()},
+            "duration_seconds": round(time.monotonic() - self.started, 3),
+            "unique_ingredients": self.aggregator.labels(),
+            "ingredients": self.aggregator.summary()
+        }
@@ -0,0 +1,210 @@
+import os
+import json
+import glob
+import uuid
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+class IngredientLog:
+    def __init__(self, path: str = "output/ingredients.jsonl"):
+        """Append-only JSON Lines log with one record per processed video
+
+        Args:
+            path: Log file; created on first append
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def append(self, video_path: str, ingredients: List[str], details: Optional[List[Dict[str, Any]]] = None,
+               run_id: Optional[str] = None) -> Dict[str, Any]:
+        """Append one run's ingredients and return the record written"""
+        record = {
+            "run_id": run_id or new_run_id(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "video_path": video_path,
+            "ingredients": ingredients,
+            "ingredient_details": details or [],
+        }
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        # One write on an O_APPEND descriptor, so concurrent writers never interleave lines
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode("utf-8"))
+            finally:
+                os.close(fd)
+        return record
+
+    def read_since(self, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Records after a byte offset, and the offset to resume from
+
+        A trailing line still being written (no newline yet) is left for the next read.
+        """
+        if not os.path.exists(self.path):
+            return [], 0
+        if os.path.getsize(self.path) < offset:
+            # The log was truncated or replaced; start over
+            offset = 0
+
+        records = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    print(f"Skipping corrupt ingredients log line at byte {offset - len(line)}: {e}")
+        return records, offset
+
+class LogReader:
+    def __init__(self, log: IngredientLog, checkpoint_path: str):
+        """Incremental consumer of an IngredientLog that remembers its position
+
+        Args:
+            log: Log to read
+            checkpoint_path: File holding the byte offset already consumed
+        """
+        self.log = log
+        self.checkpoint_path = checkpoint_path
+
+    def _load_offset(self) -> int:
+        try:
+            with open(self.checkpoint_path) as f:
+                return int(json.load(f).get("offset", 0))
+        except (FileNotFoundError, ValueError, json.JSONDecodeError):
+            return 0
+
+    def read_new(self) -> List[Dict[str, Any]]:
+        """Records appended since the last call; the checkpoint advances past them"""
+        records, offset = self.log.read_since(self._load_offset())
+        _write_json_atomic(self.checkpoint_path, {"offset": offset})
+        return records
+
+class Pantry:
+    def __init__(self, log: IngredientLog, snapshot_path: str = "output/pantry.json",
+                 normalize: Optional[Callable[[List[str]], List[str]]] = None):
+        """Compacted "current pantry" view of the ingredients log
+
+        The snapshot stores the log offset it covers, so refresh() only reads
+        records appended since, making an update O(new records).
+
+        Args:
+            log: Ingredients log to fold
+            snapshot_path: Where the compacted view and its offset are kept
+            normalize: Optional batch label normalizer (e.g. VocabularyIndex.normalize_batch)
+        """
+        self.log = log
+        self.snapshot_path = snapshot_path
+        self.normalize = normalize
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._snapshot is None:
+            try:
+                with open(self.snapshot_path) as f:
+                    self._snapshot = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._snapshot = {"offset": 0, "runs": 0, "updated": None, "ingredients": {}}
+        return self._snapshot
+
+    def _fold(self, snapshot: Dict[str, Any], record: Dict[str, Any]):
+        labels = [label for label in record.get("ingredients", []) if label and "unknown" not in label]
+        details = [item for item in record.get("ingredient_details") or [] if item.get("label")]
+        detail_labels = [item["label"] for item in details]
+        if self.normalize:
+            # One batch call, so detail labels land on the same canonical names as the ingredients
+            normalized = self.normalize(labels + detail_labels)
+            labels, detail_labels = normalized[:len(labels)], normalized[len(labels):]
+        confidences: Dict[str, float] = {}
+        for label, item in zip(detail_labels, details):
+            if item.get("confidence") is not None:
+                confidences[label] = max(confidences.get(label, 0.0), item["confidence"])
+
+        snapshot["runs"] += 1
+        for label in dict.fromkeys(labels):
+            entry = snapshot["ingredients"].setdefault(label, {
+                "runs": 0,
+                "first_seen": record.get("timestamp"),
+                "confidence": 0.0,
+            })
+            entry["runs"] += 1
+            entry["last_seen"] = record.get("timestamp")
+            entry["last_run_id"] = record.get("run_id")
+            if confidences.get(label) is not None:
+                entry["confidence"] = max(entry["confidence"], confidences[label])
+
+    def refresh(self) -> Dict[str, Any]:
+        """Fold new log records into the snapshot and persist it"""
+        with self._lock:
+            snapshot = self._load()
+            log_size = os.path.getsize(self.log.path) if os.path.exists(self.log.path) else 0
+            if log_size < snapshot["offset"]:
+                # The log was truncated or replaced; rebuild from scratch
+                snapshot = self._snapshot = {"offset": 0, "runs": 0, "updated": None, "ingredients": {}}
+            records, offset = self.log.read_since(snapshot["offset"])
+            if not records and offset == snapshot["offset"]:
+                return snapshot
+
+            for record in records:
+                self._fold(snapshot, record)
+            snapshot["offset"] = offset
+            snapshot["updated"] = datetime.now().isoformat(timespec="seconds")
+            _write_json_atomic(self.snapshot_path, snapshot)
+            return snapshot
+
+    def ingredients(self) -> List[str]:
+        """Current pantry, most frequently seen first"""
+        items = self.refresh()["ingredients"]
+        return sorted(items, key=lambda label: (-items[label]["runs"], label))
+
+def import_legacy_files(log: IngredientLog, directory: str = "output") -> int:
+    """Append the old per-run ingredients_<timestamp>.json files to the log once
+
+    Each file gets the run id "legacy-<file stem>" and is renamed to *.imported.
+    Run it with `python -m src.ingredient_log import-legacy`.
+    """
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(directory, "ingredients_*.json"))):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+        log.append(data.get("video_path", ""), data.get("ingredients", []), data.get("ingredient_details"),
+                   run_id="legacy-" + os.path.splitext(os.path.basename(path))[0])
+        os.replace(path, path + ".imported")
+        imported += 1
+    return imported
+
+def _write_json_atomic(path: str, data: Dict[str, Any]):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingredient log maintenance")
+    parser.add_argument("command", choices=["import-legacy"])
+    parser.add_argument("--log", default=os.getenv("INGREDIENT_LOG_PATH", "output/ingredients.jsonl"),
+                        help="Ingredients log to append to")
+    parser.add_argument("--directory", default="output", help="Directory holding the ingredients_*.json files")
+    args = parser.parse_args()
+
+    imported = import_legacy_files(IngredientLog(args.log), args.directory)
+    print(f"Imported {imported} legacy ingredient files into {args.log}")
+
+if __name__ == "__main__":
+    main()
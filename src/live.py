@@ -0,0 +1,132 @@
+import os
+import cv2
+import time
+import threading
+import numpy as np
+from collections import deque
+from typing import Optional, Tuple
+from .metrics import LIVE_DROPPED_FRAMES
+
+class FrameBuffer:
+    def __init__(self, capacity: int = 2):
+        """Bounded hand-off from a capture thread to the analysis loop that drops the oldest frame when full
+
+        A slow consumer then always finds recent frames instead of a backlog.
+        """
+        self.capacity = max(1, capacity)
+        self.dropped = 0
+        self.closed = False
+        self._frames: "deque[Tuple[np.ndarray, float]]" = deque()
+        self._ready = threading.Condition()
+
+    def put(self, frame: np.ndarray, captured_at: float):
+        with self._ready:
+            if len(self._frames) >= self.capacity:
+                self._frames.popleft()
+                self.dropped += 1
+                LIVE_DROPPED_FRAMES.inc(reason="overflow")
+            self._frames.append((frame, captured_at))
+            self._ready.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[np.ndarray, float]]:
+        """Oldest buffered (frame, time.monotonic() at capture), or None on timeout or once closed and empty"""
+        with self._ready:
+            if not self._ready.wait_for(lambda: self._frames or self.closed, timeout):
+                return None
+            return self._frames.popleft() if self._frames else None
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify_all()
+
+class LiveSource:
+    def __init__(self, source: str, buffer: FrameBuffer, reconnect_delay: float = 1.0, max_reconnects: int = 5):
+        """Capture thread reading a live source into a FrameBuffer
+
+        Args:
+            source: Webcam device index ("0"), an RTSP/HTTP stream URL, or
+                "test:<path>" to replay a video file in real time, looping, as a stand-in camera
+            buffer: Where captured frames go
+            reconnect_delay: Seconds to wait before reopening a stream that stopped delivering frames
+            max_reconnects: Consecutive failed reopens before giving up
+        """
+        self.source = source
+        self.buffer = buffer
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnects = max_reconnects
+        self.replay = source.startswith("test:")
+        self.frames = 0
+        self.error: Optional[str] = None
+        self._cap: Optional[cv2.VideoCapture] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _open(self) -> cv2.VideoCapture:
+        if self.source.isdigit():
+            cap = cv2.VideoCapture(int(self.source))
+        elif self.replay:
+            path = self.source[len("test:"):]
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Test stream file not found: {path}")
+            cap = cv2.VideoCapture(path)
+        else:
+            cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            raise RuntimeError(f"Could not open live source: {self.source}")
+        # Keep the driver's own queue short too, where the backend supports it
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def start(self):
+        """Open the source (raising if it can't be) and start capturing"""
+        self._cap = self._open()
+        self._thread = threading.Thread(target=self._run, name=f"live-{self.source}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        cap = self._cap
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        next_frame = time.monotonic()
+        failures = 0
+        try:
+            while not self._stopped.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    if self.replay and self.frames and not failures:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        failures += 1
+                        continue
+                    # The stream dropped; reopen it rather than ending the session
+                    if failures >= self.max_reconnects:
+                        self.error = f"Live source stopped delivering frames: {self.source}"
+                        break
+                    failures += 1
+                    cap.release()
+                    if self._stopped.wait(self.reconnect_delay):
+                        break
+                    try:
+                        cap = self._open()
+                    except (RuntimeError, FileNotFoundError) as e:
+                        print(f"Reconnect {failures}/{self.max_reconnects} failed: {e}")
+                    continue
+                failures = 0
+                if self.replay:
+                    # A file reads as fast as it decodes; pace it like a camera
+                    next_frame += 1 / fps
+                    delay = next_frame - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_frame = time.monotonic()
+                self.frames += 1
+                self.buffer.put(frame, time.monotonic())
+        finally:
+            cap.release()
+            self.buffer.close()
@@ -1,25 +1,19 @@
 import os
-import cv2
-import numpy as np
-from fastapi import FastAPI, UploadFile, File, WebSocket, BackgroundTasks
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
 import asyncio
 import json
+from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect, BackgroundTasks, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-import tempfile
-import logging
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import aiofiles
-<<<<<<< HEAD
-from typing import Dict, List, Any
 import time
-=======
-from pathlib import Path
 from datetime import datetime
->>>>>>> 597868820a4d8e94b103fafb1f3192690fe3d317
+from .broker import build_broker, TERMINAL_STATUSES
+from .resources import RESOURCES
+from .tracing import new_job_id
 
 # Load environment variables with absolute path
 env_path = Path(__file__).resolve().parent.parent / '.env'
@@ -52,16 +46,41 @@ app.add_middleware(
 # Create temp directory if it doesn't exist
 temp_dir = Path("temp")
 temp_dir.mkdir(exist_ok=True)
+app.mount("/temp", StaticFiles(directory="temp"), name="temp")
 
 # Create frames directory if it doesn't exist
 frames_dir = Path("frames")
 frames_dir.mkdir(exist_ok=True)
 
-# Global variables
-video_processor = None
-current_video_path = None
-processing_complete = False
-debug_mode = False  # Default debug mode to False for better performance
+# Job state, results and websocket fan-out live in the broker rather than in module
+# globals, so any worker can answer for a job another worker is processing
+broker = build_broker()
+
+def _video_processor(debug_mode: bool):
+    from .video_processor import VideoProcessor
+    return VideoProcessor(debug_mode=debug_mode)
+
+def _storage():
+    from .storage import ObjectStorage
+    return ObjectStorage(os.getenv("DATABASE_URL", "sqlite:///objects.db"))
+
+RESOURCES.register("video_processor", lambda: _video_processor(False))
+RESOURCES.register("video_processor_debug", lambda: _video_processor(True))
+RESOURCES.register("storage", _storage)
+
+def _channel(job_id: str) -> str:
+    return f"job:{job_id}"
+
+def _frame_message(update: dict) -> dict:
+    """A VideoProcessor frame result as sent to the websocket"""
+    return {
+        "frame_number": update["frame_number"],
+        "frame_url": update["frame"],
+        "thumbnail": update.get("thumbnail"),
+        "timestamp": update.get("timestamp") or 0.0,
+        "objects": update["ingredients"],
+        **({"latency": update["latency"]} if "latency" in update else {})
+    }
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -230,6 +249,14 @@ async def root():
                 <div id="upload-status" class="status"></div>
             </div>
             
+            <div class="upload-section">
+                <h2>Live Camera</h2>
+                <input type="text" id="live-source" placeholder="0, rtsp://camera/stream or test:temp/clip.mp4">
+                <button id="live-start">Start</button>
+                <button id="live-stop" disabled>Stop</button>
+                <div id="live-status" class="status"></div>
+            </div>
+            
             <div class="results-section" style="display: none;" id="results-container">
                 <div class="video-container">
                     <h2>Video</h2>
@@ -298,7 +325,7 @@ async def root():
                     showStatus('Video uploaded successfully. Starting processing...', 'success');
                     
                     // Start processing with debug mode parameter
-                    const processResponse = await fetch('/process?debug_mode=' + debugMode, {
+                    const processResponse = await fetch(`/process?debug_mode=${debugMode}&job_id=${uploadResult.job_id}`, {
                         method: 'POST'
                     });
                     
@@ -307,7 +334,7 @@ async def root():
                     }
                     
                     // Connect to WebSocket for real-time updates
-                    connectWebSocket();
+                    connectWebSocket(uploadResult.job_id);
                     
                 } catch (error) {
                     console.error('Error:', error);
@@ -316,7 +343,57 @@ async def root():
                 }
             });
             
-            function connectWebSocket() {
+            let liveJob = null;
+            
+            document.getElementById('live-start').addEventListener('click', async () => {
+                const source = document.getElementById('live-source').value.trim();
+                const debugMode = document.getElementById('debug-mode').checked;
+                if (!source) {
+                    showStatus('Enter a camera index, stream URL or test:<file>', 'error');
+                    return;
+                }
+                const response = await fetch(`/live?source=${encodeURIComponent(source)}&debug_mode=${debugMode}`, {
+                    method: 'POST'
+                });
+                if (!response.ok) {
+                    showStatus('Failed to start live analysis', 'error');
+                    return;
+                }
+                liveJob = (await response.json()).job_id;
+                document.getElementById('live-start').disabled = true;
+                document.getElementById('live-stop').disabled = false;
+                document.getElementById('results-container').style.display = 'flex';
+                document.getElementById('frames-section').style.display = 'block';
+                document.getElementById('frames-container').innerHTML = '';
+                connectWebSocket(liveJob);
+            });
+            
+            document.getElementById('live-stop').addEventListener('click', async () => {
+                if (liveJob) {
+                    await fetch(`/live/${liveJob}/stop`, { method: 'POST' });
+                }
+            });
+            
+            function showLiveFrame(frame) {
+                // Newest first, keeping only the last few frames on screen
+                displayIngredients(frame.objects.map(obj => obj.label));
+                const framesContainer = document.getElementById('frames-container');
+                const frameItem = document.createElement('div');
+                frameItem.className = 'frame-item';
+                const img = document.createElement('img');
+                img.src = frame.thumbnail || frame.frame_url;
+                img.alt = `Frame ${frame.frame_number}`;
+                const info = document.createElement('div');
+                info.innerHTML = `<strong>Frame ${frame.frame_number}</strong><br>Latency: ${frame.latency.toFixed(2)}s`;
+                frameItem.appendChild(img);
+                frameItem.appendChild(info);
+                framesContainer.prepend(frameItem);
+                while (framesContainer.children.length > 12) {
+                    framesContainer.removeChild(framesContainer.lastChild);
+                }
+            }
+            
+            function connectWebSocket(jobId) {
                 // Close existing socket if any
                 if (socket) {
                     socket.close();
@@ -324,7 +401,7 @@ async def root():
                 
                 // Create new WebSocket connection
                 const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-                const wsUrl = `${protocol}//${window.location.host}/ws`;
+                const wsUrl = `${protocol}//${window.location.host}/ws?job_id=${jobId}`;
                 socket = new WebSocket(wsUrl);
                 
                 socket.onopen = function(e) {
@@ -334,10 +411,22 @@ async def root():
                 socket.onmessage = function(event) {
                     const data = JSON.parse(event.data);
                     
-                    if (data.status === 'processing') {
+                    if (data.status === 'processing' && data.latency !== undefined) {
+                        // Live results replace the view as they arrive
+                        showLiveFrame(data);
+                        showStatus(`Live: frame ${data.frame_number}, ${data.latency.toFixed(2)}s behind`, 'success');
+                        
+                    } else if (data.status === 'processing') {
                         // Update progress
                         showStatus(`Processing: Frame ${data.frame_number}`, 'success');
                         
+                    } else if (data.status === 'complete' && data.live) {
+                        displayIngredients(data.ingredients);
+                        document.getElementById('live-start').disabled = false;
+                        document.getElementById('live-stop').disabled = true;
+                        liveJob = null;
+                        showStatus(`Live session ended (${data.stop_reason}): ${data.processed_frames} frames analysed`, 'success');
+                        
                     } else if (data.status === 'complete') {
                         // Processing complete, show results
                         document.getElementById('loading').style.display = 'none';
@@ -355,6 +444,12 @@ async def root():
                         displayFrames(data.frames);
                         
                         showStatus('Video processing complete!', 'success');
+                        
+                    } else if (data.status === 'error') {
+                        document.getElementById('loading').style.display = 'none';
+                        document.getElementById('live-start').disabled = false;
+                        document.getElementById('live-stop').disabled = true;
+                        showStatus('Error: ' + data.message, 'error');
                     }
                 };
                 
@@ -478,8 +573,7 @@ async def root():
 @app.post("/upload")
 async def upload_video(video: UploadFile = File(...)):
     """Handle video file upload"""
-    global current_video_path
-    
+    job_id = new_job_id()
     try:
         # Create temp directory if it doesn't exist
         temp_dir = Path("temp")
@@ -494,17 +588,18 @@ async def upload_video(video: UploadFile = File(...)):
             content = await video.read()
             await out_file.write(content)
         
-        # Store path for processing
-        current_video_path = str(file_path)
-        
         # Create video URL for frontend
         video_url = f"/temp/{filename}"
         
+        # Record the job so whichever worker gets /process can find the file
+        broker.put_job(job_id, status="uploaded", video_path=str(file_path), video_url=video_url)
+        
         return JSONResponse({
             "status": "success",
             "message": "Video uploaded successfully",
             "video_url": video_url,
-            "file_path": str(file_path)
+            "file_path": str(file_path),
+            "job_id": job_id
         })
         
     except Exception as e:
@@ -514,111 +609,377 @@ async def upload_video(video: UploadFile = File(...)):
         }, status_code=500)
 
 @app.post("/process")
-async def process_video(background_tasks: BackgroundTasks, debug_mode: bool = False):
-    """Start video processing in background"""
-    global video_processor, current_video_path, processing_complete
+async def process_video(background_tasks: BackgroundTasks, debug_mode: bool = False, job_id: str = None,
+                        long_video: bool = None, interval: float = None):
+    """Start video processing in background
+
+    Without a job_id, the most recent upload is processed. Videos at least
+    LONG_VIDEO_MIN_SECONDS long (or any, with long_video=true) are processed
+    in long-video mode: one frame every interval seconds, results stored as
+    they are produced and paged from /jobs/<job_id>/frames.
+    """
+    job = broker.get_job(job_id) if job_id else broker.latest_job(status="uploaded")
     
-    if not current_video_path or not Path(current_video_path).exists():
+    if not job or not Path(job["video_path"]).exists():
         return JSONResponse({
             "status": "error",
             "message": "No video uploaded or video file not found"
         }, status_code=400)
     
-    # Reset processing state
-    processing_complete = False
+    broker.put_job(job["job_id"], status="queued", debug_mode=debug_mode, worker=os.getpid())
     
-    # Initialize video processor with debug mode setting
-    video_processor = VideoProcessor(debug_mode=debug_mode)
+    # Start processing in background on this worker
+    background_tasks.add_task(process_video_task, job["job_id"], debug_mode, long_video, interval)
     
-    # Start processing in background
-    background_tasks.add_task(process_video_task)
-    
-    return {"status": "processing", "message": "Video processing started"}
+    return {"status": "processing", "message": "Video processing started", "job_id": job["job_id"]}
+
+def _video_seconds(video_path: str) -> float:
+    """Nominal duration from the container header (frame count / fps)"""
+    import cv2
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        return cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps > 0 else 0.0
+    finally:
+        cap.release()
 
-async def process_video_task():
-    """Process video and store results"""
-    global video_processor, current_video_path, processing_complete
+async def process_video_task(job_id: str, debug_mode: bool = False, long_video: bool = None,
+                             interval: float = None):
+    """Process video and publish its progress and results through the broker"""
+    job = broker.get_job(job_id)
+    channel = _channel(job_id)
     
     try:
-        # Load video
-        if not await video_processor.load_video(current_video_path):
+        if long_video is None:
+            long_video = await asyncio.to_thread(_video_seconds, job["video_path"]) >= \
+                float(os.getenv('LONG_VIDEO_MIN_SECONDS', '600'))
+        if long_video:
+            await long_video_task(job_id, interval or float(os.getenv('LONG_VIDEO_INTERVAL', '5')), debug_mode)
             return
+
+        video_processor = await RESOURCES.aget("video_processor_debug" if debug_mode else "video_processor")
+        broker.put_job(job_id, status="processing")
         
-        # Process video with sample rate of 10 frames
-        async for update in video_processor.process_video(sample_rate=10):
-            # Send update to all active connections
-            for connection in active_connections:
-                await connection.send_json({
-                    "status": "processing",
-                    **update
-                })
+        frames = []
+        summary = {}
+        async for update in video_processor.process_video(job["video_path"], job_id=job_id):
+            if "summary" in update:
+                summary = update
+                continue
+            frame = _frame_message(update)
+            frames.append(frame)
+            # Send update to every websocket following this job, on any worker
+            broker.publish(channel, {"status": "processing", **frame})
         
         # Get final results
         results = {
             "status": "complete",
-            "processed_frames": len(video_processor.frame_ingredients),
-            "total_frames": video_processor.frame_count,
-            "all_ingredients": list(video_processor.all_ingredients),
-            "frame_ingredients": video_processor.frame_ingredients
+            "job_id": job_id,
+            "video_url": job.get("video_url"),
+            "processed_frames": summary.get("processed_frames", len(frames)),
+            "total_frames": summary.get("total_frames"),
+            "ingredients": summary.get("unique_ingredients", []),
+            "frames": frames
         }
         
-        # Store results
-        processing_complete = True
-        
-        # Send final results to all active connections
-        for connection in active_connections:
-            await connection.send_json(results)
+        # Store results, then send them to every connection
+        broker.put_job(job_id, status="complete", result=results)
+        broker.publish(channel, results)
         
     except Exception as e:
-        # Send error to all active connections
-        for connection in active_connections:
-            await connection.send_json({
-                "status": "error",
-                "message": str(e)
-            })
-    finally:
-        # Close video
-        video_processor.close()
+        broker.put_job(job_id, status="error", error=str(e))
+        broker.publish(channel, {
+            "status": "error",
+            "message": str(e)
+        })
+
+async def long_video_task(job_id: str, interval: float, debug_mode: bool = False):
+    """Process a long video with bounded memory: every frame result goes to storage as it is produced
+
+    Frames are published one by one as usual, but the final message only
+    carries the summary; the frames are paged from /jobs/<job_id>/frames.
+    """
+    job = broker.get_job(job_id)
+    channel = _channel(job_id)
+    video_processor = await RESOURCES.aget("video_processor_debug" if debug_mode else "video_processor")
+    storage = await RESOURCES.aget("storage")
+    video_id = await storage.start_video(os.path.basename(job["video_path"]), 0,
+                                         metadata={"job_id": job_id, "long_video": True, "interval": interval})
+    broker.put_job(job_id, status="processing", long_video=True, video_id=video_id)
+
+    summary = {}
+    async for update in video_processor.process_long_video(
+            job["video_path"], job_id=job_id, interval=interval,
+            memory_limit_mb=float(os.getenv('LONG_VIDEO_MEMORY_MB', '512')) or None,
+            should_stop=lambda: bool((broker.get_job(job_id) or {}).get("stop_requested"))):
+        if "summary" in update:
+            summary = update
+            continue
+        frame = _frame_message(update)
+        await storage.store_objects(update["frame_number"], datetime.now(), update["ingredients"], video_id=video_id,
+                                    frame_size=(update["width"], update["height"]),
+                                    frame_data={"frame_url": frame["frame_url"], "thumbnail": frame["thumbnail"],
+                                                "video_seconds": frame["timestamp"], "tracked": update["tracked"]})
+        broker.publish(channel, {"status": "processing", **frame})
+
+    results = _session_results(job_id, summary)
+    results.update(video_url=job.get("video_url"), video_id=video_id, frames_url=f"/jobs/{job_id}/frames")
+    await storage.save_results(video_id, results)
+    broker.put_job(job_id, status="complete", result=results)
+    broker.publish(channel, results)
+
+def _session_results(job_id: str, summary: dict) -> dict:
+    """Final message of a streamed session; its frames were already sent one by one, so only the summary"""
+    results = {key: value for key, value in summary.items()
+               if key not in ("summary", "unique_ingredients", "ingredients")}
+    results.update(status="complete", job_id=job_id, frames=[],
+                   ingredients=summary.get("unique_ingredients", []),
+                   ingredient_details=summary.get("ingredients", []))
+    return results
+
+# Live sessions run until stopped, so they are tasks of their own rather than request background tasks
+_live_tasks = set()
+
+@app.post("/live")
+async def start_live(source: str, target_fps: float = None,
+                     latency_budget: float = None, duration: float = None, debug_mode: bool = False):
+    """Start analysing a live source: a webcam index, an RTSP/HTTP URL, or "test:<path>" to replay a file
+
+    Results are pushed to /ws?job_id=<job_id> as they are produced; POST
+    /live/<job_id>/stop ends the session.
+    """
+    job_id = new_job_id()
+    broker.put_job(job_id, status="queued", live=True, source=source, worker=os.getpid())
+    task = asyncio.create_task(live_task(
+        job_id, source,
+        target_fps if target_fps is not None else float(os.getenv('LIVE_TARGET_FPS', '1')),
+        latency_budget if latency_budget is not None else float(os.getenv('LIVE_LATENCY_BUDGET', '2')),
+        duration, debug_mode
+    ))
+    _live_tasks.add(task)
+    task.add_done_callback(_live_tasks.discard)
+    return {"status": "processing", "message": "Live analysis started", "job_id": job_id}
+
+@app.post("/live/{job_id}/stop")
+@app.post("/jobs/{job_id}/stop")
+async def stop_live(job_id: str):
+    """Ask the worker running a live session or long-video job to stop it, through the broker"""
+    job = broker.get_job(job_id)
+    if job is None or not (job.get("live") or job.get("long_video")):
+        return JSONResponse({"status": "error", "message": f"No such live session or long-video job: {job_id}"},
+                            status_code=404)
+    broker.put_job(job_id, stop_requested=True)
+    return {"status": "stopping", "job_id": job_id}
+
+async def live_task(job_id: str, source: str, target_fps: float, latency_budget: float,
+                    duration: float = None, debug_mode: bool = False):
+    """Analyse a live source, publishing each fresh result through the broker until stopped"""
+    channel = _channel(job_id)
+    try:
+        video_processor = await RESOURCES.aget("video_processor_debug" if debug_mode else "video_processor")
+        broker.put_job(job_id, status="processing")
+
+        summary = {}
+        async for update in video_processor.process_live(
+                source, job_id=job_id, target_fps=target_fps, latency_budget=latency_budget,
+                buffer_size=int(os.getenv('LIVE_BUFFER_FRAMES', '2')), duration=duration,
+                should_stop=lambda: bool((broker.get_job(job_id) or {}).get("stop_requested"))):
+            if "summary" in update:
+                summary = update
+                continue
+            broker.publish(channel, {"status": "processing", **_frame_message(update)})
+
+        results = _session_results(job_id, summary)
+        broker.put_job(job_id, status="complete", result=results)
+        broker.publish(channel, results)
+
+    except Exception as e:
+        broker.put_job(job_id, status="error", error=str(e))
+        broker.publish(channel, {
+            "status": "error",
+            "message": str(e)
+        })
+
+@app.websocket("/ws/ingest")
+async def ingest_endpoint(websocket: WebSocket, mode: str = "frames", sample_fps: float = 1.0,
+                          debug_mode: bool = False):
+    """Analyse frames streamed from the browser, without uploading a file first
+
+    Protocol:
+      server -> {"type": "ready", "job_id", "window"}: the client may have window frames outstanding
+      client -> binary message: one JPEG/WebP frame (mode=frames) or a MediaRecorder chunk (mode=chunks)
+      server -> {"type": "ack", "seq", "status", "credits"}: queued, rejected (no credit) or received (chunk)
+      server -> {"type": "result", "seq", ...frame}: a frame's ingredients; each result returns a credit
+      client -> {"type": "end"}: finish; the server answers with {"type": "complete", ...summary}
+    Results are also published on the job's channel, so /ws?job_id=<job_id> can follow the session.
+    """
+    from .ingest import IngestSession
+
+    await websocket.accept()
+    job_id = new_job_id()
+    channel = _channel(job_id)
+    # Acks and results are sent from different tasks
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict):
+        async with send_lock:
+            await websocket.send_json(message)
+
+    async def on_result(update: dict):
+        if "frame" in update:
+            message = {"type": "result", "seq": update["seq"], "latency": update["latency"],
+                       "credits": update["credits"], **_frame_message(update)}
+            broker.publish(channel, {"status": "processing", **_frame_message(update)})
+        else:
+            message = {"type": "result", **update}
+        await send(message)
+
+    session = None
+    try:
+        video_processor = await RESOURCES.aget("video_processor_debug" if debug_mode else "video_processor")
+        session = IngestSession(video_processor, job_id, on_result, mode=mode,
+                                window=int(os.getenv('INGEST_WINDOW', '4')), sample_fps=sample_fps)
+        broker.put_job(job_id, status="processing", ingest=True, mode=mode, worker=os.getpid())
+        session.start()
+        await send({"type": "ready", "job_id": job_id, "window": session.window})
+
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                await send(await session.receive(message["bytes"]))
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    control = {}
+                if control.get("type") == "end":
+                    break
+
+        results = _session_results(job_id, await session.finish())
+        broker.put_job(job_id, status="complete", result=results)
+        broker.publish(channel, results)
+        await send({"type": "complete", **results})
+        await websocket.close()
+
+    except WebSocketDisconnect:
+        if session:
+            await session.cancel()
+        broker.put_job(job_id, status="error", error="Client disconnected")
+        broker.publish(channel, {"status": "error", "message": "Client disconnected"})
+    except Exception as e:
+        if session:
+            await session.cancel()
+        broker.put_job(job_id, status="error", error=str(e))
+        broker.publish(channel, {"status": "error", "message": str(e)})
+        try:
+            await send({"type": "error", "message": str(e)})
+            await websocket.close()
+        except Exception:
+            pass
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time processing updates"""
+async def websocket_endpoint(websocket: WebSocket, job_id: str = None):
+    """WebSocket endpoint for real-time processing updates
+
+    Replays the job's events so far, then follows it until it completes or fails.
+    Without a job_id, the most recently updated job is followed.
+    """
     await websocket.accept()
     
-    # Add to active connections
-    active_connections.add(websocket)
-    
     try:
+        job = broker.get_job(job_id) if job_id else broker.latest_job()
+        if not job:
+            await websocket.send_json({"status": "error", "message": "No such job"})
+            return
+        
         # Send current results if available
-        if processing_complete:
-            await websocket.send_json({
-                "status": "complete",
-                "processed_frames": len(video_processor.frame_ingredients),
-                "total_frames": video_processor.frame_count,
-                "all_ingredients": list(video_processor.all_ingredients),
-                "frame_ingredients": video_processor.frame_ingredients
-            })
+        if job.get("status") in TERMINAL_STATUSES and job.get("result"):
+            await websocket.send_json(job["result"])
+            return
         
-        # Keep connection open
-        while True:
-            await websocket.receive_text()
+        async for _, message in broker.subscribe(_channel(job["job_id"])):
+            await websocket.send_json(message)
             
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
-        # Remove from active connections
-        active_connections.remove(websocket)
+        await websocket.close()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job state and results, from whichever worker processed it"""
+    job = broker.get_job(job_id)
+    if job is None:
+        return JSONResponse({"status": "error", "message": f"No such job: {job_id}"}, status_code=404)
+    return job
+
+@app.get("/jobs/{job_id}/frames")
+async def get_job_frames(job_id: str, after: int = -1, limit: int = 100):
+    """A page of a long-video job's frame results, in frame order after frame number `after`
+
+    Available while the job runs. Pass the returned next_after to get the following page; it is
+    null on the last page so far.
+    """
+    job = broker.get_job(job_id)
+    if job is None or job.get("video_id") is None:
+        return JSONResponse({"status": "error", "message": f"No stored frames for job: {job_id}"}, status_code=404)
+    limit = max(1, min(limit, 500))
+    stored = await (await RESOURCES.aget("storage")).get_frames(job["video_id"], after, limit)
+    frames = [{
+        "frame_number": frame["frame_number"],
+        "frame_url": frame["frame_data"].get("frame_url"),
+        "thumbnail": frame["frame_data"].get("thumbnail"),
+        "timestamp": frame["frame_data"].get("video_seconds") or 0.0,
+        "tracked": frame["frame_data"].get("tracked", False),
+        "objects": frame["objects"]
+    } for frame in stored]
+    return {
+        "job_id": job_id,
+        "status": job.get("status"),
+        "frames": frames,
+        "next_after": frames[-1]["frame_number"] if len(frames) == limit else None
+    }
+
+@app.get("/frames/{job_id}/{frame_number}/{rendition}")
+async def get_frame_rendition(job_id: str, frame_number: int, rendition: str, request: Request):
+    """Serve a rendition of a sampled frame; other workers' frames come from the shared spill directory"""
+    from .frame_store import FRAME_STORE
+    frame = FRAME_STORE.get(job_id, frame_number, rendition)
+    if frame is None:
+        return JSONResponse({"status": "error", "message": "Frame not found"}, status_code=404)
+    headers = {"ETag": frame.etag, "Cache-Control": "private, max-age=3600, immutable"}
+    if request.headers.get("if-none-match") == frame.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=frame.data, media_type=frame.media_type, headers=headers)
 
 @app.get("/status")
 async def get_status():
     """Health check endpoint"""
-    return {"status": "running"}
+    return {"status": "running", "worker": os.getpid(), "broker": type(broker).__name__}
 
 def start_server():
-    """Start the FastAPI server"""
+    """Start the FastAPI server
+
+    WORKERS > 1 (or "auto" for one per core) runs several worker processes that
+    share job state through a SQLite broker and frames through a shared directory.
+    A single worker keeps the in-process broker and auto-reload.
+    """
     host = os.getenv('HOST', '127.0.0.1')
     port = int(os.getenv('PORT', 9000))  # Using port 9000 instead
-    uvicorn.run("src.main:app", host=host, port=port, reload=True)
+    workers = os.getenv('WORKERS', '1')
+    workers = (os.cpu_count() or 1) if workers == 'auto' else int(workers)
+    if workers > 1:
+        # Workers are spawned with this environment, so they all pick the same shared state
+        os.environ.setdefault('BROKER_URL', 'sqlite:///temp/broker.db')
+        os.environ.setdefault('FRAME_SPILL_DIR', 'temp/frame_store')
+        os.environ.setdefault('FRAME_STORE_WRITE_THROUGH', 'true')
+        if os.environ['BROKER_URL'] == 'memory':
+            raise ValueError("BROKER_URL=memory cannot be shared by several workers")
+    uvicorn.run("src.main:app", host=host, port=port, workers=workers, reload=workers == 1)
 
 if __name__ == "__main__":
     start_server()
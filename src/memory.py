@@ -0,0 +1,45 @@
+import os
+import sys
+
+# Megabytes here are MiB, matching limit_mb and everything reported in MB
+MB = 1024 * 1024
+
+def rss_bytes() -> int:
+    """Resident memory of this process now (its peak where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class MemoryCeiling:
+    def __init__(self, limit_mb: float):
+        """Hard limit on how far a job may grow the process's resident memory
+
+        The baseline is taken when the job starts, so memory held by other jobs
+        already running doesn't count, but growth from jobs started alongside
+        it does: this is the backstop, while the job's own buffers are bounded
+        by construction.
+
+        Args:
+            limit_mb: Megabytes of growth above the baseline allowed
+        """
+        self.limit = int(limit_mb * MB)
+        self.baseline = rss_bytes()
+        self.peak = 0
+
+    def used(self) -> int:
+        """Bytes of growth above the baseline, now"""
+        used = max(0, rss_bytes() - self.baseline)
+        self.peak = max(self.peak, used)
+        return used
+
+    def exceeded(self) -> bool:
+        return self.used() > self.limit
+
+    @property
+    def peak_mb(self) -> float:
+        return self.peak / MB
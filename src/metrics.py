@@ -0,0 +1,208 @@
+import os
+import time
+import threading
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from typing import Dict, List, Tuple, Optional
+
+# Latency buckets in seconds, from fast local work up to slow model calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NULL_TIMER = nullcontext()
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        """Collection of metrics rendered together on /metrics
+
+        Args:
+            enabled: When False every metric update returns immediately
+        """
+        self.enabled = enabled
+        self.metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric") -> "_Metric":
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Exposition lines for this metric"""
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str):
+        super().__init__(registry, name, documentation)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not self.registry.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str):
+        super().__init__(registry, name, documentation)
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        if not self.registry.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+class _Timer:
+    def __init__(self, histogram: "Histogram", labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: MetricsRegistry, name: str, documentation: str,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        if not self.registry.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, **labels):
+        """Context manager that observes the duration of its block"""
+        if not self.registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, series in self._values.items():
+                for bound, count in zip(self.buckets, series):
+                    bucket_labels = _format_labels(key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                inf_labels = _format_labels(key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+REGISTRY = MetricsRegistry(enabled=os.getenv('METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no'))
+
+def counter(name: str, documentation: str) -> Counter:
+    return REGISTRY.register(Counter(REGISTRY, name, documentation))
+
+def gauge(name: str, documentation: str) -> Gauge:
+    return REGISTRY.register(Gauge(REGISTRY, name, documentation))
+
+def histogram(name: str, documentation: str, buckets: Optional[Tuple[float, ...]] = None) -> Histogram:
+    return REGISTRY.register(Histogram(REGISTRY, name, documentation, buckets or DEFAULT_BUCKETS))
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+# Hot-path timings
+DECODE_SECONDS = histogram("thinkvision_decode_seconds", "Time to decode one video frame")
+FRAME_ENCODE_SECONDS = histogram("thinkvision_frame_encode_seconds", "Time to encode a frame for disk or a model request")
+MODEL_LATENCY_SECONDS = histogram("thinkvision_model_latency_seconds", "Latency of vision/LLM model calls")
+PARSE_SECONDS = histogram("thinkvision_parse_seconds", "Time to parse a model response")
+DB_WRITE_SECONDS = histogram("thinkvision_db_write_seconds", "Time to store a frame's detections")
+PREFILTER_SECONDS = histogram("thinkvision_prefilter_seconds", "Time for the local pre-filter to check one frame")
+LIVE_LATENCY_SECONDS = histogram("thinkvision_live_latency_seconds", "Time from capturing a live frame to its result")
+TTS_LATENCY_SECONDS = histogram("thinkvision_tts_latency_seconds", "Time to synthesize speech: one chunk in batch mode, the whole request in stream mode")
+
+# Per-backend counters
+API_CALLS = counter("thinkvision_api_calls_total", "External API calls per backend")
+RETRIES = counter("thinkvision_retries_total", "Retried API calls per backend")
+HEDGED_REQUESTS = counter("thinkvision_hedged_requests_total", "Hedge requests fired for slow API calls per backend")
+CACHE_HITS = counter("thinkvision_cache_hits_total", "Cache hits per backend")
+ERRORS = counter("thinkvision_errors_total", "Errors per backend")
+ROUTED_FRAMES = counter("thinkvision_routed_frames_total", "Frames the vision router dispatched per backend")
+SPILLOVERS = counter("thinkvision_spillovers_total", "Frames moved off a failing or rate-limited backend, per backend")
+ESCALATIONS = counter("thinkvision_escalations_total", "Low-confidence frames re-sent to the escalation backend")
+VISION_COST_USD = counter("thinkvision_vision_cost_usd_total", "Estimated vision API spend per backend")
+PREFILTER_SKIPPED = counter("thinkvision_prefilter_skipped_total", "Frames the local pre-filter kept from the cloud model, per reason")
+PARSE_FAILURES = counter("thinkvision_parse_failures_total", "Model responses that did not parse cleanly, per backend and outcome")
+LIVE_DROPPED_FRAMES = counter("thinkvision_live_dropped_frames_total", "Live frames dropped unanalysed, per reason (overflow, stale)")
+INGESTED_FRAMES = counter("thinkvision_ingested_frames_total", "Frames streamed in over the ingest websocket, per outcome (queued, rejected, dropped, ...)")
+FRAME_BUFFER_ALLOCATIONS = counter("thinkvision_frame_buffer_allocations_total", "Decode buffers allocated by frame pools (reused buffers are not counted)")
+TRACKER_FRAMES = counter("thinkvision_tracker_frames_total", "Sampled frames per tracker outcome (tracked, new_region, low_confidence, ...)")
+
+# Load
+QUEUE_DEPTH = gauge("thinkvision_queue_depth", "Sampled frames waiting for analysis")
+INFLIGHT_JOBS = gauge("thinkvision_inflight_jobs", "Videos currently being processed")
+FRAME_STORE_BYTES = gauge("thinkvision_frame_store_bytes", "Encoded frame bytes held in memory")
+CIRCUIT_OPEN = gauge("thinkvision_circuit_open", "1 while a backend's circuit breaker is open")
+
+# Startup
+STARTUP_SECONDS = gauge("thinkvision_startup_seconds", "Seconds from importing the app to serving requests")
+RESOURCE_INIT_SECONDS = gauge("thinkvision_resource_init_seconds", "Seconds taken to build each lazily created resource")
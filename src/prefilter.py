@@ -0,0 +1,141 @@
+import os
+import cv2
+import numpy as np
+from typing import List, Optional, Iterable
+from .metrics import PREFILTER_SECONDS, PREFILTER_SKIPPED
+
+# ImageNet-1k classes for dishes, fruit and vegetables (923 plate .. 969 eggnog, minus 958 hay)
+IMAGENET_FOOD_CLASSES = frozenset(range(923, 970)) - {958}
+
+class FilterResult:
+    def __init__(self, keep: bool, score: float, reason: str, crops: Optional[List[List[int]]] = None):
+        """Pre-filter decision for one frame
+
+        Args:
+            keep: Whether the frame should go to the cloud model
+            score: Food probability (0-1) from the local model
+            reason: "food", "no_food", "blurry" or "dark"
+            crops: Suggested [x1, y1, x2, y2] regions worth a closer look
+        """
+        self.keep = keep
+        self.score = score
+        self.reason = reason
+        self.crops = crops or []
+
+class MockFoodNet:
+    """Stand-in for a cv2.dnn ImageNet classifier, for tests and benchmarks
+
+    Mimics setInput/forward and scores food by how much of the image is
+    strongly coloured, which is enough to separate the synthetic clips'
+    fruit and vegetables from bare counters, floors and doors.
+    """
+    def __init__(self, num_classes: int = 1000, saturation_threshold: int = 90):
+        self.num_classes = num_classes
+        self.saturation_threshold = saturation_threshold
+        self._blob = None
+
+    def setInput(self, blob: np.ndarray):
+        self._blob = blob
+
+    def forward(self) -> np.ndarray:
+        # The blob is NCHW, RGB scaled to 0-1
+        image = (self._blob[0].transpose(1, 2, 0) * 255).clip(0, 255).astype(np.uint8)
+        saturation = cv2.cvtColor(image, cv2.COLOR_RGB2HSV)[:, :, 1]
+        food = min(1.0, float((saturation > self.saturation_threshold).mean()) * 10)
+        logits = np.full((1, self.num_classes), -10.0, dtype=np.float32)
+        logits[0, min(IMAGENET_FOOD_CLASSES)] = np.log(max(food, 1e-6))
+        logits[0, 0] = np.log(max(1 - food, 1e-6))
+        return logits
+
+class FramePrefilter:
+    def __init__(self, net, food_classes: Iterable[int] = IMAGENET_FOOD_CLASSES, threshold: float = 0.2,
+                 input_size: int = 224, blur_threshold: float = 2.0, dark_threshold: float = 25.0,
+                 max_crops: int = 3):
+        """Local CPU food classifier that runs before the cloud vision model
+
+        Args:
+            net: Loaded cv2.dnn network (or MockFoodNet) producing class logits
+            food_classes: Output indices that count as food
+            threshold: Minimum summed food probability for a frame to be kept
+            input_size: Square input resolution of the network
+            blur_threshold: Laplacian variance below which a frame is too blurry to analyse
+            dark_threshold: Mean brightness below which a frame is too dark to analyse
+            max_crops: Maximum crop suggestions per frame
+        """
+        self.net = net
+        self.food_classes = np.array(sorted(food_classes))
+        self.threshold = threshold
+        self.input_size = input_size
+        self.blur_threshold = blur_threshold
+        self.dark_threshold = dark_threshold
+        self.max_crops = max_crops
+        self.checked = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_onnx(cls, model_path: str, **kwargs) -> "FramePrefilter":
+        """Load an ImageNet-style ONNX classifier (e.g. MobileNetV3/SqueezeNet) once"""
+        net = cv2.dnn.readNetFromONNX(model_path)
+        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        return cls(net, **kwargs)
+
+    def food_score(self, frame: np.ndarray) -> float:
+        blob = cv2.dnn.blobFromImage(frame, 1 / 255.0, (self.input_size, self.input_size), swapRB=True)
+        self.net.setInput(blob)
+        logits = self.net.forward().reshape(-1).astype(np.float64)
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        return float(probabilities[self.food_classes].sum())
+
+    def suggest_crops(self, frame: np.ndarray) -> List[List[int]]:
+        """Bounding boxes of the largest strongly coloured regions, where ingredients usually are"""
+        small = cv2.resize(frame, (160, 90 if frame.shape[0] < frame.shape[1] else 160))
+        scale_x, scale_y = frame.shape[1] / small.shape[1], frame.shape[0] / small.shape[0]
+        saturation = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)[:, :, 1]
+        _, mask = cv2.threshold(saturation, 90, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, np.ones((5, 5), np.uint8))
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        crops = []
+        for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:self.max_crops]:
+            if cv2.contourArea(contour) < 20:
+                break
+            x, y, w, h = cv2.boundingRect(contour)
+            crops.append([int(x * scale_x), int(y * scale_y), int((x + w) * scale_x), int((y + h) * scale_y)])
+        return crops
+
+    def check(self, frame: np.ndarray) -> FilterResult:
+        """Decide whether a BGR frame is worth a cloud call"""
+        self.checked += 1
+        with PREFILTER_SECONDS.time():
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if gray.mean() < self.dark_threshold:
+                result = FilterResult(False, 0.0, "dark")
+            elif cv2.Laplacian(gray, cv2.CV_64F).var() < self.blur_threshold:
+                result = FilterResult(False, 0.0, "blurry")
+            else:
+                score = self.food_score(frame)
+                if score >= self.threshold:
+                    result = FilterResult(True, score, "food", self.suggest_crops(frame))
+                else:
+                    result = FilterResult(False, score, "no_food")
+
+        if not result.keep:
+            self.skipped += 1
+            PREFILTER_SKIPPED.inc(reason=result.reason)
+        return result
+
+def build_prefilter() -> Optional[FramePrefilter]:
+    """Pre-filter from PREFILTER_MODEL (an .onnx path, or "mock"); None when unset"""
+    model = os.getenv('PREFILTER_MODEL', '').strip()
+    if not model:
+        return None
+    threshold = float(os.getenv('PREFILTER_THRESHOLD', '0.2'))
+    if model == "mock":
+        return FramePrefilter(MockFoodNet(), threshold=threshold)
+    if not os.path.exists(model):
+        print(f"Pre-filter model not found at {model}; sending every sampled frame to the cloud")
+        return None
+    print(f"Loading pre-filter model: {model}")
+    return FramePrefilter.from_onnx(model, threshold=threshold)
@@ -0,0 +1,271 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from typing import Dict, Callable, Optional, TypeVar
+from .metrics import RETRIES, HEDGED_REQUESTS, CIRCUIT_OPEN
+
+T = TypeVar('T')
+
+# HTTP statuses worth retrying: timeouts, throttling and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# SDK exception class names (google.api_core, anthropic, httpx) for the same conditions,
+# matched by name so neither SDK has to be importable here
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "RateLimitError", "APIConnectionError",
+    "APITimeoutError", "OverloadedError", "ConnectError", "ReadTimeout",
+}
+
+# The subset of those that mean "slow down" rather than "unhealthy"
+THROTTLED_ERRORS = {"ResourceExhausted", "TooManyRequests", "RateLimitError"}
+
+# Set by a router while it still has other backends to try: a throttled call then
+# fails at once so the frame spills over instead of backing off on this provider
+fail_fast_on_throttle: contextvars.ContextVar[bool] = contextvars.ContextVar('fail_fast_on_throttle', default=False)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERRORS:
+        return True
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    try:
+        return int(status) in RETRYABLE_STATUS
+    except (TypeError, ValueError):
+        return False
+
+def is_throttled(error: BaseException) -> bool:
+    """True for rate-limit errors (HTTP 429, RESOURCE_EXHAUSTED)"""
+    if type(error).__name__ in THROTTLED_ERRORS:
+        return True
+    status = getattr(error, "code", None) or getattr(error, "status_code", None)
+    try:
+        return int(status) == 429
+    except (TypeError, ValueError):
+        return False
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """Per-provider circuit breaker
+
+        Args:
+            name: Provider name, used for the metrics label
+            failure_threshold: Consecutive retryable failures that open the circuit
+            reset_timeout: Seconds before an open circuit lets one trial call through
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let a single trial request probe the provider
+                self.state = "half_open"
+                return True
+            return False
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be refused (open and not yet due, or a trial call in flight)"""
+        if self.state == "half_open":
+            return True
+        return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != "closed":
+                self.state = "closed"
+                CIRCUIT_OPEN.set(0, backend=self.name)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    print(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                CIRCUIT_OPEN.set(1, backend=self.name)
+
+    def release(self):
+        """Close a half-open circuit whose trial call got an answer that says nothing about provider health"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "closed"
+                self.failures = 0
+                CIRCUIT_OPEN.set(0, backend=self.name)
+
+    def abandon(self):
+        """Re-open a half-open circuit whose trial call never finished (cancelled)"""
+        if self.state == "half_open":
+            self.record_failure()
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        """Rolling window of recent call latencies"""
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+    def __len__(self):
+        return len(self.samples)
+
+class ResilientCaller:
+    def __init__(self, name: str, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 deadline: float = 30.0, hedge_percentile: Optional[float] = None, hedge_min_samples: int = 20,
+                 breaker: Optional[CircuitBreaker] = None):
+        """Retry, deadline, hedging and circuit breaking around a blocking provider call
+
+        Args:
+            name: Provider name, used for metrics labels
+            max_retries: Retries after the first attempt for retryable errors
+            base_delay: Backoff base in seconds; attempt n waits up to base_delay * 2**n
+            max_delay: Cap on a single backoff wait
+            deadline: Seconds each attempt may take before it is abandoned
+            hedge_percentile: When set, an attempt still running after this latency
+                percentile fires a second identical request and the first answer wins
+            hedge_min_samples: Latency samples needed before hedging kicks in
+            breaker: Circuit breaker shared by all callers of this provider
+        """
+        self.name = name
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latencies = LatencyTracker()
+
+    async def call(self, fn: Callable[[], T]) -> T:
+        """Run fn in a worker thread with retries, a per-attempt deadline and optional hedging
+
+        Rate-limit errors are retried like other transient errors unless
+        fail_fast_on_throttle is set, in which case they are raised at once.
+        """
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} circuit is open; not calling the provider")
+            settled = False
+            try:
+                result = await self._attempt(fn)
+                self.breaker.record_success()
+                settled = True
+                return result
+            except Exception as e:
+                if not is_retryable(e):
+                    # Client-side errors say nothing about the provider's health
+                    self.breaker.release()
+                    settled = True
+                    raise
+                self.breaker.record_failure()
+                settled = True
+                if attempt == self.max_retries or (fail_fast_on_throttle.get() and is_throttled(e)):
+                    raise
+                error = e
+            finally:
+                if not settled:
+                    # Cancelled mid-call: a half-open trial must not leave the circuit stuck half open
+                    self.breaker.abandon()
+
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+            RETRIES.inc(backend=self.name)
+            print(f"{self.name} call failed ({type(error).__name__}: {error}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_percentile is None or len(self.latencies) < self.hedge_min_samples:
+            return None
+        return self.latencies.percentile(self.hedge_percentile)
+
+    async def _attempt(self, fn: Callable[[], T]) -> T:
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(asyncio.to_thread(fn))
+        hedge_delay = self._hedge_delay()
+
+        try:
+            if hedge_delay is None or hedge_delay >= self.deadline:
+                result = await asyncio.wait_for(primary, self.deadline)
+            else:
+                result = await self._hedged(fn, primary, hedge_delay, start)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"{self.name} call exceeded its {self.deadline:.1f}s deadline")
+
+        self.latencies.record(time.perf_counter() - start)
+        return result
+
+    async def _hedged(self, fn: Callable[[], T], primary: "asyncio.Future[T]", hedge_delay: float, start: float) -> T:
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        HEDGED_REQUESTS.inc(backend=self.name)
+        pending = {primary, asyncio.ensure_future(asyncio.to_thread(fn))}
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = self.deadline - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The loser keeps running in its thread; its result is discarded
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+
+        for future in pending:
+            future.cancel()
+        if error is not None:
+            raise error
+        raise asyncio.TimeoutError()
+
+_callers: Dict[str, ResilientCaller] = {}
+_callers_lock = threading.Lock()
+
+def get_caller(name: str, **kwargs) -> ResilientCaller:
+    """Shared ResilientCaller per provider, so breaker state and latency history are per provider"""
+    with _callers_lock:
+        caller = _callers.get(name)
+        if caller is None:
+            caller = _callers[name] = ResilientCaller(name, **kwargs)
+        return caller
+
+def vision_caller(name: str) -> ResilientCaller:
+    """Shared caller for a vision backend, configured from VISION_* environment variables"""
+    hedge = os.getenv('VISION_HEDGE_PERCENTILE')
+    return get_caller(
+        name,
+        max_retries=int(os.getenv('VISION_MAX_RETRIES', '3')),
+        deadline=float(os.getenv('VISION_DEADLINE_SECONDS', '30')),
+        hedge_percentile=float(hedge) if hedge else None,
+    )
@@ -0,0 +1,74 @@
+import time
+import asyncio
+import threading
+from typing import Dict, Any, Callable, Iterable, Optional
+from .metrics import RESOURCE_INIT_SECONDS
+
+class ResourceRegistry:
+    def __init__(self):
+        """Named app resources built on first use instead of at import time
+
+        Heavy dependencies (cv2, numpy, google.generativeai) and backend
+        clients are imported inside the factories, so importing the app stays
+        cheap and a new worker only pays for what its first requests need.
+        """
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._closers: Dict[str, Callable[[Any], None]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self.init_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], None]] = None):
+        """Register a zero-argument factory; close(instance) runs at shutdown if the resource was built"""
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+        if close:
+            self._closers[name] = close
+
+    def get(self, name: str) -> Any:
+        """The resource, built by its factory on first call"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource: {name}")
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.init_seconds[name] = time.perf_counter() - start
+                RESOURCE_INIT_SECONDS.set(self.init_seconds[name], resource=name)
+            return self._instances[name]
+
+    async def aget(self, name: str) -> Any:
+        """get() for request handlers: a first-time build runs in a thread, off the event loop"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        return await asyncio.to_thread(self.get, name)
+
+    def set(self, name: str, instance: Any):
+        """Use an existing instance instead of the factory (e.g. a stub in the benchmark)"""
+        self._instances[name] = instance
+
+    def loaded(self) -> Dict[str, Optional[float]]:
+        """Built resources and their build time in seconds (None when set directly)"""
+        return {name: self.init_seconds.get(name) for name in self._instances}
+
+    async def warm(self, names: Iterable[str]):
+        """Build resources off the event loop, e.g. at startup when WARM_RESOURCES asks for it"""
+        for name in names:
+            await self.aget(name)
+
+    def close(self):
+        for name, close in self._closers.items():
+            instance = self._instances.pop(name, None)
+            if instance is not None:
+                try:
+                    close(instance)
+                except Exception as e:
+                    print(f"Error closing {name}: {e}")
+        self._instances.clear()
+        self.init_seconds.clear()
+
+RESOURCES = ResourceRegistry()
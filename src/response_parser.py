@@ -0,0 +1,281 @@
+import re
+import json
+from typing import Dict, List, Any, Callable, Optional
+from .metrics import PARSE_FAILURES
+
+# Schema for the {"objects": [...]} payload every vision backend is asked for
+OBJECT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "label": {"type": "string", "minLength": 1},
+        "category": {"type": "string"},
+        "description": {"type": "string"},
+        "confidence": {"type": "number"},
+        "bbox": {"type": "array", "items": {"type": "number"}, "minItems": 4, "maxItems": 4},
+        "tile": {"type": "integer"},
+    },
+    "required": ["label"],
+}
+
+OBJECTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "objects": {"type": "array", "items": OBJECT_SCHEMA},
+    },
+    "required": ["objects"],
+}
+
+# Keys the providers' schema dialects (Gemini's OpenAPI subset, Anthropic tool input) accept
+_PROVIDER_SCHEMA_KEYS = {"type", "properties", "items", "required", "enum", "description", "nullable", "format"}
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+}
+
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+
+def provider_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip a JSON schema down to the keywords structured-output APIs accept"""
+    result = {}
+    for key, value in schema.items():
+        if key not in _PROVIDER_SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {name: provider_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            value = provider_schema(value)
+        result[key] = value
+    return result
+
+def compile_schema(schema: Dict[str, Any]) -> Callable[[Any, str], List[str]]:
+    """Compile a JSON schema subset into a validator function
+
+    The schema is walked once; the returned function only runs the checks
+    that apply, and returns a list of error messages (empty when valid).
+    Supports type, enum, properties, required, items, minimum/maximum,
+    minLength and minItems/maxItems.
+    """
+    checks: List[Callable[[Any, str, List[str]], bool]] = []
+
+    expected_type = schema.get("type")
+    if expected_type:
+        type_check = _TYPE_CHECKS[expected_type]
+
+        def check_type(value, path, errors):
+            if not type_check(value):
+                errors.append(f"{path}: expected {expected_type}, got {type(value).__name__}")
+                return False
+            return True
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = set(schema["enum"])
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} not in {sorted(allowed)}")
+            return True
+        checks.append(check_enum)
+
+    if "minimum" in schema or "maximum" in schema:
+        minimum = schema.get("minimum", float("-inf"))
+        maximum = schema.get("maximum", float("inf"))
+
+        def check_range(value, path, errors):
+            if not minimum <= value <= maximum:
+                errors.append(f"{path}: {value} outside [{minimum}, {maximum}]")
+            return True
+        checks.append(check_range)
+
+    if "minLength" in schema:
+        min_length = schema["minLength"]
+
+        def check_length(value, path, errors):
+            if len(value) < min_length:
+                errors.append(f"{path}: shorter than {min_length}")
+            return True
+        checks.append(check_length)
+
+    if "minItems" in schema or "maxItems" in schema:
+        min_items = schema.get("minItems", 0)
+        max_items = schema.get("maxItems", float("inf"))
+
+        def check_items_count(value, path, errors):
+            if not min_items <= len(value) <= max_items:
+                errors.append(f"{path}: expected {min_items}..{max_items} items, got {len(value)}")
+            return True
+        checks.append(check_items_count)
+
+    if "required" in schema:
+        required = list(schema["required"])
+
+        def check_required(value, path, errors):
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing required field '{name}'")
+            return True
+        checks.append(check_required)
+
+    if "properties" in schema:
+        property_validators = {name: compile_schema(prop) for name, prop in schema["properties"].items()}
+
+        def check_properties(value, path, errors):
+            for name, validator in property_validators.items():
+                if name in value:
+                    errors.extend(validator(value[name], f"{path}.{name}"))
+            return True
+        checks.append(check_properties)
+
+    if "items" in schema:
+        item_validator = compile_schema(schema["items"])
+
+        def check_array_items(value, path, errors):
+            for i, item in enumerate(value):
+                errors.extend(item_validator(item, f"{path}[{i}]"))
+            return True
+        checks.append(check_array_items)
+
+    def validate(value: Any, path: str = "$") -> List[str]:
+        errors: List[str] = []
+        for check in checks:
+            # A failed type check makes the remaining checks meaningless
+            if not check(value, path, errors):
+                break
+        return errors
+
+    return validate
+
+validate_object = compile_schema(OBJECT_SCHEMA)
+
+class ParseResult:
+    def __init__(self, objects: List[Dict[str, Any]], status: str, errors: Optional[List[str]] = None):
+        """Outcome of parsing one model response
+
+        Args:
+            objects: Objects that passed schema validation
+            status: "ok", "recovered" (partial/malformed JSON salvaged) or "failed"
+            errors: Validation and decoding problems encountered
+        """
+        self.objects = objects
+        self.status = status
+        self.errors = errors or []
+
+    @property
+    def failed(self) -> bool:
+        return self.status == "failed"
+
+def _skip_separators(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in " \t\r\n,":
+        pos += 1
+    return pos
+
+def _scan_array(text: str, pos: int, decoder: json.JSONDecoder) -> List[Any]:
+    """Decode array elements one at a time from pos, skipping past broken ones"""
+    items = []
+    while True:
+        pos = _skip_separators(text, pos)
+        if pos >= len(text) or text[pos] == "]":
+            return items
+        try:
+            item, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            # Truncated or malformed element: resync on the next object, if any
+            next_start = text.find("{", pos + 1)
+            if next_start < 0:
+                return items
+            pos = next_start
+            continue
+        items.append(item)
+
+def tolerant_parse(text: str) -> Optional[List[Any]]:
+    """Recover the elements of the objects array from malformed or truncated JSON
+
+    Returns None when no array could be located at all.
+    """
+    decoder = json.JSONDecoder()
+    match = re.search(r'"objects"\s*:\s*\[', text)
+    if match:
+        return _scan_array(text, match.end(), decoder)
+
+    array_start = text.find("[")
+    object_start = text.find("{")
+    if array_start >= 0 and (object_start < 0 or array_start < object_start):
+        return _scan_array(text, array_start + 1, decoder)
+
+    # Last resort: any standalone objects that look like detections
+    items = []
+    pos = object_start
+    while pos >= 0:
+        try:
+            item, end = decoder.raw_decode(text, pos)
+            if isinstance(item, dict) and "label" in item:
+                items.append(item)
+                pos = text.find("{", end)
+                continue
+        except json.JSONDecodeError:
+            pass
+        pos = text.find("{", pos + 1)
+    return items or None
+
+def _extract_objects(data: Any) -> Optional[List[Any]]:
+    if isinstance(data, dict) and isinstance(data.get("objects"), list):
+        return data["objects"]
+    if isinstance(data, list):
+        return data
+    return None
+
+def parse_data(data: Any, backend: str, recovered: bool = False) -> ParseResult:
+    """Validate an already decoded payload (e.g. a tool call's input)"""
+    items = _extract_objects(data)
+    if items is None:
+        PARSE_FAILURES.inc(backend=backend, outcome="failed")
+        return ParseResult([], "failed", ["$: expected an object with an 'objects' array"])
+
+    objects, errors = [], []
+    for i, item in enumerate(items):
+        item_errors = validate_object(item, f"$.objects[{i}]")
+        if item_errors:
+            errors.extend(item_errors)
+            PARSE_FAILURES.inc(backend=backend, outcome="invalid_object")
+        else:
+            objects.append(item)
+
+    if recovered:
+        PARSE_FAILURES.inc(backend=backend, outcome="recovered")
+    return ParseResult(objects, "recovered" if recovered else "ok", errors)
+
+def parse_objects(text: str, backend: str) -> ParseResult:
+    """Parse a model's text response into validated detection objects
+
+    Strict JSON decoding is tried first, then the outermost {...} span, and
+    finally the tolerant scanner, which salvages complete array elements
+    from truncated or malformed output.
+    """
+    text = _CODE_FENCE.sub("", text or "").strip()
+    if not text:
+        PARSE_FAILURES.inc(backend=backend, outcome="failed")
+        return ParseResult([], "failed", ["empty response"])
+
+    try:
+        return parse_data(json.loads(text), backend)
+    except json.JSONDecodeError:
+        pass
+
+    # JSON wrapped in prose
+    json_start, json_end = text.find("{"), text.rfind("}") + 1
+    if json_start >= 0 and json_end > json_start:
+        try:
+            return parse_data(json.loads(text[json_start:json_end]), backend)
+        except json.JSONDecodeError:
+            pass
+
+    items = tolerant_parse(text)
+    if not items:
+        PARSE_FAILURES.inc(backend=backend, outcome="failed")
+        return ParseResult([], "failed", ["no complete objects found in response"])
+    return parse_data({"objects": items}, backend, recovered=True)
@@ -0,0 +1,141 @@
+import time
+from typing import List, Optional
+
+class AdaptiveSampler:
+    def __init__(self, frame_count: int, max_frames: int, fixed_stride: Optional[int] = None,
+                 min_discovery_rate: Optional[float] = None, min_frames: int = 3,
+                 max_cost: Optional[float] = None, cost_per_frame: float = 0.0, max_latency: Optional[float] = None,
+                 min_density: float = 0.5, max_density: float = 2.0, smoothing: float = 0.5):
+        """Pick the next frame to analyse from the results so far
+
+        The stride spreads the remaining frame budget over the rest of the
+        video, scaled by a density that doubles after a frame with new
+        ingredients and halves after one without. Sampling stops when the
+        frame, cost or latency budget runs out, or when the smoothed number of
+        new ingredients per frame drops below min_discovery_rate.
+
+        Args:
+            frame_count: Frames in the video (0 if unknown)
+            max_frames: Maximum frames to sample
+            fixed_stride: Sample every N frames instead of adapting
+            min_discovery_rate: Stop when new ingredients per frame (smoothed) fall below this
+            min_frames: Frames to analyse before the discovery rate may stop sampling
+            max_cost: Estimated USD budget for model calls
+            cost_per_frame: Estimated USD cost of analysing one frame
+            max_latency: Seconds the whole video may take
+            min_density: Lowest sampling density relative to an even spread
+            max_density: Highest sampling density relative to an even spread
+            smoothing: Weight of the newest frame in the discovery rate
+        """
+        self.frame_count = frame_count
+        self.max_frames = max_frames
+        self.fixed_stride = fixed_stride
+        self.min_discovery_rate = min_discovery_rate
+        self.min_frames = min_frames
+        self.max_cost = max_cost
+        self.cost_per_frame = cost_per_frame
+        self.max_latency = max_latency
+        self.min_density = min_density
+        self.max_density = max_density
+        self.smoothing = smoothing
+
+        self.start = time.monotonic()
+        self.next_index = 0
+        self.slots_used = 0
+        self.analysed = 0
+        self.spent = 0.0
+        self.density = 1.0
+        self.discovery_rate: Optional[float] = None
+        self.frame_seconds: Optional[float] = None
+        self.stop_reason: Optional[str] = None
+        self._cycle_start = self.start
+
+    def _stride(self) -> int:
+        if self.fixed_stride:
+            return self.fixed_stride
+        if self.frame_count <= 0:
+            return 1
+        remaining_frames = self.frame_count - self.next_index
+        remaining_slots = max(1, self.max_frames - self.slots_used)
+        return max(1, int(remaining_frames / remaining_slots / self.density))
+
+    def _stop(self, reason: str) -> None:
+        self.stop_reason = reason
+        return None
+
+    def next_frame(self) -> Optional[int]:
+        """Index of the next frame to analyse, or None when sampling should stop"""
+        now = time.monotonic()
+        self._cycle_start = now
+        if self.slots_used >= self.max_frames:
+            return self._stop("max_frames")
+        if 0 < self.frame_count <= self.next_index:
+            return self._stop("end_of_video")
+        if (self.min_discovery_rate is not None and self.analysed >= self.min_frames
+                and self.discovery_rate is not None and self.discovery_rate < self.min_discovery_rate):
+            return self._stop("discovery_rate")
+        if self.max_cost is not None and self.spent + self.cost_per_frame > self.max_cost:
+            return self._stop("cost_budget")
+        if self.max_latency is not None and now - self.start + (self.frame_seconds or 0) > self.max_latency:
+            return self._stop("latency_budget")
+        return self.next_index
+
+    def record(self, new_labels: List[str], analysed: bool = True):
+        """Account for the frame returned by next_frame and move on
+
+        Args:
+            new_labels: Ingredients first seen in this frame
+            analysed: False when the frame was skipped without a model call
+        """
+        index = self.next_index
+        self.slots_used += 1
+        if analysed:
+            self.analysed += 1
+            self.spent += self.cost_per_frame
+            cycle = time.monotonic() - self._cycle_start
+            self.frame_seconds = cycle if self.frame_seconds is None else (
+                self.frame_seconds + self.smoothing * (cycle - self.frame_seconds))
+
+            found = len(new_labels)
+            self.discovery_rate = found if self.discovery_rate is None else (
+                self.discovery_rate + self.smoothing * (found - self.discovery_rate))
+            if found:
+                self.density = min(self.max_density, self.density * 2)
+            else:
+                self.density = max(self.min_density, self.density / 2)
+
+        self.next_index = index + self._stride()
+
+class TimestampSampler:
+    def __init__(self, interval: float, start: float = 0.0, end: Optional[float] = None):
+        """Pick frames by presentation time rather than frame index
+
+        Phone recordings are often variable frame rate, so the nominal fps and
+        frame count say little about when a frame was shown, and "every N
+        frames" drifts. A frame is taken when its timestamp reaches the next
+        slot; slots that fall in a gap of the recording are skipped rather than
+        bunched up after it.
+
+        Args:
+            interval: Seconds of video between sampled frames
+            start: Seconds into the video of the first slot
+            end: Seconds into the video after which sampling stops (None: the end)
+        """
+        if interval <= 0:
+            raise ValueError(f"Sampling interval must be positive, got {interval}")
+        self.interval = interval
+        self.start = start
+        self.end = end
+        self.next_time = start
+        self.sampled = 0
+
+    def finished(self, seconds: float) -> bool:
+        return self.end is not None and seconds > self.end
+
+    def due(self, seconds: float) -> bool:
+        """Whether the frame shown at seconds is sampled; if so, move on to the next slot it hasn't passed"""
+        if seconds + 1e-6 < self.next_time or self.finished(seconds):
+            return False
+        self.next_time += (int((seconds - self.next_time) / self.interval) + 1) * self.interval
+        self.sampled += 1
+        return True
@@ -1,9 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import or_, create_engine, inspect, text, Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 import json
+import math
+from .metrics import DB_WRITE_SECONDS, ERRORS
+from .tracing import span
+from .vocabulary import get_vocabulary
+from .fingerprint import VideoFingerprint, signature_distance
 
 Base = declarative_base()
 
@@ -15,6 +21,10 @@ class Video(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     total_frames = Column(Integer)
     video_data = Column(JSON)  # Renamed from metadata
+    file_hash = Column(String, index=True)  # Fast content hash, for exact duplicates
+    file_size = Column(Integer)
+    signature = Column(JSON(none_as_null=True))  # Keyframe difference hashes, for near duplicates
+    results = Column(JSON(none_as_null=True))  # Processing results returned for duplicate uploads
 
 class Frame(Base):
     __tablename__ = 'frames'
@@ -24,42 +34,124 @@ class Frame(Base):
     frame_number = Column(Integer)
     timestamp = Column(DateTime, default=datetime.utcnow)
     frame_data = Column(JSON)  # Renamed from metadata
+    width = Column(Integer)  # Frame size in pixels, the space bounding boxes are in
+    height = Column(Integer)
     
     video = relationship("Video", back_populates="frames")
     objects = relationship("ObjectDetection", back_populates="frame")
 
+    # Frames of a video in order, for paging through long videos
+    __table_args__ = (Index('ix_frames_video_frame_number', 'video_id', 'frame_number'),)
+
 Video.frames = relationship("Frame", back_populates="video")
 
 class ObjectDetection(Base):
     __tablename__ = 'object_detections'
 
     id = Column(Integer, primary_key=True)
-    frame_id = Column(Integer, ForeignKey('frames.id'))
+    frame_id = Column(Integer, ForeignKey('frames.id'), index=True)
     label = Column(String)
     category = Column(String)
     description = Column(String)
     confidence = Column(Float)
     bbox = Column(JSON)  # Stores bounding box coordinates [x1, y1, x2, y2]
+    x1 = Column(Float)  # The same box in numeric columns (frame pixels), mirrored in the object_boxes R*Tree
+    y1 = Column(Float)
+    x2 = Column(Float)
+    y2 = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
     extra_data = Column(JSON)  # Additional metadata
     
     frame = relationship("Frame", back_populates="objects")
 
+def _box(bbox: Any) -> Optional[Tuple[float, float, float, float]]:
+    """A detection's [x1, y1, x2, y2] as ordered floats, or None if it has no usable box"""
+    try:
+        x1, y1, x2, y2 = (float(value) for value in bbox)
+    except (TypeError, ValueError):
+        return None
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+def _distance(box: Sequence[float], x: float, y: float) -> float:
+    """Distance from a point to the nearest edge of a box (0 inside it)"""
+    dx = max(box[0] - x, 0.0, x - box[2])
+    dy = max(box[1] - y, 0.0, y - box[3])
+    return math.hypot(dx, dy)
+
+def describe_position(box: Sequence[float], width: Optional[int], height: Optional[int]) -> Optional[str]:
+    """Where a box's centre falls in a 3x3 grid over the frame, e.g. "top left" or "centre" """
+    if not width or not height:
+        return None
+    column = ("left", "centre", "right")[min(2, int(3 * (box[0] + box[2]) / 2 / width))]
+    row = ("top", "middle", "bottom")[min(2, int(3 * (box[1] + box[3]) / 2 / height))]
+    return "centre" if (row, column) == ("middle", "centre") else f"{row} {column}"
+
 class ObjectStorage:
     def __init__(self, db_url: str = "sqlite:///objects.db"):
         self.engine = create_engine(db_url)
         Base.metadata.create_all(self.engine)
+        self._add_missing_columns()
+        self.rtree = self._create_spatial_index()
         self.Session = sessionmaker(bind=self.engine)
         self.current_video_id = None
 
-    async def start_video(self, filename: str, total_frames: int, metadata: Dict = None) -> int:
-        """Start processing a new video"""
+    def _add_missing_columns(self):
+        """Add columns introduced after a database was created; create_all only creates whole tables"""
+        with self.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=self.engine.dialect)
+                        connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+
+    def _create_spatial_index(self) -> bool:
+        """Create the object_boxes R*Tree over detection boxes, backfilling older rows
+
+        The tree's third dimension is the frame id (a point), so one lookup
+        answers "boxes overlapping R in frame F" as well as "boxes overlapping R
+        in any frame". Returns False when the database has no R*Tree module (not
+        SQLite, or SQLite built without it); queries then use the numeric columns.
+        """
+        if self.engine.dialect.name != "sqlite":
+            return False
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(text("CREATE VIRTUAL TABLE IF NOT EXISTS object_boxes "
+                                        "USING rtree(id, x1, x2, y1, y2, frame_min, frame_max)"))
+        except OperationalError as e:
+            print(f"SQLite R*Tree unavailable, spatial queries use indexed columns: {e}")
+            return False
+
+        with self.engine.begin() as connection:
+            # Databases from before the numeric columns only have the JSON box
+            rows = connection.execute(text("SELECT id, bbox FROM object_detections "
+                                           "WHERE x1 IS NULL AND bbox IS NOT NULL AND bbox != 'null'")).fetchall()
+            for detection_id, bbox in rows:
+                box = _box(json.loads(bbox) if isinstance(bbox, str) else bbox)
+                if box:
+                    connection.execute(text("UPDATE object_detections SET x1 = :x1, y1 = :y1, x2 = :x2, y2 = :y2 "
+                                            "WHERE id = :id"),
+                                       dict(zip(("x1", "y1", "x2", "y2"), box), id=detection_id))
+            connection.execute(text("INSERT INTO object_boxes (id, x1, x2, y1, y2, frame_min, frame_max) "
+                                    "SELECT id, x1, x2, y1, y2, frame_id, frame_id FROM object_detections "
+                                    "WHERE x1 IS NOT NULL AND id NOT IN (SELECT id FROM object_boxes)"))
+        return True
+
+    async def start_video(self, filename: str, total_frames: int, metadata: Dict = None,
+                          fingerprint: Optional[VideoFingerprint] = None) -> int:
+        """Start processing a new video, recording its fingerprint for later duplicate lookups"""
         session = self.Session()
         try:
             video = Video(
                 filename=filename,
                 total_frames=total_frames,
-                video_data=metadata or {}
+                video_data=metadata or {},
+                file_hash=fingerprint.file_hash if fingerprint else None,
+                file_size=fingerprint.file_size if fingerprint else None,
+                signature=fingerprint.signature if fingerprint else None
             )
             session.add(video)
             session.commit()
@@ -68,54 +160,138 @@ class ObjectStorage:
         finally:
             session.close()
 
-    async def store_objects(self, frame_number: int, timestamp: datetime, objects: List[Dict[Any, Any]]):
-        """Store objects detected in a video frame"""
-        if not self.current_video_id:
+    async def store_objects(self, frame_number: int, timestamp: datetime, objects: List[Dict[Any, Any]],
+                            video_id: Optional[int] = None, frame_size: Optional[Tuple[int, int]] = None,
+                            frame_data: Optional[Dict[str, Any]] = None):
+        """Store objects detected in a video frame (of video_id, or the current video)
+
+        Boxes go into the x1..y2 columns and the spatial index as well as the
+        bbox JSON; frame_size (width, height) records the space they are in.
+        frame_data is kept with the frame (e.g. its URLs and time in the video)
+        and returned by get_frames.
+        """
+        video_id = video_id or self.current_video_id
+        if not video_id:
             return
 
         session = self.Session()
         try:
-            # Create frame record
-            frame = Frame(
-                video_id=self.current_video_id,
-                frame_number=frame_number,
-                timestamp=timestamp,
-                frame_data={"timestamp": timestamp.isoformat()}
-            )
-            session.add(frame)
-            session.flush()  # Get frame ID
-
-            # Store detected objects
-            for obj in objects:
-                detection = ObjectDetection(
-                    frame_id=frame.id,
-                    label=obj.get('label'),
-                    category=obj.get('category'),
-                    description=obj.get('description'),
-                    confidence=obj.get('confidence', 0.0),
-                    bbox=obj.get('bbox'),
-                    extra_data=obj.get('metadata', {})
+            with DB_WRITE_SECONDS.time(), span("store", frame=frame_number, target="db"):
+                # Create frame record
+                frame = Frame(
+                    video_id=video_id,
+                    frame_number=frame_number,
+                    timestamp=timestamp,
+                    frame_data={**(frame_data or {}), "timestamp": timestamp.isoformat()},
+                    width=frame_size[0] if frame_size else None,
+                    height=frame_size[1] if frame_size else None
                 )
-                session.add(detection)
+                session.add(frame)
+                session.flush()  # Get frame ID
+
+                # Store detected objects
+                boxed = []
+                for obj in objects:
+                    box = _box(obj.get('bbox'))
+                    detection = ObjectDetection(
+                        frame_id=frame.id,
+                        label=obj.get('label'),
+                        category=obj.get('category'),
+                        description=obj.get('description'),
+                        confidence=obj.get('confidence', 0.0),
+                        bbox=obj.get('bbox'),
+                        x1=box[0] if box else None,
+                        y1=box[1] if box else None,
+                        x2=box[2] if box else None,
+                        y2=box[3] if box else None,
+                        extra_data=obj.get('metadata', {})
+                    )
+                    session.add(detection)
+                    if box:
+                        boxed.append(detection)
+
+                if boxed and self.rtree:
+                    session.flush()  # Get detection IDs
+                    session.execute(text("INSERT INTO object_boxes (id, x1, x2, y1, y2, frame_min, frame_max) "
+                                         "VALUES (:id, :x1, :x2, :y1, :y2, :frame, :frame)"),
+                                    [{"id": d.id, "x1": d.x1, "x2": d.x2, "y1": d.y1, "y2": d.y2, "frame": frame.id}
+                                     for d in boxed])
             
-            session.commit()
+                session.commit()
         except Exception as e:
             session.rollback()
+            ERRORS.inc(backend="db")
             print(f"Error storing frame objects: {e}")
         finally:
             session.close()
 
+    async def save_results(self, video_id: int, results: Dict[str, Any]):
+        """Keep a video's processing results so duplicate uploads can be answered from them"""
+        session = self.Session()
+        try:
+            session.query(Video).filter(Video.id == video_id).update({Video.results: results})
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            ERRORS.inc(backend="db")
+            print(f"Error saving video results: {e}")
+        finally:
+            session.close()
+
+    async def find_duplicate(self, fingerprint: VideoFingerprint, max_distance: float = 0.1,
+                             frame_tolerance: float = 0.05) -> Optional[Dict[str, Any]]:
+        """Most recent processed video with the same content, or None
+
+        An exact match has the same file hash and size. Otherwise a video whose
+        frame count is within frame_tolerance and whose keyframe signature differs
+        by at most max_distance (fraction of bits) counts as a near duplicate,
+        e.g. the same clip re-encoded or resized.
+        """
+        session = self.Session()
+        try:
+            processed = session.query(Video).filter(Video.results.isnot(None))
+            exact = (processed.filter(Video.file_hash == fingerprint.file_hash, Video.file_size == fingerprint.file_size)
+                     .order_by(Video.id.desc()).first())
+            if exact:
+                return {"video_id": exact.id, "match": "exact", "distance": 0.0, "results": exact.results}
+
+            if not fingerprint.signature:
+                return None
+            slack = int(fingerprint.frame_count * frame_tolerance)
+            candidates = processed.filter(Video.signature.isnot(None),
+                                          Video.total_frames.between(fingerprint.frame_count - slack,
+                                                                     fingerprint.frame_count + slack))
+            best = None
+            for video in candidates.order_by(Video.id.desc()):
+                distance = signature_distance(fingerprint.signature, video.signature)
+                if distance is not None and distance <= max_distance and (best is None or distance < best[0]):
+                    best = (distance, video)
+            if best:
+                distance, video = best
+                return {"video_id": video.id, "match": "near", "distance": distance, "results": video.results}
+            return None
+        finally:
+            session.close()
+
     async def find_object(self, query: str, video_id: Optional[int] = None) -> List[Dict[Any, Any]]:
-        """Search for objects by label or description, optionally filtered by video"""
+        """Search for objects by label or description, optionally filtered by video
+
+        The query is expanded through the vocabulary index, so "aubergines"
+        also finds detections stored as "eggplant".
+        """
         session = self.Session()
         try:
-            query_obj = session.query(ObjectDetection, Frame, Video).join(Frame).join(Video)
+            query_obj = (session.query(ObjectDetection, Frame, Video)
+                         .select_from(ObjectDetection)
+                         .join(Frame, ObjectDetection.frame_id == Frame.id)
+                         .join(Video, Frame.video_id == Video.id))
             
             # Add search conditions
-            query_obj = query_obj.filter(
-                (ObjectDetection.label.ilike(f"%{query}%")) |
-                (ObjectDetection.description.ilike(f"%{query}%"))
-            )
+            conditions = []
+            for term in get_vocabulary().expand(query):
+                conditions.append(ObjectDetection.label.ilike(f"%{term}%"))
+                conditions.append(ObjectDetection.description.ilike(f"%{term}%"))
+            query_obj = query_obj.filter(or_(*conditions))
             
             # Filter by video if specified
             if video_id:
@@ -170,6 +346,187 @@ class ObjectStorage:
         finally:
             session.close()
 
+    async def get_frames(self, video_id: int, after: int = -1, limit: int = 100) -> List[Dict[str, Any]]:
+        """A page of a video's stored frames with their objects, by frame number after the given one
+
+        Pages are keyed on frame_number rather than an offset, so a page is
+        one indexed range scan however far into a long video it is.
+        """
+        session = self.Session()
+        try:
+            frames = (session.query(Frame)
+                      .filter(Frame.video_id == video_id, Frame.frame_number > after)
+                      .order_by(Frame.frame_number).limit(limit).all())
+            objects: Dict[int, List[Dict[str, Any]]] = {frame.id: [] for frame in frames}
+            if frames:
+                for obj in session.query(ObjectDetection).filter(ObjectDetection.frame_id.in_(list(objects))):
+                    objects[obj.frame_id].append({
+                        'label': obj.label,
+                        'category': obj.category,
+                        'description': obj.description,
+                        'confidence': obj.confidence,
+                        'bbox': obj.bbox,
+                        'metadata': obj.extra_data
+                    })
+
+            return [{
+                'frame_number': frame.frame_number,
+                'width': frame.width,
+                'height': frame.height,
+                'frame_data': frame.frame_data or {},
+                'objects': objects[frame.id]
+            } for frame in frames]
+        finally:
+            session.close()
+
+    def _frame(self, session, video_id: Optional[int], frame_number: int) -> Optional[Frame]:
+        """A frame of video_id, or of the latest video that has that frame number"""
+        query_obj = session.query(Frame).filter(Frame.frame_number == frame_number)
+        if video_id:
+            query_obj = query_obj.filter(Frame.video_id == video_id)
+        return query_obj.order_by(Frame.id.desc()).first()
+
+    def _overlapping(self, session, region: Sequence[float], frame_id: Optional[int] = None,
+                     video_id: Optional[int] = None, label: Optional[str] = None):
+        """Query of (ObjectDetection, Frame, Video) whose boxes overlap region, narrowed by the R*Tree"""
+        rx1, ry1, rx2, ry2 = _box(region)
+        query_obj = (session.query(ObjectDetection, Frame, Video)
+                     .select_from(ObjectDetection)
+                     .join(Frame, ObjectDetection.frame_id == Frame.id)
+                     .join(Video, Frame.video_id == Video.id))
+        if self.rtree:
+            sql = "SELECT id FROM object_boxes WHERE x2 >= :rx1 AND x1 <= :rx2 AND y2 >= :ry1 AND y1 <= :ry2"
+            params = {"rx1": rx1, "ry1": ry1, "rx2": rx2, "ry2": ry2}
+            if frame_id is not None:
+                sql += " AND frame_max >= :frame AND frame_min <= :frame"
+                params["frame"] = frame_id
+            query_obj = query_obj.filter(ObjectDetection.id.in_(text(sql).bindparams(**params).columns(id=Integer)))
+        # The tree stores 32-bit floats rounded outwards; the exact columns drop its near misses
+        query_obj = query_obj.filter(ObjectDetection.x1 <= rx2, ObjectDetection.x2 >= rx1,
+                                     ObjectDetection.y1 <= ry2, ObjectDetection.y2 >= ry1)
+        if frame_id is not None:
+            query_obj = query_obj.filter(ObjectDetection.frame_id == frame_id)
+        if video_id:
+            query_obj = query_obj.filter(Frame.video_id == video_id)
+        if label:
+            query_obj = query_obj.filter(or_(*[ObjectDetection.label.ilike(f"%{term}%")
+                                               for term in get_vocabulary().expand(label)]))
+        return query_obj
+
+    @staticmethod
+    def _located(obj: ObjectDetection, frame: Frame, video: Video) -> Dict[str, Any]:
+        box = [obj.x1, obj.y1, obj.x2, obj.y2] if obj.x1 is not None else None
+        return {
+            'id': obj.id,
+            'label': obj.label,
+            'confidence': obj.confidence,
+            'bbox': box,
+            'position': describe_position(box, frame.width, frame.height) if box else None,
+            'frame_number': frame.frame_number,
+            'frame_size': [frame.width, frame.height] if frame.width else None,
+            'video_id': video.id,
+            'video_filename': video.filename,
+            'timestamp': obj.timestamp.isoformat()
+        }
+
+    async def objects_in_region(self, region: Sequence[float], frame_number: Optional[int] = None,
+                                video_id: Optional[int] = None, label: Optional[str] = None,
+                                limit: int = 50) -> List[Dict[Any, Any]]:
+        """Objects whose boxes overlap region [x1, y1, x2, y2] (frame pixels)
+
+        With frame_number, only that frame of the video (or the current video);
+        without it, any frame, e.g. "what was ever on the left-hand shelf?".
+        """
+        video_id = video_id or self.current_video_id
+        session = self.Session()
+        try:
+            frame_id = None
+            if frame_number is not None:
+                frame = self._frame(session, video_id, frame_number)
+                if not frame:
+                    return []
+                frame_id = frame.id
+            results = (self._overlapping(session, region, frame_id, video_id, label)
+                       .order_by(ObjectDetection.id.desc()).limit(limit).all())
+            return [self._located(obj, frame, video) for obj, frame, video in results]
+        finally:
+            session.close()
+
+    async def nearest_objects(self, x: float, y: float, frame_number: int, video_id: Optional[int] = None,
+                              label: Optional[str] = None, limit: int = 3, exclude: Sequence[int] = (),
+                              max_distance: Optional[float] = None) -> List[Dict[Any, Any]]:
+        """Objects in a frame closest to the point (x, y), nearest first, with their pixel distance
+
+        Searches a square window around the point through the spatial index,
+        doubling it until limit objects lie within its radius (so no closer box
+        can be outside it), it covers the frame or it reaches max_distance.
+        """
+        video_id = video_id or self.current_video_id
+        session = self.Session()
+        try:
+            frame = self._frame(session, video_id, frame_number)
+            if not frame:
+                return []
+            reach = 2 * max(frame.width or 0, frame.height or 0, 4096)
+            if max_distance is not None:
+                reach = min(reach, max_distance)
+            radius = min(64.0, reach)
+            while True:
+                found = []
+                for obj, obj_frame, video in self._overlapping(session, (x - radius, y - radius, x + radius, y + radius),
+                                                               frame.id, label=label).all():
+                    if obj.id in exclude:
+                        continue
+                    distance = _distance((obj.x1, obj.y1, obj.x2, obj.y2), x, y)
+                    found.append((distance, obj, obj_frame, video))
+                within = [item for item in found if item[0] <= radius]
+                if len(within) >= limit or radius >= reach:
+                    break
+                radius = min(radius * 2, reach)
+            found = sorted((item for item in found if max_distance is None or item[0] <= max_distance),
+                           key=lambda item: item[0])
+            return [{**self._located(obj, obj_frame, video), 'distance': round(distance, 1)}
+                    for distance, obj, obj_frame, video in found[:limit]]
+        finally:
+            session.close()
+
+    async def locate(self, query: str, video_id: Optional[int] = None, neighbours: int = 3) -> Optional[Dict[str, Any]]:
+        """Answer "where is X?": the latest sighting of X, where it was in the frame and what was next to it
+
+        Matches labels through the vocabulary index and prefers sightings with a
+        box; neighbours are other items within a quarter of the frame (or three
+        box sizes when the frame size is unknown). Returns None if X was never detected.
+        """
+        session = self.Session()
+        try:
+            query_obj = (session.query(ObjectDetection, Frame, Video)
+                         .select_from(ObjectDetection)
+                         .join(Frame, ObjectDetection.frame_id == Frame.id)
+                         .join(Video, Frame.video_id == Video.id)
+                         .filter(or_(*[ObjectDetection.label.ilike(f"%{term}%")
+                                       for term in get_vocabulary().expand(query)])))
+            if video_id:
+                query_obj = query_obj.filter(Video.id == video_id)
+            match = query_obj.order_by(ObjectDetection.x1.is_(None), ObjectDetection.id.desc()).first()
+            if not match:
+                return None
+            location = self._located(*match)
+        finally:
+            session.close()
+
+        location['near'] = []
+        box = location['bbox']
+        if box:
+            same = get_vocabulary().normalize(location['label'])
+            frame_size = location['frame_size']
+            reach = max(frame_size) / 4 if frame_size else 3 * max(box[2] - box[0], box[3] - box[1])
+            nearby = await self.nearest_objects((box[0] + box[2]) / 2, (box[1] + box[3]) / 2,
+                                                location['frame_number'], location['video_id'],
+                                                limit=neighbours + 1, exclude=(location['id'],), max_distance=reach)
+            location['near'] = [obj['label'] for obj in nearby
+                                if get_vocabulary().normalize(obj['label']) != same][:neighbours]
+        return location
+
     async def get_video_summary(self, video_id: Optional[int] = None) -> Dict[str, Any]:
         """Get summary of objects detected in a video"""
         if not video_id:
@@ -222,6 +579,8 @@ class ObjectStorage:
             session.query(ObjectDetection).filter(
                 ObjectDetection.timestamp < cutoff
             ).delete()
+            if self.rtree:
+                session.execute(text("DELETE FROM object_boxes WHERE id NOT IN (SELECT id FROM object_detections)"))
             
             # Delete old frames
             session.query(Frame).filter(
@@ -1,12 +1,17 @@
+import os
+import sys
 import asyncio
+# Repo root, so the script-style modules and ObjectStorage share the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from voice_interface import VoiceInterface
 from tts import talk
+from src.storage import ObjectStorage
 
 # take in both detected_obj_JSON + user query -> Deepgram response
 
 async def test_voice_interface():
     # Initialize voice interface
-    voice = VoiceInterface()
+    voice = VoiceInterface(storage=ObjectStorage(os.getenv("DATABASE_URL", "sqlite:///objects.db")))
     
     # Sample detected objects
     objects = [
@@ -1,9 +1,14 @@
+import os
+import sys
 import asyncio
+# Repo root, so the script-style modules and ObjectStorage share the src package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from voice_interface import VoiceInterface, talk
+from src.storage import ObjectStorage
 
 async def test_cooking_assistant():
     # Initialize voice interface
-    voice = VoiceInterface()
+    voice = VoiceInterface(storage=ObjectStorage(os.getenv("DATABASE_URL", "sqlite:///objects.db")))
     
     # Add all detected ingredients as objects
     ingredients = [
@@ -0,0 +1,188 @@
+import os
+import cv2
+import math
+import numpy as np
+from typing import Dict, List, Any, Optional, Sequence
+from .vocabulary import get_vocabulary
+
+TILING_MODES = ("off", "grid", "shelves", "roi")
+
+def box_overlap(a: Sequence[float], b: Sequence[float]) -> float:
+    """IoU of two [x1, y1, x2, y2] boxes, or intersection over the smaller box if that is larger"""
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    if not inter:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    # Also compare against the smaller box: an item cut by a tile edge shows up as a partial box
+    return max(inter / (area_a + area_b - inter), inter / max(min(area_a, area_b), 1e-9))
+
+def _split(start: int, end: int, parts: int, overlap: float) -> List[List[int]]:
+    """Cut [start, end) into parts spans that each extend overlap (fraction of a span) into their neighbours"""
+    step = (end - start) / parts
+    pad = step * overlap / 2
+    return [[int(max(start, start + i * step - pad)), int(min(end, start + (i + 1) * step + pad))] for i in range(parts)]
+
+class FrameTiler:
+    def __init__(self, mode: str = "grid", tile_size: int = 1024, overlap: float = 0.15, max_tiles: int = 6,
+                 merge_iou: float = 0.5):
+        """Cut large frames into overlapping tiles for one batched model request, and merge the results
+
+        Small items on crowded shelves get lost when a whole 4K frame is
+        downscaled into one image. Tiling keeps them at a readable size while
+        each tile is still sent at no more than tile_size pixels.
+
+        Args:
+            mode: "grid" (overlapping grid), "shelves" (horizontal bands between shelf edges
+                found with Canny + Hough lines, grid if none are found), "roi" (the pre-filter's
+                crop suggestions, grid if there are none) or "off"
+            tile_size: Frames whose long side is at most this are not tiled; tiles are
+                downscaled to at most this on their long side
+            overlap: Fraction of a tile shared with each neighbour, so items on a seam appear whole in one tile
+            max_tiles: Upper bound on tiles per frame
+            merge_iou: Overlap (IoU, or intersection over the smaller box) at which two same-label boxes are one item
+        """
+        if mode not in TILING_MODES:
+            raise ValueError(f"Unknown tiling mode {mode!r}; expected one of {TILING_MODES}")
+        self.mode = mode
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.max_tiles = max_tiles
+        self.merge_iou = merge_iou
+
+    def should_tile(self, frame: np.ndarray) -> bool:
+        return self.mode != "off" and max(frame.shape[:2]) > self.tile_size
+
+    def grid(self, width: int, height: int) -> List[List[int]]:
+        """Overlapping [x1, y1, x2, y2] grid with tiles of about tile_size, capped at max_tiles"""
+        cols = max(1, math.ceil(width / self.tile_size))
+        rows = max(1, math.ceil(height / self.tile_size))
+        while cols * rows > self.max_tiles:
+            if cols >= rows:
+                cols -= 1
+            else:
+                rows -= 1
+        return [[x1, y1, x2, y2]
+                for y1, y2 in _split(0, height, rows, self.overlap)
+                for x1, x2 in _split(0, width, cols, self.overlap)]
+
+    def shelf_edges(self, frame: np.ndarray, min_gap: float = 0.12) -> List[int]:
+        """y coordinates of long, near-horizontal lines (shelf fronts), from a downscaled edge map"""
+        height, width = frame.shape[:2]
+        scale = 640 / width
+        small = cv2.resize(frame, (640, max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        edges = cv2.Canny(gray, 50, 150)
+        lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=80, minLineLength=int(640 * 0.5), maxLineGap=20)
+        if lines is None:
+            return []
+
+        ys = sorted((y1 + y2) / 2 / scale for x1, y1, x2, y2 in lines.reshape(-1, 4).tolist()
+                    if abs(y2 - y1) <= 0.05 * abs(x2 - x1))
+        # Lines closer than min_gap of the height are the same shelf edge
+        edges_y: List[List[float]] = []
+        for y in ys:
+            if edges_y and y - edges_y[-1][-1] < min_gap * height:
+                edges_y[-1].append(y)
+            else:
+                edges_y.append([y])
+        return [int(sum(group) / len(group)) for group in edges_y
+                if min_gap * height < sum(group) / len(group) < (1 - min_gap) * height]
+
+    def shelves(self, frame: np.ndarray) -> List[List[int]]:
+        """One band per shelf, split into columns when a band is much wider than a tile"""
+        height, width = frame.shape[:2]
+        bounds = [0] + self.shelf_edges(frame) + [height]
+        if len(bounds) == 2:
+            return self.grid(width, height)
+
+        bands = [[y1, y2] for y1, y2 in zip(bounds, bounds[1:])]
+        cols = max(1, math.ceil(width / self.tile_size))
+        # Within max_tiles, trade columns against shelves as grid() does, joining the thinnest neighbouring bands
+        while cols * len(bands) > self.max_tiles:
+            if cols > 1 and cols >= len(bands):
+                cols -= 1
+            else:
+                i = min(range(len(bands) - 1), key=lambda i: bands[i + 1][1] - bands[i][0])
+                bands[i:i + 2] = [[bands[i][0], bands[i + 1][1]]]
+        tiles = []
+        for y1, y2 in bands:
+            pad = int((y2 - y1) * self.overlap / 2)
+            for x1, x2 in _split(0, width, cols, self.overlap):
+                tiles.append([x1, max(0, y1 - pad), x2, min(height, y2 + pad)])
+        return tiles
+
+    def tiles(self, frame: np.ndarray, crops: Optional[List[List[int]]] = None) -> List[List[int]]:
+        """Tile boxes for a frame in this tiler's mode"""
+        height, width = frame.shape[:2]
+        if self.mode == "shelves":
+            return self.shelves(frame)
+        if self.mode == "roi" and crops:
+            return [list(crop) for crop in crops[:self.max_tiles]]
+        return self.grid(width, height)
+
+    def crop(self, frame: np.ndarray, box: Sequence[int]) -> np.ndarray:
+        """A tile's pixels, downscaled to at most tile_size on the long side"""
+        x1, y1, x2, y2 = box
+        tile = frame[y1:y2, x1:x2]
+        longest = max(tile.shape[:2])
+        if longest > self.tile_size:
+            scale = self.tile_size / longest
+            tile = cv2.resize(tile, (max(1, int(tile.shape[1] * scale)), max(1, int(tile.shape[0] * scale))),
+                              interpolation=cv2.INTER_AREA)
+        return tile
+
+    def merge(self, boxes: List[List[int]], results: List[List[Dict[Any, Any]]]) -> List[Dict[Any, Any]]:
+        """Combine per-tile detections into one list for the frame
+
+        Boxes come back normalized to their tile and are mapped to frame pixels.
+        Same-label boxes that overlap are one item (highest confidence, union
+        box); same-label detections without boxes collapse into one.
+        """
+        vocabulary = get_vocabulary()
+        merged: List[Dict[Any, Any]] = []
+        by_label: Dict[str, List[Dict[Any, Any]]] = {}
+        for index, (box, objects) in enumerate(zip(boxes, results)):
+            x1, y1, x2, y2 = box
+            for obj in objects:
+                obj = dict(obj)
+                bbox = obj.get("bbox")
+                if bbox and len(bbox) == 4:
+                    bx1, by1, bx2, by2 = (min(max(float(value), 0.0), 1.0) for value in bbox)
+                    obj["bbox"] = [round(x1 + bx1 * (x2 - x1)), round(y1 + by1 * (y2 - y1)),
+                                   round(x1 + bx2 * (x2 - x1)), round(y1 + by2 * (y2 - y1))]
+                else:
+                    obj.pop("bbox", None)
+                obj["tiles"] = [index]
+
+                key = vocabulary.normalize(obj.get("label", ""))
+                same = by_label.setdefault(key, [])
+                match = next((other for other in same
+                              if ("bbox" in obj) == ("bbox" in other)
+                              and ("bbox" not in obj or box_overlap(obj["bbox"], other["bbox"]) >= self.merge_iou)), None)
+                if match is None:
+                    same.append(obj)
+                    merged.append(obj)
+                    continue
+                if "bbox" in obj:
+                    match["bbox"] = [min(match["bbox"][0], obj["bbox"][0]), min(match["bbox"][1], obj["bbox"][1]),
+                                     max(match["bbox"][2], obj["bbox"][2]), max(match["bbox"][3], obj["bbox"][3])]
+                if obj.get("confidence", 0) > match.get("confidence", 0):
+                    match["label"] = obj["label"]
+                    match["confidence"] = obj["confidence"]
+                match["tiles"] = sorted(set(match["tiles"]) | {index})
+        return merged
+
+def build_tiler() -> Optional[FrameTiler]:
+    """Tiler from TILING_MODE (default "off"), TILE_SIZE, TILE_OVERLAP and MAX_TILES"""
+    mode = os.getenv('TILING_MODE', 'off').strip().lower() or 'off'
+    if mode == 'off':
+        return None
+    return FrameTiler(
+        mode=mode,
+        tile_size=int(os.getenv('TILE_SIZE', '1024')),
+        overlap=float(os.getenv('TILE_OVERLAP', '0.15')),
+        max_tiles=int(os.getenv('MAX_TILES', '6')),
+    )
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import nullcontext
+from typing import Dict, List, Any, Optional
+
+# Job and frame of the work currently running, so nested stages (model call,
+# parse, store) are attributed without threading ids through every signature
+current_job_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('current_job_id', default=None)
+current_frame: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('current_frame', default=None)
+
+_NULL_SPAN = nullcontext()
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class Span:
+    def __init__(self, tracer: "Tracer", name: str, job_id: str, frame: Optional[int], attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.job_id = job_id
+        self.frame = frame
+        self.attributes = attributes
+        self.trace_id = hashlib.md5(job_id.encode()).hexdigest()
+        self.span_id = os.urandom(8).hex()
+        self.start_ns = 0
+        self.end_ns = 0
+        self.status = "ok"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            self.status = "error"
+            self.attributes["error"] = repr(exc)
+        self.tracer.finish(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "job_id": self.job_id,
+            "frame": self.frame,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6,
+            "status": self.status,
+            "attributes": dict(self.attributes),
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        attributes = dict(self.attributes, **{"job.id": self.job_id})
+        if self.frame is not None:
+            attributes["frame.number"] = self.frame
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+            "status": {"code": 2 if self.status == "error" else 1},
+        }
+
+class InMemoryCollector:
+    def __init__(self, max_jobs: int = 100, max_spans_per_job: int = 5000):
+        """Keep finished spans of the most recent jobs in memory
+
+        Args:
+            max_jobs: Number of jobs kept before the oldest is evicted
+            max_spans_per_job: Spans kept per job; later spans are dropped
+        """
+        self.max_jobs = max_jobs
+        self.max_spans_per_job = max_spans_per_job
+        self.jobs: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            spans = self.jobs.get(span.job_id)
+            if spans is None:
+                spans = self.jobs[span.job_id] = []
+                while len(self.jobs) > self.max_jobs:
+                    self.jobs.popitem(last=False)
+            if len(spans) < self.max_spans_per_job:
+                spans.append(span)
+
+    def get_spans(self, job_id: str) -> List[Span]:
+        with self._lock:
+            return list(self.jobs.get(job_id, []))
+
+class JsonFileExporter:
+    def __init__(self, path: str, service_name: str = "thinkvision"):
+        """Append spans to a file as OTLP/JSON export requests, one per line"""
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, span: Span):
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "thinkvision.tracing"}, "spans": [span.to_otlp()]}],
+            }]
+        }
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(request) + "\n")
+
+class Tracer:
+    def __init__(self, enabled: bool = True, export_path: Optional[str] = None):
+        """Per-job stage tracing
+
+        Args:
+            enabled: When False span() returns a shared no-op context manager
+            export_path: Optional OTLP/JSON lines file that receives every span
+        """
+        self.enabled = enabled
+        self.collector = InMemoryCollector()
+        self.exporters = [self.collector]
+        if export_path:
+            self.exporters.append(JsonFileExporter(export_path))
+
+    def span(self, name: str, job_id: Optional[str] = None, frame: Optional[int] = None, **attributes):
+        """Time a pipeline stage, keyed by job and frame
+
+        Job and frame default to the ones set in the current context. Outside
+        of any job the span is not recorded.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        job_id = job_id or current_job_id.get()
+        if job_id is None:
+            return _NULL_SPAN
+        if frame is None:
+            frame = current_frame.get()
+        return Span(self, name, job_id, frame, attributes)
+
+    def finish(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                print(f"Error exporting span {span.name}: {e}")
+
+    def get_trace(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job's spans as a waterfall ordered by start time"""
+        spans = self.collector.get_spans(job_id)
+        if not spans:
+            return None
+
+        spans.sort(key=lambda span: span.start_ns)
+        trace_start = spans[0].start_ns
+        trace_end = max(span.end_ns for span in spans)
+        waterfall = []
+        for span in spans:
+            entry = span.to_dict()
+            entry["offset_ms"] = (span.start_ns - trace_start) / 1e6
+            waterfall.append(entry)
+
+        stage_totals: Dict[str, float] = {}
+        for span in waterfall:
+            stage_totals[span["name"]] = stage_totals.get(span["name"], 0) + span["duration_ms"]
+
+        return {
+            "job_id": job_id,
+            "trace_id": spans[0].trace_id,
+            "duration_ms": (trace_end - trace_start) / 1e6,
+            "stage_totals_ms": stage_totals,
+            "spans": waterfall,
+        }
+
+TRACER = Tracer(
+    enabled=os.getenv('TRACING_ENABLED', 'true').lower() not in ('0', 'false', 'no'),
+    export_path=os.getenv('TRACE_EXPORT_PATH') or None,
+)
+
+def span(name: str, job_id: Optional[str] = None, frame: Optional[int] = None, **attributes):
+    return TRACER.span(name, job_id, frame, **attributes)
+
+def get_trace(job_id: str) -> Optional[Dict[str, Any]]:
+    return TRACER.get_trace(job_id)
@@ -0,0 +1,251 @@
+import os
+import cv2
+import numpy as np
+from typing import Dict, List, Any, Optional
+from .metrics import TRACKER_FRAMES
+from .tiling import box_overlap
+from .vocabulary import get_vocabulary
+
+TRACKING_MODES = ("off", "flow", "template")
+
+class TrackResult:
+    def __init__(self, objects: List[Dict[Any, Any]], confidence: float, reason: str,
+                 new_region: Optional[List[int]] = None):
+        """Tracker outcome for one frame
+
+        Args:
+            objects: The last model detections carried to this frame, boxes moved
+            confidence: Mean tracking confidence (0-1) over the tracked boxes
+            reason: "tracked", "new_region", or why the model must look at the whole
+                frame: "no_reference", "max_age", "low_confidence" or "scene_change"
+            new_region: [x1, y1, x2, y2] (frame pixels) of content the tracks don't cover
+        """
+        self.objects = objects
+        self.confidence = confidence
+        self.reason = reason
+        self.new_region = new_region
+
+    @property
+    def needs_model(self) -> bool:
+        """Whether the whole frame has to go to the model"""
+        return self.reason not in ("tracked", "new_region")
+
+class ObjectTracker:
+    def __init__(self, mode: str = "flow", min_confidence: float = 0.6, max_age: int = 10,
+                 new_region_threshold: float = 0.005, scene_change: float = 0.5, work_width: int = 640):
+        """Carry detections between model calls with local optical flow or template matching
+
+        Consecutive sampled frames mostly show the same items. After a model
+        call the tracker remembers each detection's box; on the next frames it
+        follows the boxes and reports the same ingredients, so the model is only
+        asked again when tracking gets unsure, the tracks are old, or content
+        appears outside every tracked box (then only that region is sent).
+
+        Args:
+            mode: "flow" (Lucas-Kanade on corners inside each box, checked forwards and backwards)
+                or "template" (normalized cross-correlation of each box's patch near its last position)
+            min_confidence: Mean track confidence below which the whole frame goes to the model
+            max_age: Frames tracked since the last full model call before forcing one
+            new_region_threshold: Fraction of the frame changed outside the tracked boxes that counts as new content
+            scene_change: Fraction of the frame that, when new, means the whole frame goes to the model
+            work_width: Frames are tracked in grayscale at this width
+        """
+        if mode not in TRACKING_MODES or mode == "off":
+            raise ValueError(f"Unknown tracking mode {mode!r}; expected one of {TRACKING_MODES[1:]}")
+        self.mode = mode
+        self.min_confidence = min_confidence
+        self.max_age = max_age
+        self.new_region_threshold = new_region_threshold
+        self.scene_change = scene_change
+        self.work_width = work_width
+
+        self.age = 0
+        self._gray: Optional[np.ndarray] = None
+        self._scale = 1.0
+        self._tracks: List[Dict[str, Any]] = []
+        self._boxless: List[Dict[Any, Any]] = []
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        self._scale = min(1.0, self.work_width / gray.shape[1])
+        if self._scale < 1.0:
+            gray = cv2.resize(gray, (self.work_width, max(1, round(gray.shape[0] * self._scale))),
+                              interpolation=cv2.INTER_AREA)
+        return gray
+
+    def reset(self, frame: np.ndarray, objects: List[Dict[Any, Any]], full: bool = True):
+        """Start tracking the model's detections for frame
+
+        Args:
+            full: False after a model call on a new region only, which doesn't
+                restart the max_age count
+        """
+        gray = self._prepare(frame)
+        self._gray = gray
+        self._tracks = []
+        self._boxless = []
+        for obj in objects:
+            bbox = obj.get("bbox")
+            if not bbox or len(bbox) != 4:
+                self._boxless.append(obj)
+                continue
+            box = np.array(bbox, dtype=np.float32) * self._scale
+            x1, y1, x2, y2 = self._clip(box, gray.shape)
+            if x2 - x1 < 4 or y2 - y1 < 4:
+                self._boxless.append(obj)
+                continue
+            track = {"obj": obj, "box": box}
+            if self.mode == "flow":
+                mask = np.zeros_like(gray)
+                mask[y1:y2, x1:x2] = 255
+                track["points"] = cv2.goodFeaturesToTrack(gray, maxCorners=30, qualityLevel=0.01,
+                                                          minDistance=3, mask=mask)
+            else:
+                track["patch"] = gray[y1:y2, x1:x2].copy()
+            self._tracks.append(track)
+        if full:
+            self.age = 0
+
+    @staticmethod
+    def _clip(box: np.ndarray, shape) -> List[int]:
+        height, width = shape[:2]
+        return [int(min(max(box[0], 0), width)), int(min(max(box[1], 0), height)),
+                int(min(max(box[2], 0), width)), int(min(max(box[3], 0), height))]
+
+    def _follow_flow(self, track: Dict[str, Any], gray: np.ndarray) -> float:
+        points = track["points"]
+        if points is None or len(points) < 3:
+            return 0.0
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, points, None, winSize=(21, 21), maxLevel=3)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._gray, moved, None, winSize=(21, 21), maxLevel=3)
+        # A point is good if flowing it back lands where it started
+        error = np.linalg.norm((back - points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (error < 1.0)
+        if good.sum() < 3:
+            return 0.0
+        shift = np.median((moved - points).reshape(-1, 2)[good], axis=0)
+        track["box"] = track["box"] + np.array([shift[0], shift[1], shift[0], shift[1]], dtype=np.float32)
+        track["points"] = moved[good].reshape(-1, 1, 2)
+        return float(good.mean())
+
+    def _follow_template(self, track: Dict[str, Any], gray: np.ndarray, shift: np.ndarray) -> float:
+        patch = track["patch"]
+        height, width = patch.shape
+        margin = max(width, height) // 2 + int(abs(shift).max())
+        x1, y1 = int(track["box"][0] + shift[0]) - margin, int(track["box"][1] + shift[1]) - margin
+        left, top = max(x1, 0), max(y1, 0)
+        window = gray[top:y1 + height + 2 * margin, left:x1 + width + 2 * margin]
+        if window.shape[0] < height or window.shape[1] < width:
+            return 0.0
+        scores = cv2.matchTemplate(window, patch, cv2.TM_CCOEFF_NORMED)
+        _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+        track["box"] = np.array([left + bx, top + by, left + bx + width, top + by + height], dtype=np.float32)
+        return max(0.0, float(best))
+
+    def _new_region(self, gray: np.ndarray, shift: np.ndarray) -> Optional[List[int]]:
+        """Bounding box (work pixels) of what changed outside the tracked boxes, after undoing camera motion"""
+        moved = np.float32([[1, 0, shift[0]], [0, 1, shift[1]]])
+        # Pixels with no source after the shift are newly revealed; mark them changed by warping a -1 border
+        previous = cv2.warpAffine(self._gray.astype(np.int16), moved, (gray.shape[1], gray.shape[0]),
+                                  borderMode=cv2.BORDER_CONSTANT, borderValue=-1)
+        changed = ((np.abs(gray.astype(np.int16) - previous) > 30) | (previous < 0)).astype(np.uint8)
+        changed = cv2.morphologyEx(changed, cv2.MORPH_OPEN, np.ones((5, 5), np.uint8))
+        for track in self._tracks:
+            x1, y1, x2, y2 = self._clip(track["box"], gray.shape)
+            pad_x, pad_y = (x2 - x1) // 4, (y2 - y1) // 4
+            changed[max(0, y1 - pad_y):y2 + pad_y, max(0, x1 - pad_x):x2 + pad_x] = 0
+        if changed.mean() <= self.new_region_threshold:
+            return None
+        ys, xs = np.nonzero(changed)
+        return [int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1]
+
+    def track(self, frame: np.ndarray) -> TrackResult:
+        """Follow the tracked detections into frame and decide whether the model is needed"""
+        if self._gray is None:
+            return self._result([], 0.0, "no_reference")
+        if self.age >= self.max_age:
+            return self._result([], 0.0, "max_age")
+
+        gray = self._prepare(frame)
+        if gray.shape != self._gray.shape:
+            return self._result([], 0.0, "scene_change")
+        # Camera motion between the frames, used to seed template search and to align the change map
+        shift, _ = cv2.phaseCorrelate(self._gray.astype(np.float32), gray.astype(np.float32))
+        shift = np.array(shift, dtype=np.float32)
+
+        kept, confidences = [], []
+        for track in self._tracks:
+            if self.mode == "flow":
+                confidence = self._follow_flow(track, gray)
+            else:
+                confidence = self._follow_template(track, gray, shift)
+            x1, y1, x2, y2 = self._clip(track["box"], gray.shape)
+            box_w, box_h = track["box"][2] - track["box"][0], track["box"][3] - track["box"][1]
+            if (x2 - x1) * (y2 - y1) < 0.3 * box_w * box_h:
+                continue  # Moved out of view
+            track["confidence"] = confidence
+            confidences.append(confidence)
+            kept.append(track)
+        self._tracks = kept
+
+        region = self._new_region(gray, shift)
+        self._gray = gray
+        self.age += 1
+
+        objects = [dict(track["obj"], bbox=[round(float(value) / self._scale) for value in track["box"]],
+                        tracking_confidence=round(track["confidence"], 3)) for track in self._tracks]
+        objects += [dict(obj) for obj in self._boxless]
+        confidence = float(np.mean(confidences)) if confidences else 1.0
+
+        if confidence < self.min_confidence:
+            return self._result(objects, confidence, "low_confidence")
+        if region is None:
+            return self._result(objects, confidence, "tracked")
+        area = (region[2] - region[0]) * (region[3] - region[1]) / (gray.shape[0] * gray.shape[1])
+        if area > self.scene_change:
+            return self._result(objects, confidence, "scene_change")
+        # Pad the region so items cut by its edge are seen whole, then map it to frame pixels
+        pad = int(0.05 * gray.shape[1])
+        region = self._clip(np.array([region[0] - pad, region[1] - pad, region[2] + pad, region[3] + pad]),
+                            gray.shape)
+        return self._result(objects, confidence, "new_region", [round(value / self._scale) for value in region])
+
+    @staticmethod
+    def _result(objects, confidence, reason, new_region=None) -> TrackResult:
+        TRACKER_FRAMES.inc(outcome=reason)
+        return TrackResult(objects, confidence, reason, new_region)
+
+    def merge(self, tracked: List[Dict[Any, Any]], found: List[Dict[Any, Any]],
+              min_overlap: float = 0.3) -> List[Dict[Any, Any]]:
+        """Add a new region's detections to the tracked ones, skipping items already tracked"""
+        vocabulary = get_vocabulary()
+        merged = list(tracked)
+        for obj in found:
+            label = vocabulary.normalize(obj.get("label", ""))
+            same = [other for other in tracked if vocabulary.normalize(other.get("label", "")) == label]
+            if obj.get("bbox") and any(other.get("bbox") and box_overlap(obj["bbox"], other["bbox"]) >= min_overlap
+                                       for other in same):
+                continue
+            if not obj.get("bbox") and same:
+                continue
+            merged.append(obj)
+        return merged
+
+def tracking_mode() -> str:
+    """TRACKING_MODE (default "off"); unknown modes are rejected"""
+    mode = os.getenv('TRACKING_MODE', 'off').strip().lower() or 'off'
+    if mode not in TRACKING_MODES:
+        raise ValueError(f"Unknown tracking mode {mode!r}; expected one of {TRACKING_MODES}")
+    return mode
+
+def build_tracker() -> Optional[ObjectTracker]:
+    """Tracker from TRACKING_MODE (default "off"), TRACK_MIN_CONFIDENCE, TRACK_MAX_AGE and TRACK_NEW_REGION"""
+    mode = tracking_mode()
+    if mode == 'off':
+        return None
+    return ObjectTracker(
+        mode=mode,
+        min_confidence=float(os.getenv('TRACK_MIN_CONFIDENCE', '0.6')),
+        max_age=int(os.getenv('TRACK_MAX_AGE', '10')),
+        new_region_threshold=float(os.getenv('TRACK_NEW_REGION', '0.005')),
+    )
@@ -1,4 +1,5 @@
 import time
+import threading
 from deepgram.utils import verboselogs
 import wave
 import datetime
@@ -10,15 +11,25 @@ from deepgram import (
     SpeakWebSocketEvents,
     SpeakWSOptions,
 )
+try:
+    from src.metrics import TTS_LATENCY_SECONDS, API_CALLS, ERRORS
+except ImportError:
+    # Run as a script from src/ without the repo root on sys.path; nothing else holds a registry then
+    from metrics import TTS_LATENCY_SECONDS, API_CALLS, ERRORS
 
 # Load environment variables
 load_dotenv()
 DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# Upper bound on waiting for Deepgram to confirm the last flush in talk_stream()
+FLUSH_TIMEOUT_SECONDS = 10.0
+
 def split_text(text, max_length=500):
     """Split text into chunks at sentence boundaries"""
     # Split into sentences
-    sentences = re.split('(?<=[.!?])\s+', text)
+    sentences = SENTENCE_BOUNDARY.split(text)
     chunks = []
     current_chunk = ""
     
@@ -35,6 +46,25 @@ def split_text(text, max_length=500):
     
     return chunks
 
+def iter_sentences(text_chunks):
+    """Regroup a stream of text fragments into complete sentences
+
+    Fragments are buffered until a sentence boundary arrives; whatever is
+    left when the stream ends is yielded as the final sentence.
+    """
+    buffer = ""
+    for text in text_chunks:
+        buffer += text
+        parts = SENTENCE_BOUNDARY.split(buffer)
+        # The last part may still be an unfinished sentence
+        buffer = parts.pop()
+        for sentence in parts:
+            if sentence.strip():
+                yield sentence.strip()
+
+    if buffer.strip():
+        yield buffer.strip()
+
 def talk(TTS_TEXT):
     try:
         if not TTS_TEXT or not isinstance(TTS_TEXT, str):
@@ -76,15 +106,100 @@ def talk(TTS_TEXT):
             )
 
             print(f"\nGenerating audio part {i+1}/{len(text_chunks)}...")
-            if dg_connection.start(options) is False:
-                print(f"Failed to start TTS connection for chunk {i+1}")
-                continue
+            API_CALLS.inc(backend="deepgram")
+            with TTS_LATENCY_SECONDS.time(mode="batch"):
+                if dg_connection.start(options) is False:
+                    print(f"Failed to start TTS connection for chunk {i+1}")
+                    ERRORS.inc(backend="deepgram")
+                    continue
 
-            dg_connection.send_text(chunk)
-            dg_connection.flush()
-            time.sleep(3)  # Reduced wait time per chunk
-            dg_connection.finish()
+                dg_connection.send_text(chunk)
+                dg_connection.flush()
+                time.sleep(3)  # Reduced wait time per chunk
+                dg_connection.finish()
             print(f"Part {i+1} saved to: {AUDIO_FILE}")
 
     except Exception as e:
-        print(f"TTS Error: {e}")
\ No newline at end of file
+        ERRORS.inc(backend="deepgram")
+        print(f"TTS Error: {e}")
+
+def talk_stream(sentences):
+    """Speak sentences as they arrive over a single TTS connection
+
+    Unlike talk(), which needs the complete text up front, each sentence is
+    sent to Deepgram and flushed as soon as it is yielded, so audio for the
+    first sentence is generated while later ones are still being written.
+    """
+    try:
+        AUDIO_FILE = f"./outputs/{datetime.datetime.now().strftime('%H%M%S')}_stream.wav"
+
+        deepgram = DeepgramClient(DEEPGRAM_API_KEY)
+        dg_connection = deepgram.speak.websocket.v("1")
+
+        last_audio = [None]
+
+        def on_binary_data(self, data, **kwargs):
+            last_audio[0] = time.perf_counter()
+            with open(AUDIO_FILE, "ab") as f:
+                f.write(data)
+                f.flush()
+
+        # Deepgram answers every flush with a Flushed event once that text's audio has been sent
+        flushed = [0]
+        flush_done = threading.Condition()
+
+        def on_flushed(self, flushed_event, **kwargs):
+            with flush_done:
+                flushed[0] += 1
+                flush_done.notify_all()
+
+        dg_connection.on(SpeakWebSocketEvents.AudioData, on_binary_data)
+        dg_connection.on(SpeakWebSocketEvents.Flushed, on_flushed)
+
+        # Ensure outputs directory exists
+        os.makedirs("outputs", exist_ok=True)
+
+        # Generate WAV header
+        header = wave.open(AUDIO_FILE, "wb")
+        header.setnchannels(1)
+        header.setsampwidth(2)
+        header.setframerate(16000)
+        header.close()
+
+        options = SpeakWSOptions(
+            model="aura-asteria-en",
+            encoding="linear16",
+            sample_rate=16000,
+        )
+
+        API_CALLS.inc(backend="deepgram")
+        request_start = time.perf_counter()
+        if dg_connection.start(options) is False:
+            print("Failed to start streaming TTS connection")
+            ERRORS.inc(backend="deepgram")
+            return
+
+        start_time = time.time()
+        sent = 0
+        for sentence in sentences:
+            if not sentence:
+                continue
+            if sent == 0:
+                print(f"First sentence ready after {time.time() - start_time:.2f}s")
+            dg_connection.send_text(sentence)
+            dg_connection.flush()
+            sent += 1
+
+        # Let the last sentence finish generating before closing the connection
+        with flush_done:
+            if not flush_done.wait_for(lambda: flushed[0] >= sent, timeout=FLUSH_TIMEOUT_SECONDS):
+                print(f"Timed out waiting for TTS audio ({flushed[0]}/{sent} sentences flushed)")
+        dg_connection.finish()
+        if last_audio[0] is not None:
+            # The whole request, from connecting until the last audio chunk arrived
+            TTS_LATENCY_SECONDS.observe(last_audio[0] - request_start, mode="stream")
+        print(f"Streamed {sent} sentences to: {AUDIO_FILE}")
+
+    except Exception as e:
+        ERRORS.inc(backend="deepgram")
+        print(f"TTS Error: {e}")
@@ -1,41 +1,191 @@
 import os
 import cv2
 import time
-import glob
 import asyncio
 import numpy as np
-from typing import Dict, List, Any, AsyncGenerator
-from .gemini_vision import GeminiVision
+from typing import Dict, List, Any, AsyncGenerator, Callable, Optional
+from .vision_router import build_router
+from .prefilter import build_prefilter
+from .tiling import build_tiler
+from .tracking import ObjectTracker, TrackResult, build_tracker, tracking_mode
+from .aggregation import IngredientAggregator, StabilityMonitor
+from .sampling import AdaptiveSampler, TimestampSampler
+from .memory import MemoryCeiling
+from .frame_store import FRAME_STORE, FrameStore, StoredFrame, frame_url
+from .frame_pool import FramePool
+from .metrics import DECODE_SECONDS, FRAME_ENCODE_SECONDS, QUEUE_DEPTH, INFLIGHT_JOBS, LIVE_LATENCY_SECONDS, LIVE_DROPPED_FRAMES
+from .tracing import span, new_job_id, current_job_id, current_frame
 
 class VideoProcessor:
-    def __init__(self, debug_mode=False):
+    def __init__(self, debug_mode=False, rate_limit_calls=5, call_delay=1.0, early_stop_patience=None,
+                 min_discovery_rate=None, frame_store: FrameStore = None):
         """Initialize VideoProcessor
         
         Args:
             debug_mode: Whether to print debug information
+            rate_limit_calls: Calls allowed per 60 / rate_limit_calls seconds (0 disables throttling)
+            call_delay: Seconds to wait after each frame's API call
+            early_stop_patience: Stop sampling after this many analysed frames add no new ingredient (None disables)
+            min_discovery_rate: Stop sampling when new ingredients per frame (smoothed) fall below this (None disables)
+            frame_store: Where sampled frames are kept for the UI (defaults to the shared in-memory store)
         """
-        self.gemini_vision = GeminiVision()
+        self.frame_store = frame_store or FRAME_STORE
+        self.early_stop_patience = early_stop_patience
+        self.min_discovery_rate = min_discovery_rate
+        # Dispatches frames across the backends configured in VISION_BACKENDS
+        self.vision = build_router(debug_mode)
+        # Optional local model that keeps junk frames away from the cloud (PREFILTER_MODEL)
+        self.prefilter = build_prefilter()
+        # Large frames are cut into tiles sent in one batched request (TILING_MODE)
+        self.tiler = build_tiler()
+        # Whether detections are carried between model calls by a per-video tracker (TRACKING_MODE)
+        self.tracking = tracking_mode() != 'off'
         self.debug_mode = debug_mode
-        
-        # Create directories if they don't exist
-        os.makedirs("static/frames", exist_ok=True)
+        self.rate_limit_calls = rate_limit_calls
+        self.call_delay = call_delay
+
+
+    async def _process_tiled(self, frame: np.ndarray, crops, job_id: str, frame_number: int) -> List[Dict[Any, Any]]:
+        """Analyse a frame as overlapping tiles in one batched request and merge the detections"""
+        with span("tile", job_id, frame_number, mode=self.tiler.mode):
+            boxes = self.tiler.tiles(frame, crops)
+            tiles = [self.tiler.crop(frame, box) for box in boxes]
+        results = await self.vision.process_tiles(tiles, self.debug_mode)
+        with span("merge", job_id, frame_number):
+            ingredients = self.tiler.merge(boxes, results)
+        if self.debug_mode:
+            print(f"{len(tiles)} tiles gave {sum(len(objects) for objects in results)} detections, "
+                  f"{len(ingredients)} after merging")
+        return ingredients
+
+    async def _process_region(self, frame: np.ndarray, region: List[int]) -> List[Dict[Any, Any]]:
+        """Analyse only a region of the frame, with boxes mapped back to frame pixels"""
+        x1, y1, x2, y2 = region
+        objects = await self.vision.process_frame(frame[y1:y2, x1:x2], self.debug_mode)
+        for obj in objects:
+            if obj.get("bbox") and len(obj["bbox"]) == 4:
+                bx1, by1, bx2, by2 = obj["bbox"]
+                obj["bbox"] = [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]
+        return objects
+
+    def _store_frame(self, job_id: str, frame_number: int, frame: np.ndarray) -> Optional[memoryview]:
+        """Keep the frame's renditions for the UI and return the full-size JPEG for the model to reuse"""
+        with FRAME_ENCODE_SECONDS.time(backend="frame_store"), span("encode", job_id, frame_number, target="frame_store"):
+            renditions: Dict[str, StoredFrame] = self.frame_store.put(job_id, frame_number, frame)
+        full = renditions.get("full")
+        return full.data if full is not None else None
+
+    async def _detect(self, frame: np.ndarray, job_id: str, frame_number: int, crops=None,
+                      tracker: Optional[ObjectTracker] = None, tracked: Optional[TrackResult] = None,
+                      encoded: Optional[memoryview] = None) -> List[Dict[Any, Any]]:
+        """Run the model on a frame (whole, tiled, or only the tracker's new region) and re-seed the tracker
+
+        encoded is the whole frame's JPEG; it is only sent when the whole frame is.
+        """
+        # Its stages are traced under this job and frame
+        job_token = current_job_id.set(job_id)
+        frame_token = current_frame.set(frame_number)
+        try:
+            if tracked and tracked.reason == "new_region":
+                found = await self._process_region(frame, tracked.new_region)
+                ingredients = tracker.merge(tracked.objects, found)
+            elif self.tiler and self.tiler.should_tile(frame):
+                ingredients = await self._process_tiled(frame, crops, job_id, frame_number)
+            else:
+                ingredients = await self.vision.process_frame(frame, self.debug_mode, encoded)
+        finally:
+            current_frame.reset(frame_token)
+            current_job_id.reset(job_token)
+        if tracker:
+            tracker.reset(frame, ingredients, full=not (tracked and tracked.reason == "new_region"))
+        return ingredients
+
+    @staticmethod
+    def _frame_result(job_id: str, frame_number: int, frame: np.ndarray, timestamp: Optional[float],
+                      ingredients: List[Dict[Any, Any]], **extra) -> Dict[str, Any]:
+        return {
+            "frame": frame_url(job_id, frame_number),
+            "thumbnail": frame_url(job_id, frame_number, "thumb"),
+            "full": frame_url(job_id, frame_number, "full"),
+            "frame_number": frame_number,
+            "timestamp": timestamp,
+            "width": frame.shape[1],
+            "height": frame.shape[0],
+            **extra,
+            "ingredients": ingredients
+        }
 
-    async def process_video(self, video_path: str, sample_rate=None, max_frames=5) -> AsyncGenerator[Dict[str, Any], None]:
+    async def analyse_frame(self, frame: np.ndarray, job_id: str, frame_number: int, timestamp: Optional[float] = None,
+                            aggregator: Optional[IngredientAggregator] = None,
+                            tracker: Optional[ObjectTracker] = None) -> Optional[Dict[str, Any]]:
+        """Run one frame of a stream through the pipeline: pre-filter, frame store, tracker, model, aggregation
+
+        Used for frames that arrive one at a time (live sources, websocket
+        ingestion) rather than being sampled from a file. Returns the frame
+        result, or None when the pre-filter kept the frame from the model.
+        Model errors give an empty result rather than ending the stream.
+        """
+        verdict = None
+        if self.prefilter:
+            with span("prefilter", job_id, frame_number):
+                verdict = self.prefilter.check(frame)
+            if not verdict.keep:
+                return None
+
+        encoded = self._store_frame(job_id, frame_number, frame)
+        tracked = None
+        if tracker:
+            with span("track", job_id, frame_number, mode=tracker.mode):
+                tracked = tracker.track(frame)
+        if tracked and tracked.reason == "tracked":
+            ingredients = tracked.objects
+        else:
+            try:
+                ingredients = await self._detect(frame, job_id, frame_number, verdict.crops if verdict else None,
+                                                 tracker, tracked, encoded)
+            except Exception as e:
+                if self.debug_mode:
+                    print(f"Error processing streamed frame {frame_number}: {e}")
+                ingredients = []
+
+        if aggregator is not None:
+            with span("aggregate", job_id, frame_number):
+                aggregator.add(ingredients, frame_number, timestamp)
+        return self._frame_result(job_id, frame_number, frame, timestamp, ingredients,
+                                  tracked=bool(tracked and tracked.reason == "tracked"))
+
+    async def process_video(self, video_path: str, sample_rate=None, max_frames=5, job_id: str = None,
+                            early_stop_patience=None, max_cost: float = None,
+                            max_latency: float = None) -> AsyncGenerator[Dict[str, Any], None]:
         """Process a video file and extract ingredients from frames
 
+        Frames are picked by an AdaptiveSampler: denser where new ingredients
+        keep appearing, sparser where they don't, within the frame, cost and
+        latency budgets. With tracking enabled, sampled frames whose items can
+        be followed from the last model call are reported without one, and
+        only new regions of a frame are sent when that is enough.
+
         Args:
             video_path: Path to the video file
-            sample_rate: Sample every N frames
+            sample_rate: Sample every N frames (disables adaptive sampling)
             max_frames: Maximum number of frames to process (default: 5)
+            job_id: Id the stage spans are recorded under (generated if not given)
+            early_stop_patience: Overrides the processor's early-stop setting for this video
+            max_cost: Estimated USD budget for this video's model calls
+            max_latency: Seconds this video may take before sampling stops
 
         Yields:
             Dictionary with frame path and detected ingredients
         """
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video file not found: {video_path}")
+
+        job_id = job_id or new_job_id()
         
         # Open the video file
         cap = cv2.VideoCapture(video_path)
+        # Sampled frames are decoded into one reused buffer: nothing holds a frame past its iteration
+        frame_pool = FramePool(1)
         
         # Get video properties
         frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -45,20 +195,35 @@ class VideoProcessor:
         if self.debug_mode:
             print(f"Video has {frame_count} frames, {fps} fps, duration: {duration:.2f} seconds")
         
-        # Clear previous frames
-        for f in glob.glob("static/frames/*.jpg"):
-            os.remove(f)
-            
-        # Calculate appropriate sample rate to get ~max_frames frames
-        adjusted_sample_rate = max(1, frame_count // max_frames)
+        sampler = AdaptiveSampler(
+            frame_count,
+            max_frames,
+            fixed_stride=sample_rate,
+            min_discovery_rate=self.min_discovery_rate,
+            max_cost=max_cost,
+            cost_per_frame=self.vision.cost_per_call,
+            max_latency=max_latency,
+        )
         
         if self.debug_mode:
-            print(f"Using sample rate: {adjusted_sample_rate} to get approximately {max_frames} frames")
+            print(f"Sampling up to {max_frames} frames (stride: {sample_rate or 'adaptive'}, "
+                  f"max cost: {max_cost}, max latency: {max_latency})")
         
         # Process frames
         frame_idx = 0
         processed_frames = 0
-        all_ingredients = set()
+        skipped_frames = 0
+        tracked_frames = 0
+        stopped_early = False
+        tracker = build_tracker() if self.tracking else None
+        aggregator = IngredientAggregator()
+        patience = early_stop_patience if early_stop_patience is not None else self.early_stop_patience
+        stability = StabilityMonitor(patience) if patience else None
+
+        # Frames this job still expects to analyse
+        queued_frames = min(max_frames, frame_count) if frame_count > 0 else max_frames
+        INFLIGHT_JOBS.inc()
+        QUEUE_DEPTH.inc(queued_frames)
         
         # Track API usage to stay within limits
         # Gemini API has a rate limit of approximately 60 requests per minute
@@ -66,67 +231,364 @@ class VideoProcessor:
         api_calls = 0
         api_call_start_time = time.time()
         
-        while cap.isOpened() and processed_frames < max_frames:
-            ret, frame = cap.read()
-            
-            if not ret:
-                break
-                
-            if frame_idx % adjusted_sample_rate == 0:
-                # Save frame
-                frame_path = f"static/frames/frame_{processed_frames:04d}.jpg"
-                cv2.imwrite(frame_path, frame)
-                
+        try:
+            while cap.isOpened():
+                # Skip ahead to the next sampled frame; grab() avoids retrieving the skipped ones
+                with span("select", job_id, processed_frames):
+                    target_idx = sampler.next_frame()
+                    grabbed = target_idx is not None
+                    while grabbed and frame_idx < target_idx:
+                        grabbed = cap.grab()
+                        frame_idx += 1
+                if not grabbed:
+                    break
+
+                with DECODE_SECONDS.time(), span("decode", job_id, processed_frames):
+                    ret, frame = frame_pool.read(cap)
+
+                if not ret:
+                    break
+
+                verdict = None
+                if self.prefilter:
+                    with span("prefilter", job_id, processed_frames):
+                        verdict = self.prefilter.check(frame)
+                    if not verdict.keep:
+                        if self.debug_mode:
+                            print(f"Pre-filter skipped frame {frame_idx} ({verdict.reason}, score {verdict.score:.2f})")
+                        sampler.record([], analysed=False)
+                        skipped_frames += 1
+                        processed_frames += 1
+                        if processed_frames <= queued_frames:
+                            QUEUE_DEPTH.dec()
+                        frame_idx += 1
+                        continue
+
+                # Keep the frame for the UI in the job's namespace of the frame store
+                encoded = self._store_frame(job_id, processed_frames, frame)
+
+                # Follow the last detections into this frame; the model is only needed when that fails
+                tracked = None
+                if tracker:
+                    with span("track", job_id, processed_frames, mode=tracker.mode):
+                        tracked = tracker.track(frame)
+                if tracked and tracked.reason == "tracked":
+                    with span("aggregate", job_id, processed_frames):
+                        aggregator.add(tracked.objects, processed_frames, frame_idx / fps if fps > 0 else None)
+                    with span("notify", job_id, processed_frames):
+                        yield self._frame_result(job_id, processed_frames, frame, frame_idx / fps if fps > 0 else None,
+                                                 tracked.objects, tracked=True,
+                                                 tracking_confidence=round(tracked.confidence, 3))
+                    sampler.record([], analysed=False)
+                    tracked_frames += 1
+                    processed_frames += 1
+                    if processed_frames <= queued_frames:
+                        QUEUE_DEPTH.dec()
+                    frame_idx += 1
+                    continue
+
                 # Check API rate limiting
                 api_calls += 1
                 current_time = time.time()
                 elapsed = current_time - api_call_start_time
-                
+
                 # If we're making calls too quickly, add a delay
-                if api_calls >= 5 and elapsed < 60:  # 5 calls per minute is very conservative
-                    sleep_time = max(0, (60 / 5) - elapsed)
+                if self.rate_limit_calls and api_calls >= self.rate_limit_calls and elapsed < 60:  # 5 calls per minute is very conservative
+                    sleep_time = max(0, (60 / self.rate_limit_calls) - elapsed)
                     if self.debug_mode:
                         print(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-                    await asyncio.sleep(sleep_time)
+                    with span("rate_limit", job_id, processed_frames):
+                        await asyncio.sleep(sleep_time)
                     api_calls = 0
                     api_call_start_time = time.time()
-                
+
                 # Process frame with Gemini Vision
+                new_labels = []
                 try:
                     if self.debug_mode:
                         print(f"Processing frame {processed_frames} (original idx: {frame_idx})")
-                    
+
                     # Process with Gemini Vision
-                    ingredients = await self.gemini_vision.process_frame(frame, self.debug_mode)
-                    
-                    # Add to all ingredients
-                    for ingredient in ingredients:
-                        all_ingredients.add(ingredient["label"])
-                    
-                    # Yield frame result
-                    yield {
-                        "frame": f"/static/frames/frame_{processed_frames:04d}.jpg",
-                        "ingredients": ingredients
-                    }
-                    
+                    ingredients = await self._detect(frame, job_id, processed_frames,
+                                                     verdict.crops if verdict else None, tracker, tracked, encoded)
+
+                    # Merge into the video's ingredients under canonical names
+                    with span("aggregate", job_id, processed_frames):
+                        # Same numbering as the frame results (and analyse_frame), so summary frames point at them
+                        new_labels = aggregator.add(ingredients, processed_frames, frame_idx / fps if fps > 0 else None)
+                    if stability and stability.update(new_labels):
+                        stopped_early = True
+
+                    # Yield frame result; the time the consumer takes to handle it is the notify stage
+                    with span("notify", job_id, processed_frames):
+                        yield self._frame_result(job_id, processed_frames, frame, frame_idx / fps if fps > 0 else None,
+                                                 ingredients, tracked=False)
+
                     # Add a small delay between API calls to prevent rate limiting
-                    await asyncio.sleep(1)
-                    
+                    if self.call_delay:
+                        await asyncio.sleep(self.call_delay)
+
                 except Exception as e:
                     if self.debug_mode:
                         print(f"Error processing frame {frame_idx}: {e}")
-                
+
+                sampler.record(new_labels)
                 processed_frames += 1
-            
-            frame_idx += 1
-        
-        # Release video capture
-        cap.release()
-        
+                if processed_frames <= queued_frames:
+                    QUEUE_DEPTH.dec()
+
+                frame_idx += 1
+
+                if stopped_early:
+                    if self.debug_mode:
+                        print(f"Ingredient set stable for {patience} frames; stopping after {processed_frames} frames")
+                    sampler.stop_reason = "stable"
+                    break
+        finally:
+            # Release video capture
+            cap.release()
+            QUEUE_DEPTH.dec(max(0, queued_frames - processed_frames))
+            INFLIGHT_JOBS.dec()
+
         # Yield summary
         yield {
             "summary": True,
             "total_frames": frame_count,
             "processed_frames": processed_frames,
-            "unique_ingredients": list(all_ingredients)
+            "skipped_frames": skipped_frames,
+            "tracked_frames": tracked_frames,
+            "cloud_calls_saved": skipped_frames + tracked_frames,
+            "estimated_savings_usd": round((skipped_frames + tracked_frames) * self.vision.cost_per_call, 6),
+            "stopped_early": stopped_early or sampler.stop_reason in ("discovery_rate", "cost_budget", "latency_budget"),
+            "stop_reason": sampler.stop_reason or "end_of_video",
+            "estimated_cost_usd": round(sampler.spent, 6),
+            "unique_ingredients": aggregator.labels(),
+            "ingredients": aggregator.summary()
+        }
+
+    async def process_long_video(self, video_path: str, job_id: str = None, interval: float = 5.0,
+                                 start: float = 0.0, end: float = None, max_frames: int = None,
+                                 memory_limit_mb: float = None, max_frame_refs: int = 100,
+                                 should_stop: Callable[[], bool] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """Analyse a long recording (tens of minutes) at a fixed interval of video time, in bounded memory
+
+        Frames are picked by presentation timestamp (TimestampSampler), so
+        variable frame rate phone video is sampled evenly in time. Decoding runs
+        in a worker thread into one reused buffer, each sampled frame goes
+        through analyse_frame, and its result is yielded for the caller to store
+        before the next one is decoded: nothing per frame is kept here, and the
+        ingredient summary lists at most max_frame_refs frames per ingredient.
+
+        Args:
+            video_path: Path to the video file
+            job_id: Id the stage spans and frames are recorded under (generated if not given)
+            interval: Seconds of video between sampled frames
+            start: Seconds into the video to start at
+            end: Seconds into the video to stop at (None: the end)
+            max_frames: Stop after this many sampled frames (None: no limit)
+            memory_limit_mb: Stop (stop_reason "memory_limit") once the process's resident
+                memory has grown this much since the job started (None: no limit)
+            max_frame_refs: Frames listed per ingredient in the summary
+            should_stop: Polled between frames; True ends the job
+
+        Yields:
+            Frame results like process_video's, timestamped in seconds of video, then a summary
+        """
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+
+        job_id = job_id or new_job_id()
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        sampler = TimestampSampler(interval, start, end)
+        frame_pool = FramePool(1)
+        aggregator = IngredientAggregator(max_frame_refs=max_frame_refs)
+        tracker = build_tracker() if self.tracking else None
+        ceiling = MemoryCeiling(memory_limit_mb) if memory_limit_mb else None
+        position = {"decoded": 0, "seconds": 0.0}
+
+        def next_sample():
+            """Grab frames until one is due and retrieve only that one; None at the end"""
+            while cap.grab():
+                index = position["decoded"]
+                position["decoded"] += 1
+                seconds = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                if seconds <= 0 and index > 0 and fps > 0:
+                    seconds = index / fps  # The container has no timestamps
+                position["seconds"] = seconds
+                if sampler.finished(seconds):
+                    return None
+                if sampler.due(seconds):
+                    ok, frame = frame_pool.retrieve(cap)
+                    if ok:
+                        return frame, seconds
+            return None
+
+        if self.debug_mode:
+            print(f"Long video: {frame_count} frames at {fps} fps (nominal), one frame every {interval}s")
+
+        analysed = 0
+        skipped_frames = 0
+        tracked_frames = 0
+        stop_reason = "end_of_video"
+        INFLIGHT_JOBS.inc()
+        try:
+            while True:
+                if should_stop and should_stop():
+                    stop_reason = "stopped"
+                    break
+                if max_frames is not None and sampler.sampled >= max_frames:
+                    stop_reason = "max_frames"
+                    break
+                with DECODE_SECONDS.time(), span("decode", job_id, analysed):
+                    sample = await asyncio.to_thread(next_sample)
+                if sample is None:
+                    if sampler.finished(position["seconds"]):
+                        stop_reason = "end_time"
+                    break
+                frame, seconds = sample
+
+                result = await self.analyse_frame(frame, job_id, analysed, round(seconds, 3), aggregator, tracker)
+                if result is None:
+                    skipped_frames += 1
+                else:
+                    tracked_frames += result["tracked"]
+                    with span("notify", job_id, analysed):
+                        yield result
+                    analysed += 1
+
+                if ceiling and ceiling.exceeded():
+                    stop_reason = "memory_limit"
+                    if self.debug_mode:
+                        print(f"Memory grew {ceiling.peak_mb:.0f} MB, over the {memory_limit_mb} MB limit; stopping")
+                    break
+        finally:
+            cap.release()
+            INFLIGHT_JOBS.dec()
+
+        yield {
+            "summary": True,
+            "long_video": True,
+            "total_frames": frame_count,
+            "decoded_frames": position["decoded"],
+            "sampled_frames": sampler.sampled,
+            "processed_frames": analysed,
+            "skipped_frames": skipped_frames,
+            "tracked_frames": tracked_frames,
+            "cloud_calls_saved": skipped_frames + tracked_frames,
+            "video_seconds": round(position["seconds"], 3),
+            "stop_reason": stop_reason,
+            "memory_peak_mb": round(ceiling.peak_mb, 1) if ceiling else None,
+            "unique_ingredients": aggregator.labels(),
+            "ingredients": aggregator.summary()
+        }
+
+    async def process_live(self, source: str, job_id: str = None, target_fps: float = 1.0,
+                           latency_budget: float = 2.0, buffer_size: int = 2, max_frames: int = None,
+                           duration: float = None, should_stop: Callable[[], bool] = None
+                           ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Analyse a live source (webcam, RTSP/HTTP stream or "test:<file>") with bounded latency
+
+        A capture thread keeps only the newest buffer_size frames. Frames are
+        analysed at up to target_fps, and a frame older than latency_budget
+        seconds by the time it is taken from the buffer is skipped rather than
+        analysed late, so results stay seconds-fresh instead of building a backlog.
+
+        Args:
+            source: See LiveSource
+            job_id: Id the stage spans and frames are recorded under (generated if not given)
+            target_fps: Analysed frames per second to aim for
+            latency_budget: Seconds a captured frame may wait before it is stale
+            buffer_size: Frames the capture thread may hold before dropping the oldest
+            max_frames: Stop after this many analysed frames (None: until stopped)
+            duration: Stop after this many seconds (None: until stopped)
+            should_stop: Polled between frames; True ends the session
+
+        Yields:
+            Frame results like process_video's, with capture latency and the wall-clock
+            capture time as the timestamp, then a summary
+        """
+        from .live import FrameBuffer, LiveSource
+
+        job_id = job_id or new_job_id()
+        buffer = FrameBuffer(buffer_size)
+        live = LiveSource(source, buffer)
+        await asyncio.to_thread(live.start)
+
+        aggregator = IngredientAggregator()
+        tracker = build_tracker() if self.tracking else None
+        started = time.monotonic()
+        interval = 1 / target_fps if target_fps > 0 else 0
+        next_slot = started
+        analysed = 0
+        tracked_frames = 0
+        skipped_frames = 0
+        stale_frames = 0
+        stop_reason = "stopped"
+        INFLIGHT_JOBS.inc()
+        try:
+            while True:
+                if should_stop and should_stop():
+                    break
+                if max_frames is not None and analysed >= max_frames:
+                    stop_reason = "max_frames"
+                    break
+                if duration is not None and time.monotonic() - started >= duration:
+                    stop_reason = "duration"
+                    break
+
+                item = await asyncio.to_thread(buffer.get, 1.0)
+                if item is None:
+                    if buffer.closed:
+                        stop_reason = "source_ended"
+                        break
+                    continue
+                frame, captured_at = item
+                if time.monotonic() - captured_at > latency_budget:
+                    stale_frames += 1
+                    LIVE_DROPPED_FRAMES.inc(reason="stale")
+                    continue
+
+                timestamp = round(time.time() - (time.monotonic() - captured_at), 3)
+                result = await self.analyse_frame(frame, job_id, analysed, timestamp, aggregator, tracker)
+                if result is None:
+                    skipped_frames += 1
+                else:
+                    tracked_frames += result["tracked"]
+                    latency = time.monotonic() - captured_at
+                    LIVE_LATENCY_SECONDS.observe(latency)
+                    result["latency"] = round(latency, 3)
+                    with span("notify", job_id, analysed):
+                        yield result
+                    analysed += 1
+
+                # Wait for the next analysis slot; a slow frame starts the next slot now instead of building debt
+                next_slot += interval
+                delay = next_slot - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    next_slot = time.monotonic()
+        finally:
+            await asyncio.to_thread(live.stop)
+            INFLIGHT_JOBS.dec()
+
+        elapsed = time.monotonic() - started
+        yield {
+            "summary": True,
+            "live": True,
+            "source": source,
+            "processed_frames": analysed,
+            "captured_frames": live.frames,
+            "dropped_frames": buffer.dropped,
+            "stale_frames": stale_frames,
+            "skipped_frames": skipped_frames,
+            "tracked_frames": tracked_frames,
+            "duration_seconds": round(elapsed, 3),
+            "analysed_fps": round(analysed / elapsed, 3) if elapsed > 0 else 0.0,
+            "stop_reason": "source_error" if live.error else stop_reason,
+            "error": live.error,
+            "unique_ingredients": aggregator.labels(),
+            "ingredients": aggregator.summary()
         }
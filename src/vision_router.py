@@ -0,0 +1,269 @@
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Dict, List, Any, Optional, Callable, Protocol
+import numpy as np
+from .metrics import ROUTED_FRAMES, SPILLOVERS, ESCALATIONS, VISION_COST_USD
+from .resilience import CircuitOpenError, is_retryable, is_throttled, fail_fast_on_throttle
+
+class VisionBackend(Protocol):
+    """What the router needs from a vision backend (GeminiVision, AnthropicVision)
+
+    A backend may also offer detect_tiles(tiles, debug_mode) to send the tiles
+    of one frame in a single request (see detect_tiles below).
+    """
+    name: str
+    cost_per_call: float
+    calls_per_minute: int
+
+    async def detect(self, frame: np.ndarray, debug_mode: bool = True, encoded: memoryview = None
+                     ) -> List[Dict[Any, Any]]:
+        """Detect ingredients in a BGR frame; API errors propagate
+
+        An object's optional "bbox" is [x1, y1, x2, y2] in frame pixels.
+        encoded, when given, is the frame already encoded as JPEG (see
+        frame_pool.encode_image); the backend sends it rather than encoding again.
+        """
+        ...
+
+    async def process_frame(self, frame: np.ndarray, debug_mode: bool = True, encoded: memoryview = None
+                            ) -> List[Dict[Any, Any]]:
+        """Detect ingredients in a BGR frame; returns [] on API errors"""
+        ...
+
+def _gemini():
+    from .gemini_vision import GeminiVision
+    return GeminiVision()
+
+def _gemini_flash():
+    from .gemini_vision import GeminiVision
+    return GeminiVision(model_name='gemini-1.5-flash', name="gemini-flash", cost_per_call=0.0001, calls_per_minute=1000)
+
+def _anthropic():
+    from .ai_vision import AnthropicVision
+    return AnthropicVision()
+
+# Backend names accepted in VISION_BACKENDS / VISION_ESCALATION_BACKEND
+BACKEND_FACTORIES: Dict[str, Callable[[], VisionBackend]] = {
+    "gemini": _gemini,
+    "gemini-flash": _gemini_flash,
+    "anthropic": _anthropic,
+}
+
+class BackendState:
+    def __init__(self, backend: VisionBackend, latency_alpha: float = 0.2):
+        """Live routing statistics for one backend
+
+        Args:
+            backend: The wrapped backend
+            latency_alpha: Weight of the newest sample in the latency moving average
+        """
+        self.backend = backend
+        self.latency_alpha = latency_alpha
+        self.latency: Optional[float] = None
+        self.inflight = 0
+        self.cooldown_until = 0.0
+        self.calls = deque()
+
+    def headroom(self, now: float) -> float:
+        """Fraction of the per-minute quota still unused"""
+        while self.calls and now - self.calls[0] > 60:
+            self.calls.popleft()
+        limit = self.backend.calls_per_minute
+        return max(0.0, 1 - len(self.calls) / limit) if limit else 1.0
+
+    def available(self, now: float) -> bool:
+        caller = getattr(self.backend, "caller", None)
+        if caller is not None and caller.breaker.is_open:
+            return False
+        return now >= self.cooldown_until and self.headroom(now) > 0
+
+    def record_latency(self, seconds: float):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.latency_alpha * (seconds - self.latency)
+
+class VisionRouter:
+    def __init__(self, backends: List[VisionBackend], escalation: Optional[VisionBackend] = None,
+                 escalate_below: float = 0.6, cost_weight: float = 100.0, cooldown: float = 30.0,
+                 debug_mode: bool = False):
+        """Route frames across vision backends by latency, quota headroom and cost
+
+        The router is itself a backend (detect/process_frame), so VideoProcessor
+        uses it in place of a single provider.
+
+        Args:
+            backends: Backends frames are dispatched across
+            escalation: Optional stronger backend that low-confidence frames are re-sent to
+            escalate_below: Mean confidence under which a frame is escalated
+            cost_weight: Seconds of expected latency one USD of cost is worth when scoring
+            cooldown: Seconds a rate-limited or failing backend is skipped
+            debug_mode: Whether to print routing decisions
+        """
+        if not backends:
+            raise ValueError("VisionRouter needs at least one backend")
+        self.states = [BackendState(backend) for backend in backends]
+        self.escalation = BackendState(escalation) if escalation else None
+        self.escalate_below = escalate_below
+        self.cost_weight = cost_weight
+        self.cooldown = cooldown
+        self.debug_mode = debug_mode
+        self.name = "router"
+        self.cost_per_call = min(backend.cost_per_call for backend in backends)
+        self.calls_per_minute = sum(backend.calls_per_minute for backend in backends)
+
+    def _score(self, state: BackendState, now: float) -> float:
+        """Lower is better: queue-adjusted latency, scaled by quota pressure, plus weighted cost"""
+        latency = state.latency if state.latency is not None else 1.0
+        expected = latency * (1 + state.inflight)
+        return expected / max(state.headroom(now), 0.05) + self.cost_weight * state.backend.cost_per_call
+
+    def _ranked(self, states: List[BackendState]) -> List[BackendState]:
+        """Available backends by score, then the unavailable ones as a last resort"""
+        now = time.monotonic()
+        return sorted(states, key=lambda state: (not state.available(now), self._score(state, now)))
+
+    async def _call(self, state: BackendState, frame, debug_mode: bool, tiled: bool = False, encoded=None):
+        backend = state.backend
+        state.inflight += 1
+        state.calls.append(time.monotonic())
+        ROUTED_FRAMES.inc(backend=backend.name)
+        # A tiled frame is billed per image whether or not the tiles share a request
+        VISION_COST_USD.inc(backend.cost_per_call * (len(frame) if tiled else 1), backend=backend.name)
+        start = time.perf_counter()
+        try:
+            objects = await (detect_tiles(backend, frame, debug_mode) if tiled
+                             else backend.detect(frame, debug_mode, encoded))
+        finally:
+            state.inflight -= 1
+        state.record_latency(time.perf_counter() - start)
+        return objects
+
+    async def _dispatch(self, states: List[BackendState], frame, debug_mode: bool, tiled: bool = False,
+                        encoded=None):
+        last_error: Optional[Exception] = None
+        ranked = self._ranked(states)
+        for i, state in enumerate(ranked):
+            # A throttled backend gives up at once while another one is left to try;
+            # the last candidate still backs off and retries rather than dropping the frame
+            token = fail_fast_on_throttle.set(i < len(ranked) - 1)
+            try:
+                return await self._call(state, frame, debug_mode, tiled, encoded), state
+            except Exception as e:
+                last_error = e
+                if isinstance(e, CircuitOpenError) or is_retryable(e):
+                    # Rate-limited or unhealthy: keep new frames away from it for a while
+                    state.cooldown_until = time.monotonic() + self.cooldown
+                SPILLOVERS.inc(backend=state.backend.name)
+                if self.debug_mode:
+                    reason = "throttled" if is_throttled(e) else f"failed ({type(e).__name__})"
+                    print(f"Vision backend {state.backend.name} {reason}; spilling over")
+            finally:
+                fail_fast_on_throttle.reset(token)
+        raise last_error
+
+    def _needs_escalation(self, objects: List[Dict[Any, Any]]) -> bool:
+        if not objects:
+            return False
+        mean_confidence = sum(obj.get('confidence', 0) for obj in objects) / len(objects)
+        return mean_confidence < self.escalate_below
+
+    async def detect(self, frame: np.ndarray, debug_mode: bool = True, encoded: memoryview = None
+                     ) -> List[Dict[Any, Any]]:
+        objects, state = await self._dispatch(self.states, frame, debug_mode, encoded=encoded)
+        if self.debug_mode:
+            print(f"Frame routed to {state.backend.name}")
+
+        if self.escalation and state.backend is not self.escalation.backend and self._needs_escalation(objects):
+            ESCALATIONS.inc(backend=self.escalation.backend.name)
+            if self.debug_mode:
+                print(f"Low confidence from {state.backend.name}; escalating to {self.escalation.backend.name}")
+            try:
+                objects, _ = await self._dispatch([self.escalation], frame, debug_mode, encoded=encoded)
+            except Exception as e:
+                # The cheap answer is better than none
+                print(f"Escalation to {self.escalation.backend.name} failed: {e}")
+        return objects
+
+    async def process_frame(self, frame: np.ndarray, debug_mode: bool = True, encoded: memoryview = None
+                            ) -> List[Dict[Any, Any]]:
+        try:
+            return await self.detect(frame, debug_mode, encoded)
+        except Exception as e:
+            print(f"All vision backends failed: {type(e).__name__}: {e}")
+            return []
+
+    async def detect_tiles(self, tiles: List[np.ndarray], debug_mode: bool = True) -> List[List[Dict[Any, Any]]]:
+        """Detect ingredients in the tiles of one frame, sent to a single backend; one list per tile"""
+        results, state = await self._dispatch(self.states, tiles, debug_mode, tiled=True)
+        if self.debug_mode:
+            print(f"{len(tiles)} tiles routed to {state.backend.name}")
+        return results
+
+    async def process_tiles(self, tiles: List[np.ndarray], debug_mode: bool = True) -> List[List[Dict[Any, Any]]]:
+        try:
+            return await self.detect_tiles(tiles, debug_mode)
+        except Exception as e:
+            print(f"All vision backends failed: {type(e).__name__}: {e}")
+            return [[] for _ in tiles]
+
+async def detect_tiles(backend: VisionBackend, tiles: List[np.ndarray], debug_mode: bool = True,
+                       ) -> List[List[Dict[Any, Any]]]:
+    """One batched request when the backend supports it, otherwise one request per tile"""
+    if hasattr(backend, "detect_tiles"):
+        return await backend.detect_tiles(tiles, debug_mode)
+    results = await asyncio.gather(*(backend.detect(tile, debug_mode) for tile in tiles))
+    # detect() answers in tile pixels; FrameTiler.merge expects boxes normalized to their tile
+    return [[_normalize_box(obj, tile) for obj in objects] for tile, objects in zip(tiles, results)]
+
+def _normalize_box(obj: Dict[Any, Any], tile: np.ndarray) -> Dict[Any, Any]:
+    bbox = obj.get("bbox")
+    if not bbox or len(bbox) != 4:
+        return obj
+    height, width = tile.shape[:2]
+    x1, y1, x2, y2 = (float(value) for value in bbox)
+    return {**obj, "bbox": [x1 / width, y1 / height, x2 / width, y2 / height]}
+
+def _parse_quotas(value: str) -> Dict[str, int]:
+    quotas = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, limit = item.partition('=')
+        quotas[name.strip()] = int(limit)
+    return quotas
+
+def _create_backend(name: str, quotas: Dict[str, int]) -> Optional[VisionBackend]:
+    factory = BACKEND_FACTORIES.get(name)
+    if factory is None:
+        print(f"Unknown vision backend '{name}'; expected one of {sorted(BACKEND_FACTORIES)}")
+        return None
+    try:
+        backend = factory()
+    except Exception as e:
+        print(f"Vision backend '{name}' unavailable: {e}")
+        return None
+    if name in quotas:
+        backend.calls_per_minute = quotas[name]
+    return backend
+
+def build_router(debug_mode: bool = False) -> VisionRouter:
+    """Build the router from VISION_BACKENDS (default "gemini"), VISION_ESCALATION_BACKEND,
+    VISION_ESCALATION_THRESHOLD and VISION_CALLS_PER_MINUTE ("gemini=60,anthropic=50")"""
+    quotas = _parse_quotas(os.getenv('VISION_CALLS_PER_MINUTE', ''))
+    names = [name.strip() for name in os.getenv('VISION_BACKENDS', 'gemini').split(',') if name.strip()]
+    backends = [backend for backend in (_create_backend(name, quotas) for name in names) if backend]
+    if not backends:
+        raise RuntimeError(f"No vision backend could be initialized from VISION_BACKENDS={names}")
+
+    escalation = None
+    escalation_name = os.getenv('VISION_ESCALATION_BACKEND', '').strip()
+    if escalation_name:
+        escalation = _create_backend(escalation_name, quotas)
+
+    return VisionRouter(
+        backends,
+        escalation=escalation,
+        escalate_below=float(os.getenv('VISION_ESCALATION_THRESHOLD', '0.6')),
+        debug_mode=debug_mode,
+    )
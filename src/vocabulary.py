@@ -0,0 +1,275 @@
+import re
+import bisect
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Iterable, Tuple
+
+# Canonical ingredient names; the position in this list is the ingredient's canonical id
+CANONICAL_INGREDIENTS = [
+    "apple", "arugula", "asparagus", "avocado", "bacon", "banana", "basil", "bay leaf", "bean sprout",
+    "beef", "bell pepper", "black bean", "black pepper", "blueberry", "bread", "broccoli", "butter",
+    "cabbage", "carrot", "cauliflower", "celery", "cheddar", "cheese", "cherry", "cherry tomato",
+    "chicken", "chicken breast", "chickpea", "chili pepper", "chive", "chocolate", "cilantro",
+    "cinnamon", "coconut milk", "corn", "cream", "cucumber", "cumin", "dill", "egg", "eggplant",
+    "feta", "flour", "garlic", "ginger", "grape", "green bean", "green onion", "ground beef", "ham",
+    "honey", "jalapeno", "kale", "ketchup", "kidney bean", "leek", "lemon", "lettuce", "lime",
+    "mango", "mayonnaise", "milk", "mint", "mozzarella", "mushroom", "mustard", "noodle", "oat",
+    "olive", "olive oil", "onion", "orange", "oregano", "paprika", "parmesan", "parsley", "pasta",
+    "peach", "peanut butter", "pear", "pea", "pineapple", "pork", "potato", "pumpkin", "radish",
+    "red onion", "rice", "rosemary", "salmon", "salt", "sausage", "shallot", "shrimp", "soy sauce",
+    "spinach", "squash", "strawberry", "sugar", "sweet potato", "thyme", "tofu", "tomato",
+    "tomato sauce", "tortilla", "tuna", "vinegar", "walnut", "yogurt", "zucchini",
+]
+
+# Regional and alternative names -> canonical name
+SYNONYMS = {
+    "aubergine": "eggplant",
+    "courgette": "zucchini",
+    "capsicum": "bell pepper",
+    "sweet pepper": "bell pepper",
+    "scallion": "green onion",
+    "spring onion": "green onion",
+    "coriander": "cilantro",
+    "coriander leaf": "cilantro",
+    "rocket": "arugula",
+    "garbanzo": "chickpea",
+    "garbanzo bean": "chickpea",
+    "minced meat": "ground beef",
+    "mince": "ground beef",
+    "prawn": "shrimp",
+    "chilli": "chili pepper",
+    "chili": "chili pepper",
+    "chile": "chili pepper",
+    "maize": "corn",
+    "corn on the cob": "corn",
+    "spaghetti": "pasta",
+    "penne": "pasta",
+    "curd": "yogurt",
+    "yoghurt": "yogurt",
+    "catsup": "ketchup",
+    "hen egg": "egg",
+}
+
+# Preparation words that don't change what the ingredient is
+DESCRIPTORS = {
+    "fresh", "raw", "ripe", "whole", "sliced", "chopped", "diced", "minced", "grated", "shredded",
+    "peeled", "cut", "halved", "cooked", "uncooked", "organic", "small", "large", "medium", "piece",
+    "pieces", "of", "some", "a", "an", "the",
+}
+
+# Plurals the suffix rules get wrong
+IRREGULAR_PLURALS = {
+    "leaves": "leaf", "loaves": "loaf", "halves": "half", "knives": "knife", "olives": "olive",
+    "chives": "chive", "cloves": "clove", "anchovies": "anchovy", "radishes": "radish",
+    "cookies": "cookie", "brownies": "brownie", "veggies": "veggie", "smoothies": "smoothie",
+}
+
+# Words ending in "s" that are not plurals
+INVARIANT_WORDS = {"hummus", "couscous", "asparagus", "molasses", "swiss", "grits", "citrus", "haggis"}
+
+_NON_ALPHA = re.compile(r"[^a-z\s]")
+# "rice or grains", "tomatoes/peppers": keep the first alternative. "and", "with" and "in"
+# are left alone since they join single dishes ("mac and cheese", "tuna in oil")
+_ALTERNATIVES = re.compile(r"\sor\s|/|,")
+# "tomatoes with basil", "tuna in oil": the ingredient is named before the qualifier
+_QUALIFIERS = {"with", "in"}
+
+def lemmatize_word(word: str) -> str:
+    """Singularize an English noun with suffix rules plus an exception list"""
+    if word in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[word]
+    if word in INVARIANT_WORDS or len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        # "pies", "ties": too short for the stem to have lost a "y"
+        return word[:-1] if len(word) <= 4 else word[:-3] + "y"
+    if word.endswith("oes") or word.endswith(("ches", "shes", "xes", "sses", "zes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+def clean_label(label: str) -> str:
+    """Lowercase, keep the first alternative, drop descriptors and singularize the head noun"""
+    label = label.strip().lower()
+    label = _ALTERNATIVES.split(label, maxsplit=1)[0]
+    words = [word for word in _NON_ALPHA.sub(" ", label).split() if word not in DESCRIPTORS]
+    if not words:
+        return ""
+    # Only head nouns are pluralized ("cherry tomatoes", "tomatoes with basil")
+    for i, word in enumerate(words):
+        if i == len(words) - 1 or words[i + 1] in _QUALIFIERS:
+            words[i] = lemmatize_word(word)
+    return " ".join(words)
+
+def _trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+class VocabularyIndex:
+    def __init__(self, vocabulary: Iterable[str] = CANONICAL_INGREDIENTS, synonyms: Optional[Dict[str, str]] = None,
+                 min_similarity: float = 0.7, cache_size: int = 4096):
+        """In-memory ingredient vocabulary with exact, prefix and fuzzy lookup
+
+        Built once:
+        - an alias map (canonical names and synonyms, cleaned) to canonical ids;
+        - a sorted key list over every word-start of every alias, for prefix search;
+        - an L2-normalized character-trigram matrix, so a batch of unknown
+          labels is matched against the whole vocabulary in one matrix product.
+
+        Args:
+            vocabulary: Canonical ingredient names; list position is the canonical id
+            synonyms: Alternative name -> canonical name
+            min_similarity: Minimum trigram cosine similarity for a fuzzy match
+            cache_size: Normalized labels remembered before the cache is cleared
+        """
+        self.names = list(dict.fromkeys(vocabulary))
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.synonyms = SYNONYMS if synonyms is None else synonyms
+        self.min_similarity = min_similarity
+        self.cache_size = cache_size
+        self._cache: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        # alias -> canonical id, and canonical id -> aliases
+        self._aliases: Dict[str, int] = {}
+        self.aliases: List[List[str]] = [[] for _ in self.names]
+        for name in self.names:
+            self._add_alias(name, self.ids[name])
+        for alias, name in self.synonyms.items():
+            if name in self.ids:
+                self._add_alias(alias, self.ids[name])
+
+        # Prefix index: every alias under each of its word starts ("lettuce" finds "romaine lettuce")
+        keys = set()
+        for alias, canonical_id in self._aliases.items():
+            words = alias.split()
+            for i in range(len(words)):
+                keys.add((" ".join(words[i:]), canonical_id))
+        self._prefix_keys = sorted(keys)
+        self._prefix_strings = [key for key, _ in self._prefix_keys]
+
+        # Trigram matrix over the canonical names
+        grams = sorted({gram for name in self.names for gram in _trigrams(name)})
+        self._gram_columns = {gram: i for i, gram in enumerate(grams)}
+        self._matrix = self._vectorize(self.names)
+
+    def _add_alias(self, alias: str, canonical_id: int):
+        for key in {alias, clean_label(alias)}:
+            if key and key not in self._aliases:
+                self._aliases[key] = canonical_id
+                self.aliases[canonical_id].append(key)
+
+    def _vectorize(self, labels: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(labels), len(self._gram_columns)), dtype=np.float32)
+        for row, label in enumerate(labels):
+            for gram in _trigrams(label):
+                column = self._gram_columns.get(gram)
+                if column is not None:
+                    matrix[row, column] += 1
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def _exact(self, cleaned: str) -> Optional[int]:
+        canonical_id = self._aliases.get(cleaned)
+        if canonical_id is not None:
+            return canonical_id
+        # Longest known sub-phrase, rightmost first since the head noun ends the phrase
+        # ("romaine lettuce heart" -> "lettuce"); words before a qualifier are searched first
+        words = cleaned.split()
+        qualifier = next((i for i, word in enumerate(words) if word in _QUALIFIERS), len(words))
+        for phrase in (words[:qualifier], words):
+            for length in range(len(phrase), 0, -1):
+                for start in range(len(phrase) - length, -1, -1):
+                    canonical_id = self._aliases.get(" ".join(phrase[start:start + length]))
+                    if canonical_id is not None:
+                        return canonical_id
+        return None
+
+    def normalize_batch(self, labels: Iterable[str]) -> List[str]:
+        """Canonical names for a batch of labels; unknown labels come back cleaned"""
+        labels = list(labels)
+        results: List[Optional[str]] = [self._cache.get(label) for label in labels]
+        pending: Dict[str, List[int]] = {}
+        for i, label in enumerate(labels):
+            if results[i] is None:
+                pending.setdefault(label, []).append(i)
+        if not pending:
+            return results
+
+        resolved: Dict[str, str] = {}
+        fuzzy_labels, fuzzy_cleaned = [], []
+        for label in pending:
+            cleaned = clean_label(label)
+            canonical_id = self._exact(cleaned) if cleaned else None
+            if canonical_id is not None:
+                resolved[label] = self.names[canonical_id]
+            elif cleaned:
+                fuzzy_labels.append(label)
+                fuzzy_cleaned.append(cleaned)
+            else:
+                resolved[label] = label.strip().lower()
+
+        if fuzzy_labels:
+            similarity = self._vectorize(fuzzy_cleaned) @ self._matrix.T
+            best = similarity.argmax(axis=1)
+            for row, label in enumerate(fuzzy_labels):
+                column = best[row]
+                matched = similarity[row, column] >= self.min_similarity
+                resolved[label] = self.names[column] if matched else fuzzy_cleaned[row]
+
+        with self._lock:
+            if len(self._cache) + len(resolved) > self.cache_size:
+                self._cache.clear()
+            self._cache.update(resolved)
+        for label, indices in pending.items():
+            for i in indices:
+                results[i] = resolved[label]
+        return results
+
+    def normalize(self, label: str) -> str:
+        cached = self._cache.get(label)
+        return cached if cached is not None else self.normalize_batch([label])[0]
+
+    def canonical_id(self, label: str) -> Optional[int]:
+        """Canonical id of a label, or None when it is not in the vocabulary"""
+        return self.ids.get(self.normalize(label))
+
+    def prefix(self, prefix: str, limit: int = 10) -> List[str]:
+        """Canonical names with an alias (or alias word) starting with prefix"""
+        prefix = prefix.strip().lower()
+        start = bisect.bisect_left(self._prefix_strings, prefix)
+        found: Dict[str, None] = {}
+        for key, canonical_id in self._prefix_keys[start:]:
+            if not key.startswith(prefix) or len(found) >= limit:
+                break
+            found[self.names[canonical_id]] = None
+        return list(found)
+
+    def similar(self, label: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Closest canonical names by trigram cosine similarity"""
+        scores = (self._vectorize([clean_label(label)]) @ self._matrix.T)[0]
+        best = np.argsort(-scores)[:limit]
+        return [(self.names[i], float(scores[i])) for i in best if scores[i] > 0]
+
+    def expand(self, query: str) -> List[str]:
+        """Search terms for a query: its canonical name and every alias, plus the cleaned query itself"""
+        cleaned = clean_label(query) or query.strip().lower()
+        terms = [cleaned]
+        canonical_id = self.canonical_id(query)
+        if canonical_id is not None:
+            terms.extend(self.aliases[canonical_id])
+        return list(dict.fromkeys(terms))
+
+_shared_index: Optional[VocabularyIndex] = None
+_shared_lock = threading.Lock()
+
+def get_vocabulary() -> VocabularyIndex:
+    """Process-wide index, built on first use"""
+    global _shared_index
+    if _shared_index is None:
+        with _shared_lock:
+            if _shared_index is None:
+                _shared_index = VocabularyIndex()
+    return _shared_index
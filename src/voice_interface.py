@@ -1,28 +1,52 @@
 import os
+import re
 import speech_recognition as sr
 import threading
 from pathlib import Path
 from dotenv import load_dotenv
 import google.generativeai as genai
-from typing import Optional, Dict, List, Any
-from tts import talk
+from typing import Optional, Dict, List, Any, Iterator
+from tts import talk, talk_stream, iter_sentences
+from conversation import ConversationState
 
 load_dotenv()
 
+# "where is the spoon?", "where are my eggs", "where did I put the butter"
+WHERE_IS = re.compile(r"\bwhere(?:'s| is| are| did i (?:put|leave))\s+(?:the |my |some |a |an )?(.+?)[?.!\s]*$",
+                      re.IGNORECASE)
+
 # Configure Gemini
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 if not GEMINI_API_KEY:
     raise ValueError("GOOGLE_API_KEY not found in environment variables")
 genai.configure(api_key=GEMINI_API_KEY)
 
+def describe_location(location: Dict[str, Any]) -> str:
+    """One line of context for the model from an ObjectStorage.locate result"""
+    text = f"{location['label']} was last seen in frame {location['frame_number']} of {location['video_filename']}"
+    if location.get('position'):
+        text += f", in the {location['position']} of the frame"
+    if location.get('near'):
+        text += ", next to " + ", ".join(location['near'])
+    return text
+
 class VoiceInterface:
-    def __init__(self, debug_mode: bool = False):
+    def __init__(self, debug_mode: bool = False, storage: Optional[Any] = None, video_id: Optional[int] = None):
+        """Voice conversation about the detected ingredients
+
+        Args:
+            storage: ObjectStorage used to answer "where is X?" from stored bounding boxes
+            video_id: Limit those lookups to one video (default: any)
+        """
         self.recognizer = sr.Recognizer()
         self.recording = False
         self.text_detected = None
         self.debug_mode = debug_mode
         self.detected_objects: List[Dict[str, Any]] = []
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.conversation = ConversationState('gemini-2.0-flash', debug_mode=debug_mode)
+        self.model = self.conversation.model
+        self.storage = storage
+        self.video_id = video_id
 
     def record_and_interpret_audio(self) -> Optional[str]:
         """Record audio until Enter is pressed and interpret it"""
@@ -79,46 +103,79 @@ class VoiceInterface:
                 talk("Uh, sorry. What did you just say?")
                 return None
 
-    def get_response(self, text: str) -> str:
-        """Generate a response based on the user's query and detected objects"""
-        # Create a context-aware prompt that includes detected objects
-        objects_context = ""
-        if self.detected_objects:
-            objects_list = [obj['label'] for obj in self.detected_objects]
-            objects_context = "Available ingredients: " + ", ".join(objects_list)
-
+    async def where_is(self, text: Optional[str]) -> Optional[str]:
+        """Location context for a "where is X?" question, looked up through the spatial index"""
+        match = WHERE_IS.search(text or "")
+        if not match or self.storage is None:
+            return None
+        location = await self.storage.locate(match.group(1), self.video_id)
+        if location is None:
+            return f"{match.group(1)} was not detected in any video"
+        return describe_location(location)
+
+    def _build_prompt(self, text: str, location: Optional[str] = None) -> str:
+        """Build the per-turn prompt; ingredients and rules live in the conversation prefix"""
         if not text:  # Initial greeting and ingredient acknowledgment
-            prompt = f"""
-            {objects_context}
-
-            You are a friendly cooking assistant. Looking at these ingredients:
+            return """Looking at these ingredients:
             1. First, acknowledge the variety of ingredients you see
             2. Then, ask the user what kind of meal they'd like to make (casual or fancy dinner, lunch, etc.)
             3. Keep it casual and friendly, under 30 words
             """
-        elif "bye" in text.lower():
+
+        if location:
+            return f'Location from the video: {location}\nUser Query: "{text}"'
+        return f'User Query: "{text}"'
+
+    def get_response(self, text: str, location: Optional[str] = None) -> str:
+        """Generate a response based on the user's query and detected objects"""
+        if text and "bye" in text.lower():
             return "Catch you later! It was fun cooking together!"
-        else:
-            prompt = f"""
-            {objects_context}
-            User Query: "{text}"
-
-            You are a friendly cooking assistant. Rules:
-            1. If user wants meal suggestions, create an innovative recipe using ONLY the available ingredients
-            2. Be super casual and friendly, like chatting with a buddy
-            3. Keep response under 30 words
-            4. Always end with a question about their preferences or if they need more details
-            5. Focus on practical, doable suggestions with the ingredients we have
-            """
 
-        response = self.model.generate_content(prompt)
+        prompt = self._build_prompt(text, location)
+        response = self.conversation.get_model().generate_content(self.conversation.build_contents(prompt))
         response_text = response.text.strip()
         print(f"Gemini response: {response_text}")
+        self.conversation.record_turn(prompt, response_text, getattr(response, 'usage_metadata', None))
         return response_text
 
+    def stream_response(self, text: str, location: Optional[str] = None) -> Iterator[str]:
+        """Stream the response sentence by sentence as Gemini generates it
+
+        Yields each complete sentence as soon as its closing punctuation
+        arrives, so TTS can start speaking before the full reply is done.
+        """
+        if text and "bye" in text.lower():
+            yield "Catch you later! It was fun cooking together!"
+            return
+
+        prompt = self._build_prompt(text, location)
+        response = self.conversation.get_model().generate_content(
+            self.conversation.build_contents(prompt), stream=True
+        )
+
+        def chunk_texts():
+            for chunk in response:
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata only)
+                    continue
+                if self.debug_mode:
+                    print(f"Gemini chunk: {chunk_text!r}")
+                yield chunk_text
+
+        sentences = []
+        for sentence in iter_sentences(chunk_texts()):
+            print(f"Gemini sentence: {sentence}")
+            sentences.append(sentence)
+            yield sentence
+
+        self.conversation.record_turn(prompt, " ".join(sentences), getattr(response, 'usage_metadata', None))
+
     def update_detected_objects(self, objects: List[Dict[str, Any]]):
         """Update the list of detected objects from video processing"""
         self.detected_objects = objects
+        self.conversation.set_ingredients([obj['label'] for obj in objects])
 
     async def interact(self):
         """Main interaction loop"""
@@ -131,7 +188,7 @@ class VoiceInterface:
                 talk("Catch you later! It was fun chatting!")
                 break
             if text:
-                response = self.get_response(text)
-                talk(response)
+                # Speak each sentence as soon as Gemini finishes generating it
+                talk_stream(self.stream_response(text, await self.where_is(text)))
             else:
                 print("No valid text to process. Please try speaking again.")
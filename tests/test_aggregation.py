@@ -0,0 +1,47 @@
+import pytest
+from src.aggregation import IngredientAggregator, StabilityMonitor
+
+def test_aliases_fold_into_one_canonical_ingredient():
+    aggregator = IngredientAggregator()
+    assert aggregator.add([{"label": "Tomatoes", "confidence": 0.5}], 0, 0.0) == ["tomato"]
+    assert aggregator.add([{"label": "roma tomato", "confidence": 0.5},
+                           {"label": "spinach leaves", "confidence": 0.9}], 1, 1.0) == ["spinach"]
+    tomato = next(item for item in aggregator.summary() if item["label"] == "tomato")
+    assert tomato["aliases"] == ["roma tomato", "tomatoes"]
+    assert tomato["frames"] == [0, 1]
+    assert (tomato["first_seen"], tomato["last_seen"]) == (0.0, 1.0)
+
+def test_confidence_is_fused_with_noisy_or():
+    aggregator = IngredientAggregator()
+    aggregator.add([{"label": "lemon", "confidence": 0.5}], 0, None)
+    aggregator.add([{"label": "lemon", "confidence": 0.5}], 1, None)
+    aggregator.add([{"label": "egg", "confidence": 0.6}], 1, None)
+    lemon, egg = aggregator.summary()
+    assert lemon["confidence"] == pytest.approx(0.75)
+    assert lemon["max_confidence"] == pytest.approx(0.5)
+    assert egg["confidence"] == pytest.approx(0.6)
+
+def test_repeat_detections_in_a_frame_count_the_frame_once():
+    aggregator = IngredientAggregator()
+    aggregator.add([{"label": "egg", "confidence": 0.9}, {"label": "eggs", "confidence": 0.8}], 4, None)
+    egg = aggregator.summary()[0]
+    assert egg["detections"] == 2
+    assert egg["frames"] == [4] and egg["frame_count"] == 1
+
+def test_frame_refs_are_capped_but_still_counted():
+    aggregator = IngredientAggregator(max_frame_refs=3)
+    for frame in range(10):
+        aggregator.add([{"label": "rice", "confidence": 0.4}], frame, None)
+    rice = aggregator.summary()[0]
+    assert rice["frames"] == [0, 1, 2]
+    assert rice["frame_count"] == 10
+
+def test_stability_monitor_waits_for_patience_and_min_frames():
+    monitor = StabilityMonitor(patience=2, min_frames=3)
+    assert not monitor.update(["tomato"])
+    assert not monitor.update([])
+    assert monitor.update([])
+    monitor = StabilityMonitor(patience=1, min_frames=3)
+    assert not monitor.update([])
+    assert not monitor.update(["egg"])
+    assert monitor.update([])
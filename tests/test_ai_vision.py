@@ -0,0 +1,22 @@
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("anthropic")
+from src.ai_vision import AnthropicVision
+
+def parse(objects):
+    vision = AnthropicVision.__new__(AnthropicVision)
+    vision.name = "anthropic"
+    return vision._parse_response([SimpleNamespace(type="tool_use", input={"objects": objects})], debug_mode=False)
+
+def test_only_the_label_is_required():
+    objects, failed = parse([{"label": " Tomato "}, {"label": "egg", "confidence": 1.4, "bbox": [1, 2, 3, 4]}])
+    assert not failed
+    assert objects == [
+        {"label": "tomato", "category": "ingredient", "description": "", "confidence": 0.5},
+        {"label": "egg", "category": "ingredient", "description": "", "confidence": 1.0, "bbox": [1, 2, 3, 4]},
+    ]
+
+def test_objects_without_a_label_are_dropped():
+    objects, _ = parse([{"confidence": 0.9}, {"label": "lime"}])
+    assert [obj["label"] for obj in objects] == ["lime"]
@@ -0,0 +1,104 @@
+import io
+import json
+import wave
+import cv2
+import pytest
+from fastapi.testclient import TestClient
+from bench.mock_server import MockConfig, create_app, DEFAULT_VISION_RESPONSE
+from bench.run_bench import percentile, summarize, compare
+from bench.synthetic import make_video
+
+def client(**kwargs):
+    kwargs.setdefault("latency_ms", 0)
+    kwargs.setdefault("jitter_ms", 0)
+    config = MockConfig(**kwargs)
+    return TestClient(create_app(config)), config
+
+IMAGE_BODY = {"contents": [{"parts": [{"text": "List the items"},
+                                      {"inlineData": {"mimeType": "image/jpeg", "data": "AAAA"}}]}]}
+CHAT_BODY = {"contents": [{"parts": [{"text": "What can I cook?"}]}]}
+
+def test_mock_delay_stays_within_jitter():
+    config = MockConfig(latency_ms=300, jitter_ms=100, seed=1)
+    delays = [config.delay() for _ in range(200)]
+    assert all(0.2 <= d <= 0.4 for d in delays)
+
+def test_mock_error_rate_is_reproducible_with_a_seed():
+    first = MockConfig(error_rate=0.3, seed=7)
+    second = MockConfig(error_rate=0.3, seed=7)
+    outcomes = [first.should_fail() for _ in range(100)]
+    assert outcomes == [second.should_fail() for _ in range(100)]
+    assert 0 < sum(outcomes) < 100
+    assert not any(MockConfig(error_rate=0.0).should_fail() for _ in range(100))
+
+def test_mock_answers_image_requests_with_the_vision_json():
+    http, config = client()
+    response = http.post("/v1beta/models/gemini-2.0-flash:generateContent", json=IMAGE_BODY).json()
+    text = response["candidates"][0]["content"]["parts"][0]["text"]
+    assert json.loads(text) == DEFAULT_VISION_RESPONSE
+    assert response["usageMetadata"]["promptTokenCount"] == 258
+    assert config.requests == 1
+
+def test_mock_streams_chat_text():
+    http, config = client(chat_response="one two three")
+    response = http.post("/v1beta/models/gemini-2.0-flash:streamGenerateContent?alt=sse", json=CHAT_BODY)
+    chunks = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    text = "".join(chunk["candidates"][0]["content"]["parts"][0]["text"] for chunk in chunks)
+    assert text == "one two three"
+    assert chunks[-1]["candidates"][0]["finishReason"] == "STOP"
+    assert "usageMetadata" in chunks[-1]
+
+def test_mock_injects_429s_and_counts_them():
+    http, config = client(error_rate=1.0, seed=0)
+    response = http.post("/v1beta/models/gemini-2.0-flash:generateContent", json=CHAT_BODY)
+    assert response.status_code == 429
+    assert response.json()["error"]["status"] == "RESOURCE_EXHAUSTED"
+    assert http.get("/stats").json() == {"requests": 1, "errors": 1}
+
+def test_mock_speak_returns_silence_sized_to_the_text():
+    http, _ = client()
+    response = http.post("/v1/speak", json={"text": "hello"})
+    with wave.open(io.BytesIO(response.content)) as wav:
+        assert wav.getframerate() == 16000
+        assert wav.getnframes() == 16000 * 60 * 5 // 1000
+
+def test_percentile_is_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) == 0.0
+
+def test_summarize_reports_throughput_and_latency():
+    summary = summarize([1.0, 2.0], [0.1, 0.2, 0.3], frames=3, wall=3.0)
+    assert summary["videos_per_min"] == 40.0
+    assert summary["frames_per_sec"] == 1.0
+    assert summary["latency_p50_ms"] == 1000.0
+    assert summary["frame_latency_p99_ms"] == 300.0
+
+def test_compare_flags_regressions_beyond_the_tolerance():
+    baseline = {"modes": {"pipeline": {"videos_per_min": 10.0, "latency_p95_ms": 100.0}}, "peak_rss_mb": 200.0}
+    results = {"modes": {"pipeline": {"videos_per_min": 9.5, "latency_p95_ms": 130.0}}, "peak_rss_mb": 260.0}
+    assert compare(results, baseline, 0.10) == ["pipeline.latency_p95_ms", "peak_rss_mb"]
+    assert compare(baseline, baseline, 0.10) == []
+
+def test_compare_skips_modes_without_a_baseline():
+    results = {"modes": {"api": {"videos_per_min": 1.0}}, "peak_rss_mb": 100.0}
+    assert compare(results, {"modes": {}}, 0.10) == []
+
+@pytest.fixture
+def synthetic_pair(tmp_path):
+    first = make_video(str(tmp_path / "a.mp4"), seconds=0.5, fps=10, width=160, height=120, seed=3)
+    second = make_video(str(tmp_path / "b.mp4"), seconds=0.5, fps=10, width=160, height=120, seed=3)
+    return first, second
+
+def test_synthetic_video_is_deterministic(synthetic_pair):
+    frames = []
+    for path in synthetic_pair:
+        cap = cv2.VideoCapture(path)
+        assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 5
+        ok, frame = cap.read()
+        cap.release()
+        assert ok and frame.shape == (120, 160, 3)
+        frames.append(frame)
+    assert (frames[0] == frames[1]).all()
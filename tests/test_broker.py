@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from src.broker import Broker, MemoryBroker, SQLiteBroker, build_broker
+
+@pytest.fixture(params=["memory", "sqlite"])
+def broker(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBroker()
+    return SQLiteBroker(str(tmp_path / "broker.db"), poll_interval=0.01)
+
+def collect(broker, channel, after=0, timeout=1.0):
+    async def run():
+        return [(seq, message) async for seq, message in broker.subscribe(channel, after, timeout=timeout)]
+    return asyncio.run(run())
+
+def test_jobs_merge_fields(broker):
+    broker.put_job("a", status="processing", progress=0.1)
+    broker.put_job("b", status="complete")
+    job = broker.put_job("a", progress=0.5)
+    assert (job["status"], job["progress"]) == ("processing", 0.5)
+    assert broker.get_job("a")["progress"] == 0.5
+    assert broker.get_job("missing") is None
+    assert broker.latest_job()["job_id"] == "a"
+    assert broker.latest_job("complete")["job_id"] == "b"
+
+def test_events_are_per_channel_and_ordered(broker):
+    first = broker.publish("job:a", {"n": 1})
+    broker.publish("job:b", {"n": 2})
+    third = broker.publish("job:a", {"n": 3})
+    assert first < third
+    assert [message["n"] for _, message in broker.events("job:a")] == [1, 3]
+    assert [message["n"] for _, message in broker.events("job:a", after=first)] == [3]
+
+def test_subscribe_replays_and_stops_at_a_terminal_status(broker):
+    broker.publish("job:a", {"status": "processing"})
+    async def run():
+        async def publish_later():
+            await asyncio.sleep(0.05)
+            broker.publish("job:a", {"status": "complete"})
+            broker.publish("job:a", {"status": "ignored"})
+        task = asyncio.create_task(publish_later())
+        received = [message["status"] async for _, message in broker.subscribe("job:a", timeout=2)]
+        await task
+        return received
+    assert asyncio.run(run()) == ["processing", "complete"]
+
+def test_subscribe_resumes_after_a_sequence_number(broker):
+    seq = broker.publish("job:a", {"status": "processing"})
+    broker.publish("job:a", {"status": "error"})
+    assert [message["status"] for _, message in collect(broker, "job:a", after=seq)] == ["error"]
+
+def test_memory_broker_drops_old_events_but_keeps_numbering():
+    broker = MemoryBroker(max_events=3)
+    seqs = [broker.publish("job:a" if n % 2 else "job:b", {"n": n}) for n in range(6)]
+    assert seqs == [1, 2, 3, 4, 5, 6]
+    assert [seq for seq, _ in broker.events("job:a")] == [4, 6]
+    assert [seq for seq, _ in broker.events("job:b", after=4)] == [5]
+    assert broker.events("job:a", after=1) == broker.events("job:a")
+
+def test_build_broker(tmp_path):
+    assert isinstance(build_broker("memory"), MemoryBroker)
+    assert isinstance(build_broker(f"sqlite:///{tmp_path}/broker.db"), SQLiteBroker)
+    with pytest.raises(ValueError):
+        build_broker("redis://localhost")
+
+def test_incomplete_broker_cannot_be_instantiated():
+    class JobsOnly(Broker):
+        def put_job(self, job_id, **fields):
+            return fields
+
+        def get_job(self, job_id):
+            return None
+
+    with pytest.raises(TypeError):
+        JobsOnly()
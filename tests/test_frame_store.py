@@ -0,0 +1,60 @@
+import cv2
+import numpy as np
+from src.frame_store import FrameStore, frame_url
+
+def frame(seed=0, width=1280, height=720):
+    return np.random.default_rng(seed).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+def test_renditions_are_resized_and_decodable():
+    store = FrameStore()
+    renditions = store.put("job", 0, frame())
+    assert set(renditions) == {"thumb", "medium", "full"}
+    for name, width in (("thumb", 480), ("medium", 960), ("full", 1280)):
+        stored = store.get("job", 0, name)
+        assert stored is renditions[name]
+        image = cv2.imdecode(np.frombuffer(stored.data, np.uint8), cv2.IMREAD_COLOR)
+        assert image.shape[1] == width
+    assert store.get("job", 0, "thumb").media_type == "image/webp"
+    assert store.get("job", 0, "poster") is None
+    assert store.get("other", 0) is None
+
+def test_small_frames_are_not_upscaled():
+    store = FrameStore(renditions=["thumb", "full"])
+    renditions = store.put("job", 0, frame(width=320, height=180))
+    assert set(renditions) == {"thumb", "full"}
+    image = cv2.imdecode(np.frombuffer(renditions["thumb"].data, np.uint8), cv2.IMREAD_COLOR)
+    assert image.shape[:2] == (180, 320)
+
+def test_etags_identify_content():
+    store = FrameStore()
+    store.put("job", 0, frame(0))
+    store.put("job", 1, frame(0))
+    store.put("job", 2, frame(1))
+    assert store.get("job", 0).etag == store.get("job", 1).etag != store.get("job", 2).etag
+
+def test_evicts_least_recently_used_frames_within_budget():
+    store = FrameStore(max_bytes=1)
+    store.put("job", 0, frame(0))
+    store.put("job", 1, frame(1))
+    assert store.get("job", 0) is None and store.get("job", 1) is not None
+    assert store.stats()["frames"] == 1 and store.stats()["evictions"] == 1
+
+def test_evicted_frames_spill_to_disk(tmp_path):
+    store = FrameStore(max_bytes=1, spill_dir=str(tmp_path))
+    first = bytes(store.put("job", 0, frame(0))["medium"].data)
+    store.put("job", 1, frame(1))
+    spilled = store.get("job", 0)
+    assert bytes(spilled.data) == first
+    store.drop_job("job")
+    assert store.get("job", 0) is None and store.get("job", 1) is None
+    assert store.stats()["bytes"] == 0
+
+def test_write_through_shares_frames_between_stores(tmp_path):
+    writer = FrameStore(spill_dir=str(tmp_path), write_through=True)
+    reader = FrameStore(spill_dir=str(tmp_path))
+    writer.put("job", 3, frame())
+    assert reader.get("job", 3, "full").etag == writer.get("job", 3, "full").etag
+
+def test_frame_url():
+    assert frame_url("job", 7) == "/frames/job/7/medium"
+    assert frame_url("job", 7, "thumb") == "/frames/job/7/thumb"
@@ -0,0 +1,161 @@
+import asyncio
+import cv2
+import numpy as np
+import pytest
+from src.ingest import ChunkDecoder, IngestSession, decode_image
+
+JPEG = cv2.imencode(".jpg", np.full((48, 64, 3), 200, np.uint8))[1].tobytes()
+
+@pytest.fixture(scope="module")
+def webm(tmp_path_factory):
+    """A 3 s, 10 fps WebM recording like MediaRecorder produces"""
+    path = str(tmp_path_factory.mktemp("ingest") / "recording.webm")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"VP80"), 10, (160, 120))
+    if not writer.isOpened():
+        pytest.skip("OpenCV was built without a VP8 encoder")
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        writer.write(rng.integers(0, 255, (120, 160, 3), dtype=np.uint8))
+    writer.release()
+    with open(path, "rb") as f:
+        return f.read()
+
+class GatedProcessor:
+    """Stands in for VideoProcessor: each frame waits for the test to release it"""
+    tracking = False
+
+    def __init__(self):
+        self.gate = asyncio.Semaphore(0)
+        self.frames = []
+
+    async def analyse_frame(self, frame, job_id, frame_number, timestamp=None, aggregator=None, tracker=None):
+        await self.gate.acquire()
+        self.frames.append(frame_number)
+        objects = [{"label": "tomato", "confidence": 0.9}]
+        aggregator.add(objects, frame_number, timestamp)
+        return {"frame_number": frame_number, "timestamp": timestamp, "ingredients": objects}
+
+async def wait_until(condition, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+def test_frames_beyond_the_window_are_rejected():
+    async def run():
+        processor = GatedProcessor()
+        results = []
+
+        async def on_result(message):
+            results.append(message)
+
+        session = IngestSession(processor, "job", on_result, window=2)
+        session.start()
+        acks = [await session.receive(JPEG) for _ in range(3)]
+        assert [ack["status"] for ack in acks] == ["queued", "queued", "rejected"]
+        assert [ack["credits"] for ack in acks] == [1, 0, 0]
+
+        # Finishing a frame gives its credit back, reported with the result
+        processor.gate.release()
+        await wait_until(lambda: results)
+        assert results[0]["credits"] == 1 and results[0]["seq"] == 1
+        assert (await session.receive(JPEG))["status"] == "queued"
+
+        for _ in range(2):
+            processor.gate.release()
+        summary = await session.finish()
+        return results, summary
+
+    results, summary = asyncio.run(run())
+    assert [result["seq"] for result in results] == [1, 2, 4]
+    assert summary["processed_frames"] == 3
+    assert (summary["queued_frames"], summary["rejected_frames"]) == (3, 1)
+    assert summary["unique_ingredients"] == ["tomato"]
+
+def test_undecodable_frames_are_reported_not_analysed():
+    async def run():
+        processor = GatedProcessor()
+        results = []
+
+        async def on_result(message):
+            results.append(message)
+
+        session = IngestSession(processor, "job", on_result)
+        session.start()
+        await session.receive(b"not an image")
+        summary = await session.finish()
+        return processor, results, summary
+
+    processor, results, summary = asyncio.run(run())
+    assert not processor.frames
+    assert "error" in results[0] and results[0]["seq"] == 1
+    assert summary["undecodable_frames"] == 1
+
+def test_cancel_stops_waiting_frames():
+    async def run():
+        processor = GatedProcessor()
+        session = IngestSession(processor, "job", lambda message: asyncio.sleep(0))
+        session.start()
+        for _ in range(3):
+            await session.receive(JPEG)
+        await wait_until(lambda: session._in_flight)
+        await session.cancel()
+        return processor, session
+
+    processor, session = asyncio.run(run())
+    assert not processor.frames
+    assert session.credits == session.window
+
+def test_chunks_are_decoded_as_they_arrive(webm):
+    async def run():
+        processor = GatedProcessor()
+        results = []
+
+        async def on_result(message):
+            results.append(message)
+
+        session = IngestSession(processor, "job", on_result, mode="chunks", window=100, sample_fps=2.0)
+        session.start()
+        acks = [await session.receive(webm[i:i + 4096]) for i in range(0, len(webm), 4096)]
+        for _ in range(10):
+            processor.gate.release()
+        summary = await session.finish()
+        return acks, results, summary
+
+    acks, results, summary = asyncio.run(run())
+    # Frames come out while the recording is still being sent, not only at the end
+    assert sum(ack["frames"] for ack in acks[:-1]) > 0
+    # 3 s at 10 fps sampled at 2 fps
+    assert [result["timestamp"] for result in results] == pytest.approx([0, 0.5, 1.0, 1.5, 2.0, 2.5])
+    assert summary["processed_frames"] == 6
+
+def test_chunk_decoder_rejects_data_that_is_not_video():
+    decoder = ChunkDecoder()
+    with pytest.raises(ValueError):
+        decoder.feed(b"not a recording" * 1000, final=True)
+    decoder.close()
+
+def test_worker_failure_is_raised_on_the_next_message():
+    class FailingProcessor(GatedProcessor):
+        async def analyse_frame(self, *args, **kwargs):
+            raise RuntimeError("model exploded")
+
+    async def run():
+        session = IngestSession(FailingProcessor(), "job", lambda message: asyncio.sleep(0))
+        session.start()
+        await session.receive(JPEG)
+        await wait_until(lambda: session._worker.done())
+        with pytest.raises(RuntimeError):
+            await session.receive(JPEG)
+        with pytest.raises(RuntimeError):
+            await session.finish()
+
+    asyncio.run(run())
+
+def test_decode_image_and_modes():
+    assert decode_image(JPEG).shape == (48, 64, 3)
+    with pytest.raises(ValueError):
+        decode_image(b"")
+    with pytest.raises(ValueError):
+        IngestSession(GatedProcessor(), "job", None, mode="audio")
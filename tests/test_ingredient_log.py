@@ -0,0 +1,45 @@
+import json
+from src.ingredient_log import IngredientLog, LogReader, Pantry, import_legacy_files
+from src.vocabulary import get_vocabulary
+
+def test_pantry_folds_only_new_records(tmp_path):
+    log = IngredientLog(str(tmp_path / "ingredients.jsonl"))
+    pantry = Pantry(log, str(tmp_path / "pantry.json"))
+    log.append("a.mp4", ["egg", "milk"], run_id="a")
+    assert pantry.refresh()["runs"] == 1
+    log.append("b.mp4", ["egg"], run_id="b")
+    assert pantry.ingredients() == ["egg", "milk"]
+    # A fresh pantry picks the snapshot up instead of re-reading the log
+    snapshot = Pantry(log, str(tmp_path / "pantry.json")).refresh()
+    assert snapshot["runs"] == 2 and snapshot["ingredients"]["egg"]["last_run_id"] == "b"
+
+def test_pantry_confidence_uses_normalized_detail_labels(tmp_path):
+    log = IngredientLog(str(tmp_path / "ingredients.jsonl"))
+    pantry = Pantry(log, str(tmp_path / "pantry.json"), normalize=get_vocabulary().normalize_batch)
+    log.append("a.mp4", ["Tomatoes", "spinach leaves"], [{"label": "Tomatoes", "confidence": 0.9},
+                                                          {"label": "roma tomato", "confidence": 0.95},
+                                                          {"label": "spinach leaves", "confidence": 0.4}])
+    ingredients = pantry.refresh()["ingredients"]
+    assert ingredients["tomato"]["confidence"] == 0.95
+    assert ingredients["spinach"]["confidence"] == 0.4
+
+def test_log_reader_checkpoints(tmp_path):
+    log = IngredientLog(str(tmp_path / "ingredients.jsonl"))
+    reader = LogReader(log, str(tmp_path / "reader.json"))
+    log.append("a.mp4", ["egg"], run_id="a")
+    assert [record["run_id"] for record in reader.read_new()] == ["a"]
+    assert reader.read_new() == []
+    log.append("b.mp4", ["milk"], run_id="b")
+    assert [record["run_id"] for record in LogReader(log, str(tmp_path / "reader.json")).read_new()] == ["b"]
+
+def test_import_legacy_files_once(tmp_path):
+    legacy = tmp_path / "ingredients_20240101_120000.json"
+    legacy.write_text(json.dumps({"video_path": "old.mp4", "ingredients": ["egg"]}))
+    (tmp_path / "ingredients_broken.json").write_text("{")
+    log = IngredientLog(str(tmp_path / "ingredients.jsonl"))
+
+    assert import_legacy_files(log, str(tmp_path)) == 1
+    assert import_legacy_files(log, str(tmp_path)) == 0
+    records, _ = log.read_since()
+    assert [record["run_id"] for record in records] == ["legacy-ingredients_20240101_120000"]
+    assert not legacy.exists() and (tmp_path / (legacy.name + ".imported")).exists()
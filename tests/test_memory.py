@@ -0,0 +1,8 @@
+from src.memory import MB, MemoryCeiling
+
+def test_ceiling_limit_and_peak_use_the_same_megabytes():
+    ceiling = MemoryCeiling(limit_mb=1.5)
+    assert ceiling.limit == int(1.5 * MB)
+    ceiling.baseline -= 2 * MB
+    assert ceiling.exceeded()
+    assert ceiling.peak_mb >= 2.0
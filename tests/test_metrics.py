@@ -0,0 +1,42 @@
+import pytest
+from src.metrics import MetricsRegistry, Counter, Gauge, Histogram, _Metric
+
+def test_metric_without_samples_cannot_be_instantiated():
+    class Incomplete(_Metric):
+        kind = "counter"
+
+    with pytest.raises(TypeError):
+        Incomplete(MetricsRegistry(), "incomplete", "Missing samples()")
+
+def test_render_uses_the_exposition_format():
+    registry = MetricsRegistry()
+    calls = registry.register(Counter(registry, "calls_total", "Calls"))
+    depth = registry.register(Gauge(registry, "depth", "Queue depth"))
+    calls.inc(backend="gemini")
+    calls.inc(2, backend="gemini")
+    depth.set(4)
+    depth.dec()
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == ["# HELP calls_total Calls", "# TYPE calls_total counter", 'calls_total{backend="gemini"} 3']
+    assert "depth 3" in lines
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.register(Histogram(registry, "latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 2.0):
+        latency.observe(value, backend="b")
+
+    samples = latency.samples()
+    assert 'latency_seconds_bucket{backend="b",le="0.1"} 1' in samples
+    assert 'latency_seconds_bucket{backend="b",le="1.0"} 2' in samples
+    assert 'latency_seconds_bucket{backend="b",le="+Inf"} 3' in samples
+    assert 'latency_seconds_count{backend="b"} 3' in samples
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    latency = registry.register(Histogram(registry, "latency_seconds", "Latency"))
+    with latency.time(backend="b"):
+        pass
+    latency.observe(1.0)
+    assert latency.samples() == []
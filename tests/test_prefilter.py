@@ -0,0 +1,30 @@
+import numpy as np
+from src.prefilter import FramePrefilter, MockFoodNet, build_prefilter
+
+def counter(food=False):
+    """A grey, lightly textured counter, with a bright red "tomato" when food is set"""
+    frame = np.random.default_rng(0).integers(100, 140, (360, 640, 3), dtype=np.uint8)
+    if food:
+        frame[100:220, 300:420] = (30, 30, 220)
+    return frame
+
+def test_keeps_food_with_a_crop_around_it():
+    result = FramePrefilter(MockFoodNet()).check(counter(food=True))
+    assert result.keep and result.reason == "food"
+    x1, y1, x2, y2 = result.crops[0]
+    assert x1 <= 300 and y1 <= 100 and x2 >= 420 and y2 >= 220
+
+def test_skips_frames_without_food_dark_or_blurry():
+    prefilter = FramePrefilter(MockFoodNet())
+    assert prefilter.check(counter()).reason == "no_food"
+    assert prefilter.check(np.full((360, 640, 3), 10, np.uint8)).reason == "dark"
+    assert prefilter.check(np.full((360, 640, 3), 128, np.uint8)).reason == "blurry"
+    assert (prefilter.checked, prefilter.skipped) == (3, 3)
+
+def test_build_prefilter(monkeypatch):
+    monkeypatch.delenv("PREFILTER_MODEL", raising=False)
+    assert build_prefilter() is None
+    monkeypatch.setenv("PREFILTER_MODEL", "mock")
+    assert isinstance(build_prefilter().net, MockFoodNet)
+    monkeypatch.setenv("PREFILTER_MODEL", "/nonexistent/model.onnx")
+    assert build_prefilter() is None
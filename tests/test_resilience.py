@@ -0,0 +1,152 @@
+import time
+import asyncio
+import pytest
+from src.resilience import (CircuitBreaker, CircuitOpenError, ResilientCaller, is_retryable, is_throttled,
+                            fail_fast_on_throttle)
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+def failing(*errors):
+    """A provider call that raises each error in turn, then returns "ok" """
+    remaining = list(errors)
+    calls = []
+
+    def call():
+        calls.append(time.monotonic())
+        if remaining:
+            raise remaining.pop(0)
+        return "ok"
+    return call, calls
+
+def caller(**kwargs):
+    kwargs.setdefault("base_delay", 0.0)
+    return ResilientCaller("test", **kwargs)
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    breaker.opened_at -= breaker.reset_timeout
+
+def test_is_retryable():
+    assert is_retryable(TimeoutError())
+    assert is_retryable(StatusError(429))
+    assert is_retryable(StatusError(503))
+    assert not is_retryable(StatusError(400))
+    assert not is_retryable(ValueError("bad request"))
+
+def test_is_throttled():
+    class ResourceExhausted(Exception):
+        pass
+
+    assert is_throttled(StatusError(429))
+    assert is_throttled(ResourceExhausted("quota"))
+    assert not is_throttled(StatusError(503))
+    assert not is_throttled(TimeoutError())
+
+def test_throttling_fails_fast_when_asked():
+    async def run(fn):
+        token = fail_fast_on_throttle.set(True)
+        try:
+            return await caller(max_retries=3).call(fn)
+        finally:
+            fail_fast_on_throttle.reset(token)
+
+    fn, calls = failing(StatusError(429))
+    with pytest.raises(StatusError):
+        asyncio.run(run(fn))
+    assert len(calls) == 1
+
+    # Other transient errors are still retried
+    fn, calls = failing(StatusError(503))
+    assert asyncio.run(run(fn)) == "ok"
+    assert len(calls) == 2
+
+def test_throttling_is_retried_by_default():
+    fn, calls = failing(StatusError(429))
+    assert asyncio.run(caller(max_retries=3).call(fn)) == "ok"
+    assert len(calls) == 2
+
+def test_retries_retryable_errors_then_succeeds():
+    fn, calls = failing(StatusError(503), TimeoutError())
+    assert asyncio.run(caller(max_retries=3).call(fn)) == "ok"
+    assert len(calls) == 3
+
+def test_client_errors_are_not_retried():
+    fn, calls = failing(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        asyncio.run(caller(max_retries=3).call(fn))
+    assert len(calls) == 1
+
+def test_deadline_abandons_slow_attempts():
+    with pytest.raises(TimeoutError):
+        asyncio.run(caller(max_retries=0, deadline=0.05).call(lambda: time.sleep(0.5)))
+
+def test_breaker_opens_and_refuses_calls():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    fn, calls = failing(*[StatusError(503)] * 5)
+    with pytest.raises(StatusError):
+        asyncio.run(caller(max_retries=1, breaker=breaker).call(fn))
+    assert breaker.state == "open" and breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(caller(breaker=breaker).call(fn))
+    assert len(calls) == 2
+
+def test_half_open_trial_success_closes():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    assert not breaker.is_open
+    assert asyncio.run(caller(breaker=breaker).call(lambda: "ok")) == "ok"
+    assert breaker.state == "closed"
+
+def test_half_open_trial_failure_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    open_breaker(breaker)
+    fn, _ = failing(StatusError(503))
+    with pytest.raises(StatusError):
+        asyncio.run(caller(max_retries=0, breaker=breaker).call(fn))
+    assert breaker.state == "open"
+
+def test_half_open_trial_client_error_closes():
+    # A client error says nothing about provider health, but must not leave the breaker half open
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+    fn, _ = failing(ValueError("bad request"))
+    with pytest.raises(ValueError):
+        asyncio.run(caller(breaker=breaker).call(fn))
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+def test_cancelled_half_open_trial_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    open_breaker(breaker)
+
+    async def run():
+        task = asyncio.create_task(caller(breaker=breaker).call(lambda: time.sleep(0.2)))
+        await asyncio.sleep(0.05)
+        # The trial is in flight: the router must not count this backend as available
+        assert breaker.state == "half_open" and breaker.is_open
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.state == "open"
+
+def test_hedged_request_wins_over_a_slow_primary():
+    slow = caller(max_retries=0, hedge_percentile=50, hedge_min_samples=1, deadline=2.0)
+    slow.latencies.record(0.01)
+    durations = iter([1.0, 0.0])
+
+    def call():
+        time.sleep(next(durations))
+        return "ok"
+
+    async def run():
+        start = time.perf_counter()
+        assert await slow.call(call) == "ok"
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) < 0.9
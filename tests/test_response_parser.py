@@ -0,0 +1,37 @@
+from src.response_parser import parse_data, parse_objects, tolerant_parse
+
+def test_plain_json():
+    result = parse_objects('{"objects": [{"label": "tomato", "confidence": 0.9}]}', backend="test")
+    assert result.status == "ok"
+    assert result.objects == [{"label": "tomato", "confidence": 0.9}]
+
+def test_code_fence_and_prose_are_stripped():
+    fenced = parse_objects('```json\n{"objects": [{"label": "egg"}]}\n```', backend="test")
+    wrapped = parse_objects('Here you go: {"objects": [{"label": "egg"}]} Hope that helps!', backend="test")
+    assert fenced.objects == wrapped.objects == [{"label": "egg"}]
+    assert not fenced.failed and not wrapped.failed
+
+def test_truncated_response_keeps_complete_objects():
+    text = '{"objects": [{"label": "tomato", "confidence": 0.9}, {"label": "basil", "confid'
+    result = parse_objects(text, backend="test")
+    assert result.status == "recovered"
+    assert [obj["label"] for obj in result.objects] == ["tomato"]
+
+def test_invalid_objects_are_dropped_with_errors():
+    result = parse_data({"objects": [{"label": "lemon", "bbox": [0, 0, 1, 1]},
+                                     {"label": ""},
+                                     {"label": "lime", "bbox": [0, 0, 1]},
+                                     {"confidence": 0.4}]}, backend="test")
+    assert [obj["label"] for obj in result.objects] == ["lemon"]
+    assert len(result.errors) >= 3
+    assert result.status == "ok"
+
+def test_unusable_responses_fail():
+    assert parse_objects("", backend="test").failed
+    assert parse_objects("I could not see any food.", backend="test").failed
+    assert parse_data("not a payload", backend="test").failed
+
+def test_tolerant_parse_finds_bare_objects():
+    assert tolerant_parse('noise {"label": "rice"} more noise {"label": "beans"}') == [
+        {"label": "rice"}, {"label": "beans"}]
+    assert tolerant_parse("no json here") is None
@@ -0,0 +1,63 @@
+import pytest
+from src.sampling import AdaptiveSampler, TimestampSampler
+
+def sample_all(sampler, found=lambda index: []):
+    picked = []
+    while True:
+        index = sampler.next_frame()
+        if index is None:
+            return picked
+        picked.append(index)
+        sampler.record(found(index))
+
+def test_fixed_stride():
+    sampler = AdaptiveSampler(frame_count=100, max_frames=50, fixed_stride=30)
+    assert sample_all(sampler) == [0, 30, 60, 90]
+    assert sampler.stop_reason == "end_of_video"
+
+def test_frame_budget_spreads_over_the_video():
+    sampler = AdaptiveSampler(frame_count=100, max_frames=4, min_density=1.0, max_density=1.0)
+    assert sample_all(sampler) == [0, 33, 66]
+    assert sampler.stop_reason == "end_of_video"
+
+def test_samples_densely_while_new_ingredients_appear():
+    busy = sample_all(AdaptiveSampler(frame_count=1000, max_frames=6), found=lambda index: [f"item{index}"])
+    quiet = sample_all(AdaptiveSampler(frame_count=1000, max_frames=6))
+    assert busy[2] - busy[1] < quiet[2] - quiet[1]
+
+def test_stops_when_discovery_dries_up():
+    sampler = AdaptiveSampler(frame_count=1000, max_frames=100, min_discovery_rate=0.2, min_frames=3)
+    assert len(sample_all(sampler)) == 3
+    assert sampler.stop_reason == "discovery_rate"
+
+def test_cost_budget():
+    sampler = AdaptiveSampler(frame_count=1000, max_frames=100, max_cost=0.01, cost_per_frame=0.003)
+    assert len(sample_all(sampler)) == 3
+    assert sampler.stop_reason == "cost_budget"
+    assert sampler.spent == pytest.approx(0.009)
+
+def test_skipped_frames_cost_nothing():
+    sampler = AdaptiveSampler(frame_count=1000, max_frames=100, max_cost=0.01, cost_per_frame=0.003)
+    for _ in range(5):
+        sampler.next_frame()
+        sampler.record([], analysed=False)
+    assert sampler.spent == 0 and sampler.next_frame() is not None
+
+def test_timestamp_sampler_takes_one_frame_per_interval():
+    sampler = TimestampSampler(interval=1.0)
+    picked = [t / 10 for t in range(35) if sampler.due(t / 10)]
+    assert picked == [0.0, 1.0, 2.0, 3.0]
+    assert sampler.sampled == 4
+
+def test_timestamp_sampler_skips_gaps_instead_of_bunching():
+    sampler = TimestampSampler(interval=1.0)
+    # Variable frame rate: a 5 s gap, then frames every 0.25 s
+    times = [0.0, 0.5, 5.6, 5.85, 6.1, 6.35, 6.6, 6.85, 7.1]
+    assert [t for t in times if sampler.due(t)] == [0.0, 5.6, 6.1, 7.1]
+
+def test_timestamp_sampler_window():
+    sampler = TimestampSampler(interval=2.0, start=3.0, end=7.0)
+    assert [t for t in range(10) if sampler.due(t)] == [3, 5, 7]
+    assert sampler.finished(7.5) and not sampler.finished(7.0)
+    with pytest.raises(ValueError):
+        TimestampSampler(interval=0)
@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime
+import pytest
+from src.storage import ObjectStorage, describe_position
+
+SHELF = [
+    {"label": "tomato", "confidence": 0.9, "bbox": [100, 100, 200, 200]},
+    {"label": "basil", "confidence": 0.8, "bbox": [220, 110, 300, 190]},
+    {"label": "olive oil", "confidence": 0.7, "bbox": [900, 500, 1000, 700]},
+    {"label": "salt", "confidence": 0.6},
+]
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = ObjectStorage(f"sqlite:///{tmp_path}/objects.db")
+    video_id = asyncio.run(storage.start_video("kitchen.mp4", 100))
+    asyncio.run(storage.store_objects(0, datetime.now(), SHELF, video_id=video_id, frame_size=(1280, 720)))
+    asyncio.run(storage.store_objects(1, datetime.now(), [{"label": "tomatoes", "confidence": 0.5,
+                                                           "bbox": [1100, 600, 1200, 700]}],
+                                      video_id=video_id, frame_size=(1280, 720)))
+    return storage
+
+def labels(objects):
+    return [obj["label"] for obj in objects]
+
+def test_spatial_index_is_used(storage):
+    assert storage.rtree
+
+def test_objects_in_region_of_one_frame(storage):
+    found = asyncio.run(storage.objects_in_region((0, 0, 640, 360), frame_number=0))
+    assert sorted(labels(found)) == ["basil", "tomato"]
+    tomato = next(obj for obj in found if obj["label"] == "tomato")
+    assert tomato["bbox"] == [100, 100, 200, 200]
+    assert tomato["position"] == "top left"
+
+def test_objects_in_region_across_frames_and_by_label(storage):
+    right_side = asyncio.run(storage.objects_in_region((800, 400, 1280, 720)))
+    assert sorted(labels(right_side)) == ["olive oil", "tomatoes"]
+    assert labels(asyncio.run(storage.objects_in_region((0, 0, 1280, 720), label="tomato"))) == [
+        "tomatoes", "tomato"]
+    assert asyncio.run(storage.objects_in_region((0, 0, 10, 10), frame_number=0)) == []
+    assert asyncio.run(storage.objects_in_region((0, 0, 1280, 720), frame_number=99)) == []
+
+def test_nearest_objects_are_ordered_by_distance(storage):
+    nearest = asyncio.run(storage.nearest_objects(150, 150, frame_number=0, limit=3))
+    assert labels(nearest) == ["tomato", "basil", "olive oil"]
+    assert [obj["distance"] for obj in nearest][:2] == [0.0, 70.0]
+    assert labels(asyncio.run(storage.nearest_objects(150, 150, frame_number=0, max_distance=100))) == [
+        "tomato", "basil"]
+
+def test_locate_reports_position_and_neighbours(storage):
+    location = asyncio.run(storage.locate("basil"))
+    assert location["position"] == "top left"
+    assert location["frame_number"] == 0
+    assert location["near"] == ["tomato"]
+    # The latest sighting wins; the vocabulary matches plurals
+    assert asyncio.run(storage.locate("tomato"))["frame_number"] == 1
+    assert asyncio.run(storage.locate("saffron")) is None
+
+def test_get_frames_pages_by_frame_number(storage):
+    video_id = storage.current_video_id
+    first = asyncio.run(storage.get_frames(video_id, limit=1))
+    assert [frame["frame_number"] for frame in first] == [0]
+    assert len(first[0]["objects"]) == len(SHELF)
+    rest = asyncio.run(storage.get_frames(video_id, after=first[-1]["frame_number"]))
+    assert [frame["frame_number"] for frame in rest] == [1]
+
+def test_describe_position():
+    assert describe_position([0, 0, 10, 10], 300, 300) == "top left"
+    assert describe_position([140, 140, 160, 160], 300, 300) == "centre"
+    assert describe_position([280, 280, 300, 300], 300, 300) == "bottom right"
+    assert describe_position([0, 0, 10, 10], None, None) is None
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from src.tiling import FrameTiler, box_overlap
+
+def test_box_overlap():
+    assert box_overlap([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert box_overlap([0, 0, 10, 10], [20, 20, 30, 30]) == 0.0
+    # A box cut by a tile edge counts as the same item as the whole box
+    assert box_overlap([0, 0, 10, 10], [0, 0, 5, 10]) == 1.0
+
+def test_grid_overlaps_and_respects_max_tiles():
+    tiler = FrameTiler(tile_size=1000, overlap=0.2, max_tiles=4)
+    boxes = tiler.grid(3840, 2160)
+    assert len(boxes) <= 4
+    assert boxes[0][0] == 0 and boxes[-1][2] == 3840 and boxes[-1][3] == 2160
+    assert boxes[0][2] > boxes[1][0]
+    assert not tiler.should_tile(np.zeros((720, 1000, 3), np.uint8))
+    with pytest.raises(ValueError):
+        FrameTiler(mode="diagonal")
+
+def test_merge_maps_tile_boxes_to_frame_pixels():
+    tiler = FrameTiler()
+    merged = tiler.merge([[0, 0, 100, 100], [100, 0, 300, 100]],
+                         [[{"label": "jar", "confidence": 0.8, "bbox": [0.1, 0.2, 0.5, 0.6]}],
+                          [{"label": "egg", "confidence": 0.7, "bbox": [0.5, 0.0, 1.0, 1.0]}]])
+    assert [(obj["label"], obj["bbox"], obj["tiles"]) for obj in merged] == [
+        ("jar", [10, 20, 50, 60], [0]), ("egg", [200, 0, 300, 100], [1])]
+
+def test_merge_joins_an_item_split_across_a_seam():
+    tiler = FrameTiler()
+    merged = tiler.merge([[0, 0, 120, 100], [80, 0, 200, 100]],
+                         [[{"label": "tomatoes", "confidence": 0.6, "bbox": [0.75, 0.1, 1.0, 0.5]}],
+                          [{"label": "tomato", "confidence": 0.9, "bbox": [0.0, 0.1, 0.3, 0.5]}]])
+    assert len(merged) == 1
+    assert merged[0]["bbox"] == [80, 10, 120, 50]
+    assert (merged[0]["label"], merged[0]["confidence"], merged[0]["tiles"]) == ("tomato", 0.9, [0, 1])
+
+def test_merge_keeps_separate_items_and_collapses_boxless_ones():
+    tiler = FrameTiler()
+    merged = tiler.merge([[0, 0, 100, 100], [100, 0, 200, 100]],
+                         [[{"label": "egg", "confidence": 0.9, "bbox": [0.0, 0.0, 0.2, 0.2]},
+                           {"label": "salt", "confidence": 0.5}],
+                          [{"label": "egg", "confidence": 0.8, "bbox": [0.8, 0.8, 1.0, 1.0]},
+                           {"label": "salt", "confidence": 0.7}]])
+    assert sorted(obj["label"] for obj in merged) == ["egg", "egg", "salt"]
+    assert next(obj for obj in merged if obj["label"] == "salt")["confidence"] == 0.7
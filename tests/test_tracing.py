@@ -0,0 +1,77 @@
+import json
+import pytest
+from src.tracing import Tracer, InMemoryCollector, current_job_id, current_frame
+
+def test_span_outside_a_job_is_not_recorded():
+    tracer = Tracer()
+    with tracer.span("decode"):
+        pass
+    assert tracer.collector.jobs == {}
+
+def test_disabled_tracer_returns_a_no_op_span():
+    tracer = Tracer(enabled=False)
+    with tracer.span("decode", job_id="job"):
+        pass
+    assert tracer.get_trace("job") is None
+
+def test_spans_pick_up_the_job_and_frame_from_the_context():
+    tracer = Tracer()
+    job_token, frame_token = current_job_id.set("job"), current_frame.set(7)
+    try:
+        with tracer.span("model_call", backend="gemini"):
+            pass
+    finally:
+        current_frame.reset(frame_token)
+        current_job_id.reset(job_token)
+
+    span, = tracer.collector.get_spans("job")
+    assert (span.name, span.frame, span.attributes) == ("model_call", 7, {"backend": "gemini"})
+    assert span.end_ns >= span.start_ns
+
+def test_failed_stage_is_marked_as_an_error():
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("parse", job_id="job"):
+            raise ValueError("bad json")
+
+    span, = tracer.collector.get_spans("job")
+    assert span.status == "error"
+    assert "bad json" in span.attributes["error"]
+
+def test_trace_is_a_waterfall_with_stage_totals():
+    tracer = Tracer()
+    for name in ("decode", "model_call", "decode"):
+        with tracer.span(name, job_id="job"):
+            pass
+
+    trace = tracer.get_trace("job")
+    assert [span["name"] for span in trace["spans"]] == ["decode", "model_call", "decode"]
+    assert trace["spans"][0]["offset_ms"] == 0
+    assert set(trace["stage_totals_ms"]) == {"decode", "model_call"}
+    assert trace["trace_id"] == tracer.collector.get_spans("job")[0].trace_id
+
+def test_collector_evicts_the_oldest_job_and_caps_spans():
+    tracer = Tracer()
+    tracer.collector = tracer.exporters[0] = InMemoryCollector(max_jobs=2, max_spans_per_job=2)
+    for job in ("a", "b", "c"):
+        for _ in range(3):
+            with tracer.span("store", job_id=job):
+                pass
+
+    assert list(tracer.collector.jobs) == ["b", "c"]
+    assert len(tracer.collector.get_spans("c")) == 2
+
+def test_export_file_holds_otlp_json(tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    tracer = Tracer(export_path=str(path))
+    with tracer.span("encode", job_id="job", frame=3, tiles=4):
+        pass
+
+    request = json.loads(path.read_text().splitlines()[0])
+    span = request["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    attributes = {a["key"]: a["value"] for a in span["attributes"]}
+    assert span["name"] == "encode"
+    assert attributes["job.id"] == {"stringValue": "job"}
+    assert attributes["frame.number"] == {"intValue": "3"}
+    assert attributes["tiles"] == {"intValue": "4"}
+    assert span["status"] == {"code": 1}
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+import pytest
+from src.tracking import ObjectTracker, build_tracker, tracking_mode
+
+# A textured counter with a distinct item on it; frames are views into it, panned sideways
+rng = np.random.default_rng(1)
+WORLD = cv2.GaussianBlur(rng.integers(0, 255, (400, 800, 3), dtype=np.uint8), (0, 0), 3)
+WORLD[120:200, 240:320] = rng.integers(0, 255, (80, 80, 3), dtype=np.uint8)
+DETECTIONS = [{"label": "tomato", "confidence": 0.9, "bbox": [200, 100, 280, 180]},
+              {"label": "salt", "confidence": 0.6}]
+
+def view(dx):
+    return np.ascontiguousarray(WORLD[20:380, dx:dx + 640])
+
+@pytest.mark.parametrize("mode", ["flow", "template"])
+def test_follows_boxes_through_a_pan(mode):
+    tracker = ObjectTracker(mode=mode)
+    assert tracker.track(view(40)).reason == "no_reference"
+    tracker.reset(view(40), DETECTIONS)
+    result = tracker.track(view(43))
+    assert result.reason == "tracked" and not result.needs_model
+    tomato, salt = result.objects
+    assert tomato["bbox"] == [197, 100, 277, 180]
+    assert salt == {"label": "salt", "confidence": 0.6}
+
+def test_new_content_asks_for_that_region_only():
+    tracker = ObjectTracker(mode="flow")
+    tracker.reset(view(40), DETECTIONS)
+    frame = view(43).copy()
+    frame[250:310, 450:530] = (0, 0, 255)
+    result = tracker.track(frame)
+    assert result.reason == "new_region" and not result.needs_model
+    x1, y1, x2, y2 = result.new_region
+    assert x1 <= 450 and y1 <= 250 and x2 >= 530 and y2 >= 310
+    assert [obj["label"] for obj in result.objects] == ["tomato", "salt"]
+
+def test_forces_a_model_call_when_tracks_get_old_or_the_scene_changes():
+    tracker = ObjectTracker(mode="flow", max_age=1)
+    tracker.reset(view(40), DETECTIONS)
+    assert tracker.track(view(41)).reason == "tracked"
+    assert tracker.track(view(42)).reason == "max_age"
+    tracker.reset(view(40), DETECTIONS)
+    result = tracker.track(np.zeros((200, 200, 3), np.uint8))
+    assert result.reason == "scene_change" and result.needs_model
+
+def test_merge_skips_items_already_tracked():
+    tracker = ObjectTracker()
+    tracked = [{"label": "tomato", "bbox": [0, 0, 50, 50]}, {"label": "salt"}]
+    found = [{"label": "tomatoes", "bbox": [5, 5, 50, 50]}, {"label": "tomato", "bbox": [200, 200, 250, 250]},
+             {"label": "salt"}, {"label": "pepper"}]
+    assert [obj["label"] for obj in tracker.merge(tracked, found)] == ["tomato", "salt", "tomato", "pepper"]
+
+def test_tracking_mode_from_the_environment(monkeypatch):
+    monkeypatch.delenv("TRACKING_MODE", raising=False)
+    assert tracking_mode() == "off" and build_tracker() is None
+    monkeypatch.setenv("TRACKING_MODE", " Template ")
+    assert tracking_mode() == "template" and build_tracker().mode == "template"
+    monkeypatch.setenv("TRACKING_MODE", "kalman")
+    with pytest.raises(ValueError):
+        tracking_mode()
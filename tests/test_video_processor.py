@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from bench.synthetic import make_video
+from src import video_processor
+from src.frame_store import FrameStore
+from src.prefilter import FramePrefilter, MockFoodNet
+from src.vision_router import VisionRouter
+
+class CountingBackend:
+    """Finds a new ingredient in every frame it is shown"""
+    name = "fake"
+    cost_per_call = 0.001
+    calls_per_minute = 0
+
+    def __init__(self):
+        self.calls = 0
+
+    async def detect(self, frame, debug_mode=True, encoded=None):
+        self.calls += 1
+        assert encoded is not None
+        return [{"label": "tomato", "confidence": 0.9}, {"label": f"item {self.calls}", "confidence": 0.5}]
+
+@pytest.fixture
+def processor(monkeypatch, tmp_path):
+    backend = CountingBackend()
+    monkeypatch.setenv("TILING_MODE", "off")
+    monkeypatch.setenv("TRACKING_MODE", "off")
+    monkeypatch.delenv("PREFILTER_MODEL", raising=False)
+    monkeypatch.setattr(video_processor, "build_router", lambda debug_mode: VisionRouter([backend]))
+    processor = video_processor.VideoProcessor(rate_limit_calls=0, call_delay=0,
+                                               frame_store=FrameStore(spill_dir=str(tmp_path / "frames")))
+    processor.backend = backend
+    return processor
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    return make_video(str(tmp_path_factory.mktemp("videos") / "clip.mp4"), seconds=2, fps=15, width=320, height=240)
+
+def run(processor, video, **kwargs):
+    async def collect():
+        return [result async for result in processor.process_video(video, job_id="job", **kwargs)]
+    results = asyncio.run(collect())
+    return results[:-1], results[-1]
+
+def test_prefiltered_frames_are_not_sent_to_the_model(processor, video):
+    processor.prefilter = FramePrefilter(MockFoodNet(), threshold=1.1)
+    frames, summary = run(processor, video, max_frames=3, sample_rate=5)
+    assert frames == [] and processor.backend.calls == 0
+    assert summary["skipped_frames"] == summary["processed_frames"] == 3
+    assert summary["cloud_calls_saved"] == 3
+
+def test_summary_frames_match_the_frame_results(processor, video):
+    frames, summary = run(processor, video, max_frames=4, sample_rate=7)
+    numbers = [frame["frame_number"] for frame in frames]
+    assert numbers == [0, 1, 2, 3]
+    assert [frame["timestamp"] for frame in frames] == pytest.approx([0, 7 / 15, 14 / 15, 21 / 15])
+    tomato = next(item for item in summary["ingredients"] if item["label"] == "tomato")
+    assert tomato["frames"] == numbers
+    for frame in frames:
+        # Each result's frame number is the key its renditions are stored under
+        assert processor.frame_store.get("job", frame["frame_number"]) is not None
@@ -0,0 +1,106 @@
+import asyncio
+import numpy as np
+import pytest
+from src.resilience import CircuitBreaker, ResilientCaller
+from src.vision_router import VisionRouter, detect_tiles
+
+class RateLimited(Exception):
+    status_code = 429
+
+class FakeBackend:
+    """Vision backend answering with canned objects, or raising a canned error"""
+    def __init__(self, name, objects=None, error=None, cost_per_call=0.001, calls_per_minute=60):
+        self.name = name
+        self.objects = objects if objects is not None else [{"label": "tomato", "confidence": 0.9}]
+        self.error = error
+        self.cost_per_call = cost_per_call
+        self.calls_per_minute = calls_per_minute
+        self.frames = []
+
+    async def detect(self, frame, debug_mode=True, encoded=None):
+        self.frames.append(frame)
+        if self.error:
+            raise self.error
+        return [dict(obj) for obj in self.objects]
+
+FRAME = np.zeros((48, 64, 3), np.uint8)
+
+def test_routes_to_the_cheaper_backend():
+    cheap, dear = FakeBackend("cheap", cost_per_call=0.0001), FakeBackend("dear", cost_per_call=0.01)
+    router = VisionRouter([dear, cheap])
+    asyncio.run(router.detect(FRAME))
+    assert len(cheap.frames) == 1 and not dear.frames
+
+def test_spills_over_and_cools_down_a_rate_limited_backend():
+    limited = FakeBackend("limited", error=RateLimited(), cost_per_call=0.0001)
+    spare = FakeBackend("spare", objects=[{"label": "lemon", "confidence": 0.8}])
+    router = VisionRouter([limited, spare], cooldown=60)
+    assert asyncio.run(router.detect(FRAME))[0]["label"] == "lemon"
+    asyncio.run(router.detect(FRAME))
+    # The second frame goes straight to the healthy backend
+    assert len(limited.frames) == 1 and len(spare.frames) == 2
+
+class ThrottledBackend(FakeBackend):
+    """Backend whose provider calls go through a ResilientCaller and always hit a 429"""
+    def __init__(self, name, **kwargs):
+        super().__init__(name, **kwargs)
+        self.caller = ResilientCaller(name, max_retries=3, base_delay=0.05)
+        self.attempts = 0
+
+    def _request(self):
+        self.attempts += 1
+        raise RateLimited()
+
+    async def detect(self, frame, debug_mode=True, encoded=None):
+        self.frames.append(frame)
+        return await self.caller.call(self._request)
+
+def test_throttled_backend_spills_over_without_backing_off():
+    throttled = ThrottledBackend("throttled", cost_per_call=0.0001)
+    spare = FakeBackend("spare", objects=[{"label": "lemon", "confidence": 0.8}])
+    router = VisionRouter([throttled, spare])
+    assert asyncio.run(router.detect(FRAME))[0]["label"] == "lemon"
+    assert throttled.attempts == 1
+
+def test_last_throttled_backend_still_retries():
+    throttled = ThrottledBackend("throttled")
+    router = VisionRouter([throttled])
+    with pytest.raises(RateLimited):
+        asyncio.run(router.detect(FRAME))
+    assert throttled.attempts == 4
+
+def test_half_open_backend_is_not_available():
+    backend = FakeBackend("gemini")
+    backend.caller = ResilientCaller("gemini", breaker=CircuitBreaker("gemini", failure_threshold=1, reset_timeout=0))
+    backend.caller.breaker.record_failure()
+    router = VisionRouter([backend])
+    assert router.states[0].available(0.0)
+    assert backend.caller.breaker.allow()
+    assert not router.states[0].available(0.0)
+
+def test_escalates_low_confidence_frames():
+    weak = FakeBackend("weak", objects=[{"label": "leaf", "confidence": 0.3}])
+    strong = FakeBackend("strong", objects=[{"label": "basil", "confidence": 0.95}])
+    router = VisionRouter([weak], escalation=strong, escalate_below=0.6)
+    assert asyncio.run(router.detect(FRAME)) == [{"label": "basil", "confidence": 0.95}]
+
+def test_failed_escalation_keeps_the_first_answer():
+    weak = FakeBackend("weak", objects=[{"label": "leaf", "confidence": 0.3}])
+    broken = FakeBackend("broken", error=ValueError("bad request"))
+    router = VisionRouter([weak], escalation=broken)
+    assert asyncio.run(router.detect(FRAME)) == [{"label": "leaf", "confidence": 0.3}]
+
+def test_all_backends_failing():
+    router = VisionRouter([FakeBackend("a", error=RateLimited()), FakeBackend("b", error=ValueError("no"))])
+    with pytest.raises(ValueError):
+        asyncio.run(router.detect(FRAME))
+    assert asyncio.run(router.process_frame(FRAME)) == []
+
+def test_per_tile_fallback_normalizes_pixel_boxes():
+    backend = FakeBackend("pixels", objects=[{"label": "jar", "confidence": 0.9, "bbox": [32, 12, 64, 48]},
+                                             {"label": "salt", "confidence": 0.5}])
+    tiles = [np.zeros((48, 64, 3), np.uint8), np.zeros((24, 32, 3), np.uint8)]
+    first, second = asyncio.run(detect_tiles(backend, tiles))
+    assert first[0]["bbox"] == [0.5, 0.25, 1.0, 1.0]
+    assert second[0]["bbox"] == [1.0, 0.5, 2.0, 2.0]
+    assert "bbox" not in first[1]
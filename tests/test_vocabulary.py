@@ -0,0 +1,36 @@
+import pytest
+from src.vocabulary import VocabularyIndex, clean_label, lemmatize_word
+
+@pytest.mark.parametrize("word, singular", [
+    ("tomatoes", "tomato"), ("cherries", "cherry"), ("pies", "pie"), ("cookies", "cookie"),
+    ("leaves", "leaf"), ("radishes", "radish"), ("asparagus", "asparagus"), ("peas", "pea"),
+])
+def test_lemmatize_word(word, singular):
+    assert lemmatize_word(word) == singular
+
+def test_clean_label_keeps_the_first_alternative_only():
+    assert clean_label("Rice or grains") == "rice"
+    assert clean_label("tomatoes/peppers") == "tomato"
+    assert clean_label("lemons, limes") == "lemon"
+
+def test_clean_label_keeps_joined_dishes_whole():
+    assert clean_label("mac and cheese") == "mac and cheese"
+    assert clean_label("Fresh tomatoes with basil") == "tomato with basil"
+
+def test_normalize_finds_canonical_names():
+    vocabulary = VocabularyIndex()
+    assert vocabulary.normalize("Sliced Aubergines") == "eggplant"
+    assert vocabulary.normalize("cherry tomatoes") == "cherry tomato"
+    assert vocabulary.normalize("romaine lettuce heart") == "lettuce"
+    assert vocabulary.normalize("tomatoes with basil") == "tomato"
+    assert vocabulary.normalize("tuna in oil") == "tuna"
+
+def test_normalize_fuzzy_and_unknown_labels():
+    vocabulary = VocabularyIndex()
+    assert vocabulary.normalize_batch(["zuchini", "dragon fruit"]) == ["zucchini", "dragon fruit"]
+    assert vocabulary.canonical_id("dragon fruit") is None
+
+def test_prefix_and_expand():
+    vocabulary = VocabularyIndex()
+    assert "green onion" in vocabulary.prefix("scal")
+    assert {"green onion", "scallion", "spring onion"} <= set(vocabulary.expand("scallions"))